@@ -0,0 +1,146 @@
+from collections import deque
+
+import pandas as pd
+
+
+class SlidingExtremes:
+    """
+    Описание: Скользящие максимум и минимум по последним window барам на монотонных очередях.
+    В очереди максимумов значения убывают, в очереди минимумов - возрастают, поэтому каждый бар
+    добавляется и удаляется не более одного раза: O(1) в среднем на бар, O(n) на весь ряд.
+
+    Параметры:
+    window (int): длина окна в барах.
+    """
+
+    def __init__(self, window):
+        if window < 1:
+            raise ValueError("Длина окна должна быть положительной")
+        self.window = window
+        self.position = -1
+        self.highs = deque()
+        self.lows = deque()
+
+    def update(self, value, label=None):
+        """
+        Добавляет бар (NaN занимает место в окне, но не учитывается) и возвращает пару
+        ((максимум, метка), (минимум, метка)) по текущему окну или None, если в окне нет значений.
+        """
+        self.position += 1
+        oldest = self.position - self.window + 1
+        for queue in (self.highs, self.lows):
+            while queue and queue[0][0] < oldest:
+                queue.popleft()
+
+        if value == value:
+            while self.highs and self.highs[-1][1] <= value:
+                self.highs.pop()
+            self.highs.append((self.position, value, label))
+            while self.lows and self.lows[-1][1] >= value:
+                self.lows.pop()
+            self.lows.append((self.position, value, label))
+
+        if not self.highs:
+            return None
+        return self.highs[0][1:], self.lows[0][1:]
+
+    @property
+    def full(self):
+        """Окно заполнено: с начала ряда прошло не меньше window баров."""
+        return self.position >= self.window - 1
+
+
+class FluctuationScanner:
+    """
+    Описание: Потоковый поиск окон из window баров, в которых цена колебалась более чем на threshold
+    процентов ((max - min) / min * 100, как в notify_if_strong_fluctuations). Бары подаются по одному,
+    сканер выдает события начала и окончания каждого превышения.
+
+    Событие - словарь с ключами:
+    event ('start' или 'end'), time (бар, на котором произошло событие),
+    fluctuation (колебание окна при 'start', наибольшее колебание за превышение при 'end'),
+    low_time, low, high_time, high (экстремумы окна с наибольшим колебанием).
+    Событие 'end' выдается на первом баре, окно которого уже не превышает порог.
+
+    Параметры:
+    window (int): длина окна в барах.
+    threshold (float): порог колебания в процентах.
+    """
+
+    def __init__(self, window, threshold):
+        self.threshold = threshold
+        self.extremes = SlidingExtremes(window)
+        self.breach = None
+
+    def update(self, time, close):
+        """
+        Обрабатывает один бар. Возвращает событие (словарь) или None.
+        """
+        extremes = self.extremes.update(close, time)
+        if extremes is None or not self.extremes.full:
+            return self._close(time)
+        (high, high_time), (low, low_time) = extremes
+        fluctuation = (high - low) / low * 100
+        if fluctuation <= self.threshold:
+            return self._close(time)
+
+        event = {'time': time, 'fluctuation': fluctuation,
+                 'low_time': low_time, 'low': low, 'high_time': high_time, 'high': high}
+        if self.breach is None:
+            self.breach = event
+            return {'event': 'start', **event}
+        if fluctuation > self.breach['fluctuation']:
+            self.breach = {**event, 'time': self.breach['time']}
+        return None
+
+    def finish(self, time=None):
+        """
+        Закрывает незавершенное превышение в конце ряда. Возвращает событие 'end' или None.
+        """
+        return self._close(time)
+
+    def _close(self, time):
+        if self.breach is None:
+            return None
+        peak, self.breach = self.breach, None
+        return {'event': 'end', **peak, 'time': time}
+
+
+def scan_bars(bars, window, threshold):
+    """
+    Описание: Генератор событий по потоку баров (например, по итератору из источника котировок).
+
+    Параметры:
+    bars (iterable): пары (время, цена закрытия).
+    window (int): длина окна в барах.
+    threshold (float): порог колебания в процентах.
+
+    Возвращает: генератор событий FluctuationScanner; превышение, не закончившееся к концу потока,
+    закрывается событием 'end' на последнем баре.
+    """
+    scanner = FluctuationScanner(window, threshold)
+    time = None
+    for time, close in bars:
+        event = scanner.update(time, close)
+        if event is not None:
+            yield event
+    event = scanner.finish(time)
+    if event is not None:
+        yield event
+
+
+def scan_fluctuations(data, window, threshold, column='Close'):
+    """
+    Описание: Находит все окна из window баров в данных тикера, где цена колебалась более чем на
+    threshold процентов, и возвращает начала и окончания превышений.
+
+    Параметры:
+    data (DataFrame): данные акций с колонкой column и индексом-датами.
+    window (int): длина окна в барах.
+    threshold (float): порог колебания в процентах.
+    column (str): колонка цены.
+
+    Возвращает: DataFrame событий с колонками event, time, fluctuation, low_time, low, high_time, high.
+    """
+    events = scan_bars(zip(data.index, data[column].to_numpy()), window, threshold)
+    return pd.DataFrame(list(events), columns=['event', 'time', 'fluctuation', 'low_time', 'low', 'high_time', 'high'])
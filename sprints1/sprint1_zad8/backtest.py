@@ -0,0 +1,248 @@
+import os
+import time
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import indicators
+
+
+# Индикатор правила, его параметры (их наличие требует пересчета) и колонки, которые читает правило
+INDICATOR_PARAMS = {
+    'rsi': ('rsi', ('window',), ('RSI',)),
+    'macd': ('macd', ('fast', 'slow', 'signal'), ('MACD', 'Signal_Line')),
+}
+
+
+def _latch(entries, exits):
+    """
+    Позиция по событиям без цикла по барам: после входа позиция 1 до ближайшего выхода, после выхода 0.
+    Для каждого бара находится индекс последнего события (накопленный максимум индексов событий),
+    и позиция равна 1, если это событие - вход.
+    """
+    events = np.zeros(len(entries), dtype=np.int8)
+    events[exits] = -1
+    events[entries] = 1
+    last = np.maximum.accumulate(np.where(events != 0, np.arange(len(events)), -1))
+    return np.where(last >= 0, events[np.maximum(last, 0)] == 1, False).astype(np.int8)
+
+
+def rsi_positions(data, lower=30, upper=70, column='RSI'):
+    """
+    Описание: Правило по RSI: вход, когда RSI пересекает уровень lower сверху вниз (перепроданность),
+    выход, когда RSI пересекает уровень upper снизу вверх (перекупленность).
+
+    Параметры:
+    data (DataFrame): данные с колонкой RSI (calculate_rsi).
+    lower (float), upper (float): уровни RSI.
+    column (str): колонка RSI.
+
+    Возвращает: ndarray позиций (1 - в позиции после закрытия бара, 0 - вне рынка).
+    """
+    rsi = data[column].to_numpy(dtype=np.float64)
+    previous = np.concatenate(([np.nan], rsi[:-1]))
+    entries = (previous >= lower) & (rsi < lower)
+    exits = (previous <= upper) & (rsi > upper)
+    return _latch(entries, exits)
+
+
+def macd_positions(data, macd='MACD', signal='Signal_Line'):
+    """
+    Описание: Правило по MACD: вход, когда MACD пересекает сигнальную линию снизу вверх,
+    выход - при пересечении сверху вниз. До первого пересечения позиции нет.
+
+    Параметры:
+    data (DataFrame): данные с колонками MACD и Signal_Line (calculate_macd).
+    macd (str), signal (str): колонки MACD и сигнальной линии.
+
+    Возвращает: ndarray позиций.
+    """
+    above = data[macd].to_numpy(dtype=np.float64) > data[signal].to_numpy(dtype=np.float64)
+    previous = np.concatenate(([False], above[:-1]))
+    return _latch(above & ~previous, ~above & previous)
+
+
+RULES = {
+    'rsi': rsi_positions,
+    'macd': macd_positions,
+}
+
+
+def backtest(data, positions, cost=0.0, periods_per_year=252):
+    """
+    Описание: Векторный расчет результата стратегии по массиву позиций без цикла по барам.
+    Позиция, принятая по закрытию бара t, получает доходность бара t+1; при каждом изменении позиции
+    списывается комиссия cost (доля от суммы сделки).
+
+    Параметры:
+    data (DataFrame): данные с колонкой 'Close'.
+    positions (ndarray): позиции 0/1 по закрытию каждого бара (rsi_positions, macd_positions).
+    cost (float): комиссия за вход или выход, например 0.001 = 0.1%.
+    periods_per_year (int): число баров в году для годовых показателей.
+
+    Возвращает: словарь с ключами equity (Series капитала, начиная с 1), drawdown (Series просадки),
+    trades (DataFrame сделок) и stats (словарь показателей: total_return, annual_return, sharpe,
+    max_drawdown, trades, win_rate, exposure).
+    """
+    close = data['Close'].to_numpy(dtype=np.float64)
+    positions = np.asarray(positions, dtype=np.float64)
+    held = np.concatenate(([0.0], positions[:-1]))
+    changes = np.abs(np.diff(np.concatenate(([0.0], positions))))
+
+    returns = np.zeros(len(close))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns[1:] = close[1:] / close[:-1] - 1
+    strategy = np.nan_to_num(held * returns) - cost * changes
+    equity = np.cumprod(1 + strategy)
+    drawdown = equity / np.maximum.accumulate(equity) - 1
+
+    # Сделки: вход по закрытию бара, где позиция стала 1, выход - где стала 0 (или последний бар)
+    edges = np.diff(np.concatenate(([0], positions.astype(np.int8), [0])))
+    entries = np.flatnonzero(edges == 1)
+    exits = np.flatnonzero(edges == -1)
+    is_open = exits >= len(close)
+    exits = np.minimum(exits, len(close) - 1)
+    trade_returns = close[exits] / close[entries] - 1 - 2 * cost
+    trades = pd.DataFrame({
+        'entry_time': data.index[entries],
+        'exit_time': data.index[exits],
+        'entry_price': close[entries],
+        'exit_price': close[exits],
+        'return': trade_returns,
+        'bars': exits - entries,
+        'open': is_open,
+    })
+
+    years = len(close) / periods_per_year
+    volatility = strategy[1:].std()
+    stats = {
+        'total_return': equity[-1] - 1 if len(equity) else 0.0,
+        'annual_return': equity[-1] ** (1 / years) - 1 if len(equity) and equity[-1] > 0 else np.nan,
+        'sharpe': strategy[1:].mean() / volatility * np.sqrt(periods_per_year) if volatility > 0 else np.nan,
+        'max_drawdown': drawdown.min() if len(drawdown) else 0.0,
+        'trades': len(trades),
+        'win_rate': (trade_returns > 0).mean() if len(trades) else np.nan,
+        'exposure': held.mean() if len(held) else 0.0,
+    }
+    return {
+        'equity': pd.Series(equity, index=data.index, name='Equity'),
+        'drawdown': pd.Series(drawdown, index=data.index, name='Drawdown'),
+        'trades': trades,
+        'stats': stats,
+    }
+
+
+def _prepare(data, rule, params, cache=None):
+    """
+    Данные для правила: если в params есть параметры индикатора (окно RSI, периоды MACD) или в data
+    нет колонок индикатора, индикатор считается по 'Close' (с кэшем по параметрам, без параметров -
+    со значениями по умолчанию), иначе используются готовые колонки.
+    Возвращает (данные, параметры правила, время расчета индикатора в секундах, в том числе из кэша).
+    """
+    name, keys, columns = INDICATOR_PARAMS[rule]
+    indicator_params = {key: params[key] for key in keys if key in params}
+    rule_params = {key: value for key, value in params.items() if key not in keys}
+    if not indicator_params and all(column in data for column in columns):
+        return data, rule_params, 0.0
+
+    key = (name, tuple(sorted(indicator_params.items())))
+    if cache is not None and key in cache:
+        prepared, elapsed = cache[key]
+        return prepared, rule_params, elapsed
+    start = time.perf_counter()
+    block = indicators.compute_indicators(data, [(name, indicator_params)])
+    prepared = pd.concat([data[['Close']], block], axis=1)
+    elapsed = time.perf_counter() - start
+    if cache is not None:
+        cache[key] = (prepared, elapsed)
+    return prepared, rule_params, elapsed
+
+
+def run_rule(data, rule, params=None, cost=0.0, periods_per_year=252):
+    """
+    Описание: Backtest одного правила с параметрами.
+
+    Параметры:
+    data (DataFrame): данные с 'Close' (и колонками индикаторов, если их не нужно пересчитывать).
+    rule (str): 'rsi' или 'macd'.
+    params (dict): параметры правила, например {'window': 14, 'lower': 30, 'upper': 70}
+    или {'fast': 12, 'slow': 26, 'signal': 9}.
+    cost (float): комиссия за вход или выход.
+
+    Возвращает: результат backtest.
+    """
+    if rule not in RULES:
+        raise ValueError(f"Неизвестное правило: {rule}. Доступны: {', '.join(RULES)}")
+    prepared, rule_params, _ = _prepare(data, rule, params or {})
+    return backtest(data, RULES[rule](prepared, **rule_params), cost, periods_per_year)
+
+
+def parameter_grid(**ranges):
+    """Все комбинации параметров: parameter_grid(window=[7, 14], lower=[20, 30]) -> список словарей."""
+    keys = list(ranges)
+    return [dict(zip(keys, values)) for values in itertools.product(*ranges.values())]
+
+
+# Данные и кэш индикаторов процесса-обработчика: данные передаются в процесс один раз, а не с каждой задачей
+_worker_data = None
+_worker_cache = {}
+
+
+def _init_worker(data):
+    global _worker_data
+    _worker_data = data
+    _worker_cache.clear()
+
+
+def _evaluate(task):
+    rule, params, cost, periods_per_year = task
+    prepared, rule_params, indicator_time = _prepare(_worker_data, rule, params, _worker_cache)
+    start = time.perf_counter()
+    result = backtest(_worker_data, RULES[rule](prepared, **rule_params), cost, periods_per_year)
+    backtest_time = time.perf_counter() - start
+    # Расчет индикатора общий для комбинаций с теми же параметрами, но входит во время каждой из них
+    return {**params, **result['stats'], 'indicator_time': indicator_time, 'backtest_time': backtest_time,
+            'eval_time': indicator_time + backtest_time}
+
+
+def sweep(data, rule, grid, cost=0.0, periods_per_year=252, processes=None, sort_by='sharpe'):
+    """
+    Описание: Перебор параметров правила в пуле процессов. Данные передаются в каждый процесс
+    один раз (только колонки, нужные правилу), комбинации с одинаковыми параметрами индикатора идут
+    подряд и используют один расчет индикатора. Для каждой комбинации записывается время расчета:
+    indicator_time - расчет индикатора для ее параметров (один раз на процесс, из кэша для остальных
+    комбинаций), backtest_time - сигналы и backtest, eval_time - их сумма.
+
+    Параметры:
+    data (DataFrame): данные с 'Close'.
+    rule (str): 'rsi' или 'macd'.
+    grid (list): список словарей параметров (parameter_grid).
+    cost (float): комиссия за вход или выход.
+    processes (int): число процессов (по умолчанию по числу ядер).
+    sort_by (str): показатель для сортировки результатов по убыванию.
+
+    Возвращает: DataFrame: параметры, показатели backtest и время (с) по каждой комбинации.
+    """
+    if rule not in RULES:
+        raise ValueError(f"Неизвестное правило: {rule}. Доступны: {', '.join(RULES)}")
+    keys, columns = INDICATOR_PARAMS[rule][1:]
+    grid = sorted(grid, key=lambda params: tuple(params.get(key, 0) for key in keys))
+    tasks = [(rule, params, cost, periods_per_year) for params in grid]
+    if not tasks:
+        return pd.DataFrame()
+
+    workers = processes or os.cpu_count() or 1
+    chunksize = max(1, len(tasks) // (4 * workers))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(data[['Close', *(c for c in columns if c in data)]],)) as executor:
+        rows = list(executor.map(_evaluate, tasks, chunksize=chunksize))
+    return pd.DataFrame(rows).sort_values(sort_by, ascending=False, ignore_index=True)
+
+
+def print_sweep_report(results, top=5):
+    """Выводит лучшие по показателю комбинации и самые быстрые в расчете."""
+    print(f"Лучшие комбинации ({len(results)} всего):")
+    print(results.head(top).to_string(index=False))
+    print("Самые быстрые в расчете:")
+    print(results.nsmallest(top, 'eval_time').to_string(index=False))
@@ -0,0 +1,115 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+import data_download as dd
+
+
+def read_tickers(path):
+    """
+    Описание: Читает список тикеров из текстового файла: по одному или несколько на строку,
+    через пробел или запятую. Пустые строки и строки, начинающиеся с '#', пропускаются.
+
+    Параметры:
+    path (str): путь к файлу со списком тикеров.
+
+    Возвращает: список тикеров без повторов в исходном порядке.
+    """
+    tickers = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            tickers.extend(t.upper() for t in line.replace(',', ' ').split())
+    return list(dict.fromkeys(tickers))
+
+
+def apply_indicators(data):
+    """
+    Применяет к данным цепочку индикаторов из data_download (скользящее среднее, MACD, RSI,
+    стандартное отклонение). Функция верхнего уровня, чтобы ее можно было выполнять в пуле процессов.
+    """
+    data = dd.add_moving_average(data)
+    data = dd.calculate_macd(data)
+    data = dd.calculate_rsi(data)
+    data = dd.calculate_standard_deviation(data)
+    return data
+
+
+def _timed_fetch(ticker, fetch_kwargs):
+    start = time.perf_counter()
+    data = dd.fetch_stock_data(ticker, **fetch_kwargs)
+    return data, time.perf_counter() - start
+
+
+def _timed_indicators(data):
+    start = time.perf_counter()
+    data = apply_indicators(data)
+    return data, time.perf_counter() - start
+
+
+def run_batch(tickers, start_date=None, end_date=None, period=None, cache=None,
+              fetch_workers=8, process_workers=None):
+    """
+    Описание: Пакетная обработка списка тикеров. Данные загружаются параллельно в ограниченном
+    пуле потоков через fetch_stock_data, а цепочка индикаторов считается в пуле процессов.
+    Ошибка по отдельному тикеру записывается в отчет и не прерывает пакет.
+
+    Параметры:
+    tickers (list): список тикеров.
+    start_date (datetime): дата начала анализа (если указано).
+    end_date (datetime): дата окончания анализа (если указано).
+    period (str): временной период для данных (если не указаны даты).
+    cache (StockDataCache): локальный кэш котировок (необязательно).
+    fetch_workers (int): число потоков загрузки.
+    process_workers (int): число процессов для расчета индикаторов (по умолчанию по числу ядер).
+
+    Возвращает: кортеж (results, report), где results - словарь {тикер: DataFrame с индикаторами},
+    а report - DataFrame с колонками ticker, status, rows, fetch_time, indicators_time, error.
+    """
+    fetch_kwargs = {'start_date': start_date, 'end_date': end_date, 'period': period, 'cache': cache}
+    report = {ticker: {'ticker': ticker, 'status': 'ok', 'rows': 0, 'fetch_time': None,
+                       'indicators_time': None, 'error': None} for ticker in tickers}
+    results = {}
+
+    with ThreadPoolExecutor(max_workers=fetch_workers) as threads, \
+            ProcessPoolExecutor(max_workers=process_workers) as processes:
+        fetches = {threads.submit(_timed_fetch, ticker, fetch_kwargs): ticker for ticker in tickers}
+        computations = {}
+
+        # Индикаторы для тикера запускаются сразу, как только пришли его данные
+        for future in as_completed(fetches):
+            ticker = fetches[future]
+            try:
+                data, elapsed = future.result()
+            except Exception as e:
+                report[ticker].update(status='fetch_error', error=f"{type(e).__name__}: {e}")
+                continue
+            report[ticker].update(fetch_time=elapsed, rows=len(data))
+            if data.empty:
+                report[ticker].update(status='no_data', error='нет данных за выбранный период')
+                continue
+            computations[processes.submit(_timed_indicators, data)] = ticker
+
+        for future in as_completed(computations):
+            ticker = computations[future]
+            try:
+                data, elapsed = future.result()
+            except Exception as e:
+                report[ticker].update(status='indicators_error', error=f"{type(e).__name__}: {e}")
+                continue
+            report[ticker].update(indicators_time=elapsed)
+            results[ticker] = data
+
+    return results, pd.DataFrame(list(report.values()))
+
+
+def print_batch_report(report):
+    """Выводит в консоль отчет пакетной обработки: время по каждому тикеру и список ошибок."""
+    print(report.to_string(index=False))
+    failed = report[report['status'] != 'ok']
+    print(f"Обработано тикеров: {len(report) - len(failed)} из {len(report)}")
+    for _, row in failed.iterrows():
+        print(f"Ошибка для {row['ticker']} ({row['status']}): {row['error']}")
@@ -0,0 +1,153 @@
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib.style as mplstyle
+import matplotlib.dates as mdates
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from downsampling import downsample
+
+
+def is_valid_style(style):
+    """Проверяет, что style - стиль matplotlib: встроенный ('default', 'ggplot' и т.д.) или файл .mplstyle."""
+    return isinstance(style, str) and (style == 'default' or style in mplstyle.available or os.path.isfile(style))
+
+
+class ChartRenderer:
+    """
+    Описание: Пакетный рендерер графиков в формате create_and_save_plot (цена и скользящее среднее,
+    стандартное отклонение, RSI, MACD). Фигура, оси и линии создаются один раз на холсте Agg без pyplot,
+    а для каждого тикера меняются только данные линий и заголовок. Это убирает основную стоимость
+    create_and_save_plot - создание фигуры, осей и артистов на каждый вызов.
+
+    Параметры:
+    style (str): стиль matplotlib (как в create_and_save_plot).
+    directory (str): каталог для сохранения графиков.
+    """
+
+    def __init__(self, style='default', directory="plotfiles"):
+        self.style = style
+        self.directory = directory
+        with mplstyle.context(style):
+            self.figure = Figure(figsize=(12, 8))
+            FigureCanvasAgg(self.figure)
+            axes = self.figure.subplots(4, 1)
+            self.axes = axes
+            self.lines = {
+                'Close': axes[0].plot([], [], label='Close Price')[0],
+                'Moving_Average': axes[0].plot([], [], label='Moving Average')[0],
+                'Standard_Deviation': axes[1].plot([], [], label='Standard Deviation', color='purple')[0],
+                'RSI': axes[2].plot([], [], label='RSI', color='orange')[0],
+                'MACD': axes[3].plot([], [], label='MACD', color='green')[0],
+                'Signal_Line': axes[3].plot([], [], label='Signal Line', color='red')[0],
+            }
+            axes[2].axhline(70, linestyle='--', alpha=0.5, color='red')
+            axes[2].axhline(30, linestyle='--', alpha=0.5, color='green')
+
+            titles = [None, 'Стандартное отклонение цены закрытия', 'Relative Strength Index (RSI)', 'MACD']
+            ylabels = ["Цена", "Стандартное отклонение", "RSI", "MACD"]
+            for ax, title, ylabel in zip(axes, titles, ylabels):
+                if title:
+                    ax.set_title(title)
+                ax.set_xlabel("Дата")
+                ax.set_ylabel(ylabel)
+                ax.xaxis_date()
+                ax.legend()
+
+            # Поля раскладки считаются один раз по широким подписям, а не на каждом графике
+            axes[0].set_title("TICKER Цена акций с течением времени")
+            for ax in axes:
+                ax.set_ylim(-99999, 99999)
+            self.figure.tight_layout()
+            for ax in axes:
+                ax.set_autoscale_on(True)
+
+    def _update(self, data, ticker, max_points=None):
+        """Обновляет линии данными тикера и заголовок."""
+        data = downsample(data, max_points, list(self.lines))
+        index = data.index
+        if getattr(index, 'tz', None) is not None:
+            index = index.tz_localize(None)
+        x = mdates.date2num(index)
+        for column, line in self.lines.items():
+            line.set_data(x, data[column].to_numpy())
+
+        self.axes[0].set_title(f"{ticker} Цена акций с течением времени")
+        for ax in self.axes:
+            ax.relim()
+            ax.autoscale_view()
+
+    def render(self, data, ticker, period, filename=None, max_points=None):
+        """
+        Описание: Обновляет линии данными тикера и сохраняет график в PNG.
+
+        Параметры:
+        data (DataFrame): данные с колонками Close, Moving_Average, Standard_Deviation, RSI, MACD, Signal_Line.
+        ticker (str): тикер акции.
+        period (str): период (используется в имени файла, как в create_and_save_plot).
+        filename (str): имя файла (по умолчанию '<тикер>_<период>_stock_price_chart.png').
+        max_points (int): прореживать каждый ряд до этого числа точек (по умолчанию без прореживания).
+
+        Возвращает: путь к сохраненному файлу.
+        """
+        self._update(data, ticker, max_points)
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory)
+        if filename is None:
+            filename = f"{ticker}_{period}_stock_price_chart.png"
+        filepath = os.path.join(self.directory, filename)
+        with mplstyle.context(self.style):
+            self.figure.savefig(filepath)
+        return filepath
+
+    def render_bytes(self, data, ticker, max_points=None, fmt='png'):
+        """
+        Описание: Как render, но возвращает содержимое изображения вместо записи файла
+        (для отдачи графика по сети без временных файлов).
+
+        Возвращает: bytes изображения в формате fmt.
+        """
+        self._update(data, ticker, max_points)
+        buffer = io.BytesIO()
+        with mplstyle.context(self.style):
+            self.figure.savefig(buffer, format=fmt)
+        return buffer.getvalue()
+
+
+# Рендереры процесса-обработчика по стилям: фигура строится один раз на процесс
+_renderers = {}
+
+
+def _render_in_worker(args):
+    data, ticker, period, style, directory, max_points = args
+    key = (style, directory)
+    if key not in _renderers:
+        _renderers[key] = ChartRenderer(style, directory)
+    return _renderers[key].render(data, ticker, period, max_points=max_points)
+
+
+def render_charts(datasets, period, style='default', directory="plotfiles", processes=None, max_points=None):
+    """
+    Описание: Рендерит графики для набора тикеров в пуле процессов. Каждый процесс создает фигуру
+    один раз и переиспользует ее для всех доставшихся ему тикеров.
+
+    Параметры:
+    datasets (dict): словарь {тикер: DataFrame с индикаторами}.
+    period (str): период (используется в именах файлов).
+    style (str): стиль matplotlib.
+    directory (str): каталог для сохранения графиков.
+    processes (int): число процессов (по умолчанию по числу ядер).
+    max_points (int): прореживать каждый ряд до этого числа точек (по умолчанию без прореживания).
+
+    Возвращает: словарь {тикер: путь к графику}.
+    """
+    tasks = [(data, ticker, period, style, directory, max_points) for ticker, data in datasets.items()]
+    if not tasks:
+        return {}
+    workers = processes or os.cpu_count() or 1
+    chunksize = max(1, len(tasks) // (4 * workers))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        paths = list(executor.map(_render_in_worker, tasks, chunksize=chunksize))
+    return dict(zip(datasets, paths))
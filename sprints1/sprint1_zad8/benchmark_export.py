@@ -0,0 +1,95 @@
+import os
+import time
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+import exporters
+from providers import LocalFileProvider
+
+
+def make_minute_bars(years=10, seed=0):
+    """
+    Синтетические минутные бары OHLCV за years лет: 252 торговых дня в году, 390 минут в дне.
+    """
+    days = pd.bdate_range('2010-01-04', periods=252 * years, tz='America/New_York')
+    minutes = pd.timedelta_range('09:30:00', periods=390, freq='min')
+    index = (days.repeat(390) + np.tile(minutes, len(days))).rename('Datetime')
+
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.0005, len(index))))
+    spread = np.abs(rng.normal(0, 0.0003, len(index))) * close
+    return pd.DataFrame({
+        'Open': close - rng.normal(0, 0.0002, len(index)) * close,
+        'High': close + spread,
+        'Low': close - spread,
+        'Close': close,
+        'Volume': rng.integers(100, 10_000, len(index)),
+    }, index=index)
+
+
+def directory_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return total
+
+
+def check_local_provider(data, root):
+    """
+    Проверяет, что LocalFileProvider читает файлы, записанные exporters, с теми же датами и ценами.
+    """
+    directory = os.path.join(root, 'local')
+    os.makedirs(directory)
+    for fmt, exporter in exporters.EXPORTERS.items():
+        ticker = fmt.replace('.', '').upper()
+        exporter.write(data, os.path.join(directory, f"{ticker}.{exporter.extension}"))
+        loaded = LocalFileProvider(directory).load(ticker)
+        if (not isinstance(loaded.index, pd.DatetimeIndex) or list(loaded.columns) != list(data.columns)
+                or not np.array_equal(loaded.index.asi8, data.index.asi8)
+                or not np.allclose(loaded['Close'].to_numpy(), data['Close'].to_numpy())):
+            raise AssertionError(f"LocalFileProvider читает {fmt} не так, как он был записан")
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main():
+    data = make_minute_bars()
+    print(f"Синтетический набор: {len(data)} минутных баров, {data.index[0].year}-{data.index[-1].year}")
+    print(f"{'формат':<22} {'запись, с':>10} {'чтение, с':>10} {'Close, с':>9} {'размер, МБ':>11}")
+
+    root = tempfile.mkdtemp()
+    try:
+        check_local_provider(data.iloc[:10_000], root)
+
+        # Базовый вариант: один CSV с разделителем ';', как пишет export_data_to_csv
+        csv_path = os.path.join(root, 'data.csv')
+        _, write_time = timed(data.to_csv, csv_path, sep=';', index=True)
+        _, read_time = timed(pd.read_csv, csv_path, sep=';', index_col=0)
+        _, column_time = timed(pd.read_csv, csv_path, sep=';', usecols=['Datetime', 'Close'])
+        print(f"{'csv (export_data_to_csv)':<22} {write_time:>10.2f} {read_time:>10.2f} {column_time:>9.2f} "
+              f"{os.path.getsize(csv_path) / 2 ** 20:>11.1f}")
+
+        for fmt in exporters.EXPORTERS:
+            for partitioned in (False, True):
+                directory = os.path.join(root, 'partitioned' if partitioned else 'single')
+                _, write_time = timed(exporters.export_data, data, 'SYNTH', fmt, directory, partitioned)
+                loaded, read_time = timed(exporters.load_data, 'SYNTH', fmt, directory)
+                _, column_time = timed(exporters.load_data, 'SYNTH', fmt, directory, columns=['Close'])
+                if not np.allclose(loaded['Close'].to_numpy(), data['Close'].to_numpy()):
+                    raise AssertionError(f"Данные после чтения {fmt} не совпадают с исходными")
+                size = directory_size(os.path.join(directory, fmt))
+                name = f"{fmt}{' по годам' if partitioned else ''}"
+                print(f"{name:<22} {write_time:>10.2f} {read_time:>10.2f} {column_time:>9.2f} {size / 2 ** 20:>11.1f}")
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+import data_download as dd
+import indicators
+
+
+def make_prices(rows, seed=0):
+    """Синтетический ряд цен (случайное блуждание) с дневным индексом."""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, rows)))
+    index = pd.date_range('2000-01-01', periods=rows, freq='min')
+    return pd.DataFrame({'Close': close}, index=index)
+
+
+def run_functions(data):
+    """Текущая цепочка функций data_download, как в main.py."""
+    data = dd.add_moving_average(data)
+    data = dd.calculate_macd(data)
+    data = dd.calculate_rsi(data)
+    data = dd.calculate_standard_deviation(data)
+    return data
+
+
+def check_equal(data, label):
+    """
+    Сравнивает indicators.compute_indicators с цепочкой функций data_download. Скользящие функции pandas
+    накапливают ошибку округления вдоль ряда, поэтому абсолютный допуск берем относительно масштаба цен.
+    """
+    columns = ['Moving_Average', 'MACD', 'Signal_Line', 'RSI', 'Standard_Deviation']
+    expected = run_functions(data.copy())[columns]
+    actual = indicators.compute_indicators(data)[columns]
+    atol = 1e-9 * data['Close'].abs().max()
+    for column in columns:
+        if not np.allclose(expected[column], actual[column], rtol=1e-9, atol=atol, equal_nan=True):
+            raise AssertionError(f"Расхождение в колонке {column}: {label}")
+
+
+def best_time(func, data, repeat):
+    times = []
+    for _ in range(repeat):
+        frame = data.copy()
+        start = time.perf_counter()
+        func(frame)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    print(f"{'строк':>10} {'data_download, с':>18} {'indicators, с':>15} {'ускорение':>10}")
+    for rows in (1_000, 100_000, 1_000_000):
+        data = make_prices(rows)
+
+        check_equal(data, f"{rows} строк")
+        # Пропуски в ценах: NaN только в окнах с пропуском
+        gaps = data.copy()
+        gaps.iloc[[len(gaps) // 3, len(gaps) // 3 + 1, len(gaps) // 2], 0] = np.nan
+        check_equal(gaps, f"{rows} строк с пропусками")
+
+        repeat = 5 if rows < 1_000_000 else 2
+        old = best_time(run_functions, data, repeat)
+        new = best_time(indicators.compute_indicators, data, repeat)
+        print(f"{rows:>10} {old:>18.4f} {new:>15.4f} {old / new:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
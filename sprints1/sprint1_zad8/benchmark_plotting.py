@@ -0,0 +1,60 @@
+import os
+import time
+import shutil
+import tempfile
+
+import matplotlib
+matplotlib.use('Agg')
+
+import numpy as np
+import pandas as pd
+
+import batch
+import data_plotting as dplt
+from batch_plotting import ChartRenderer, render_charts
+
+
+def make_datasets(count, rows=252, seed=0):
+    """Синтетические дневные данные с индикаторами для count тикеров."""
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range('2023-01-02', periods=rows, tz='America/New_York')
+    datasets = {}
+    for i in range(count):
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, rows)))
+        datasets[f"T{i:04d}"] = batch.apply_indicators(pd.DataFrame({'Close': close}, index=index))
+    return datasets
+
+
+def main(count=48, style='ggplot'):
+    datasets = make_datasets(count)
+    workdir = tempfile.mkdtemp()
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        start = time.perf_counter()
+        for ticker, data in datasets.items():
+            dplt.create_and_save_plot(data, ticker, 'period', style)
+        baseline = time.perf_counter() - start
+
+        start = time.perf_counter()
+        renderer = ChartRenderer(style)
+        for ticker, data in datasets.items():
+            renderer.render(data, ticker, 'period')
+        reused = time.perf_counter() - start
+
+        start = time.perf_counter()
+        render_charts(datasets, 'period', style)
+        pooled = time.perf_counter() - start
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir)
+
+    print(f"Графиков: {count}, процессов: {os.cpu_count()}")
+    print(f"{'вариант':<34} {'графиков/с':>11}")
+    print(f"{'create_and_save_plot':<34} {count / baseline:>11.1f}")
+    print(f"{'ChartRenderer (один процесс)':<34} {count / reused:>11.1f}")
+    print(f"{'render_charts (пул процессов)':<34} {count / pooled:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,448 @@
+import os
+import sys
+import json
+import argparse
+import contextlib
+from datetime import date, datetime
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import data_download as dd
+import data_plotting as dplt
+import indicators
+import exporters
+import screener
+import dashboard
+import correlation
+from batch import read_tickers
+from batch_plotting import ChartRenderer, is_valid_style
+from data_cache import StockDataCache, PERIODS, INTERVALS
+from compact import compact_prices, memory_usage, memory_report
+from providers import PROVIDERS, get_provider
+from resample import TIMEFRAMES, TimeframeCache
+from profiling import Profiler
+from indicator_store import IndicatorStore
+
+
+# Коды завершения
+EXIT_OK = 0          # все тикеры обработаны
+EXIT_PARTIAL = 1     # часть тикеров завершилась ошибкой
+EXIT_USAGE = 2       # ошибка в аргументах или конфигурации
+EXIT_FAILED = 3      # ни один тикер не обработан
+
+STAGES = ('fetch', 'indicators', 'alerts', 'plot', 'export')
+OUTPUTS = ('png', 'plotly', 'bokeh', 'dashboard', 'heatmap', 'csv') + tuple(exporters.EXPORTERS)
+DEFAULT_OUTPUTS = ['png', 'csv']
+
+# Значения по умолчанию для параметров, которые можно задать и в конфигурации, и в командной строке
+DEFAULTS = {
+    'tickers': [],
+    'tickers_file': None,
+    'period': None,
+    'start': None,
+    'end': None,
+    'interval': '1d',
+    'timeframe': None,
+    'indicators': [name for name, _ in indicators.DEFAULT_INDICATORS],
+    'threshold': 5.0,
+    'window': None,
+    'style': 'default',
+    'max_points': None,
+    'outputs': DEFAULT_OUTPUTS,
+    'output_dir': 'plotfiles',
+    'cache': True,
+    'provider': 'yfinance',
+    'data_dir': None,
+    'csv_sep': None,
+    'seed': 0,
+    'workers': 8,
+    'compact': False,
+    'incremental': False,
+    'indicator_store': None,
+    'summary': None,
+    'profile': None,
+    'profile_dump': None,
+    'trace_memory': False,
+}
+
+
+class ConfigError(Exception):
+    """Ошибка в аргументах командной строки или в файле конфигурации."""
+
+
+def _split(value):
+    if value is None or isinstance(value, list):
+        return value
+    return [item for item in value.replace(',', ' ').split() if item]
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='main.py',
+        description="Загрузка котировок, расчет индикаторов, уведомления о колебаниях, графики и экспорт "
+                    "без интерактивного ввода. Сводка по времени этапов выводится в stdout в формате JSON, "
+                    "остальные сообщения - в stderr.",
+        argument_default=argparse.SUPPRESS)
+    parser.add_argument('tickers', nargs='*', help="тикеры, например AAPL MSFT")
+    parser.add_argument('-c', '--config', help="файл конфигурации JSON или TOML с теми же параметрами")
+    parser.add_argument('-f', '--tickers-file', help="файл со списком тикеров (как в пакетном режиме)")
+    parser.add_argument('-p', '--period', help="период данных: 1d, 5d, 1mo, 3mo, 6mo, 1y, 2y, 5y, 10y, ytd, max")
+    parser.add_argument('--start', help="дата начала в формате дд-мм-гггг или гггг-мм-дд")
+    parser.add_argument('--end', help="дата окончания в формате дд-мм-гггг или гггг-мм-дд")
+    parser.add_argument('--interval', help="интервал загружаемых баров: 1d (по умолчанию), 1h, 5m, 1m и т.д.")
+    parser.add_argument('--timeframe', choices=list(TIMEFRAMES),
+                        help="агрегировать загруженные бары в этот таймфрейм перед расчетом индикаторов")
+    parser.add_argument('-i', '--indicators', type=_split,
+                        help=f"индикаторы через запятую: {', '.join(indicators.INDICATORS)} (по умолчанию все)")
+    parser.add_argument('-t', '--threshold', type=float, help="порог колебания цены в процентах (по умолчанию 5)")
+    parser.add_argument('-w', '--window', type=int, help="окно в барах для поиска колебаний внутри периода")
+    parser.add_argument('-s', '--style', help="стиль графиков matplotlib")
+    parser.add_argument('--max-points', type=int, help="прореживать ряды на графиках до этого числа точек")
+    parser.add_argument('-o', '--outputs', type=_split,
+                        help=f"результаты через запятую: {', '.join(OUTPUTS)} (по умолчанию png,csv)")
+    parser.add_argument('-d', '--output-dir', help="каталог для результатов (по умолчанию plotfiles)")
+    parser.add_argument('--provider', choices=list(PROVIDERS),
+                        help="источник котировок: yfinance (по умолчанию), local (файлы из --data-dir), synthetic")
+    parser.add_argument('--data-dir', help="каталог с файлами <тикер>.parquet/.csv для провайдера local")
+    parser.add_argument('--csv-sep', help="разделитель CSV для провайдера local (по умолчанию по заголовку файла)")
+    parser.add_argument('--seed', type=int, help="зерно синтетических данных (по умолчанию 0)")
+    parser.add_argument('--no-cache', dest='cache', action='store_false', help="не использовать локальный кэш котировок")
+    parser.add_argument('--workers', type=int, help="число потоков загрузки (по умолчанию 8)")
+    parser.add_argument('--compact', action='store_true',
+                        help="компактные типы: только OHLCV, float32 где позволяет точность, индикаторы в float32")
+    parser.add_argument('--incremental', action='store_true',
+                        help="csv: один постоянный файл на тикер, дописываются только новые и изменившиеся строки")
+    parser.add_argument('--indicator-store',
+                        help="каталог хранилища индикаторов: при тех же ценах индикаторы не пересчитываются")
+    parser.add_argument('--summary', help="дополнительно сохранить JSON-сводку в файл")
+    parser.add_argument('--profile', help="сохранить профиль этапов (время, CPU, память по этапам и тикерам) в JSON")
+    parser.add_argument('--trace-memory', action='store_true', help="точный пик памяти по этапам через tracemalloc")
+    parser.add_argument('--profile-dump', help="каталог для дампов cProfile и tracemalloc по этапам")
+    return parser
+
+
+def load_config(path):
+    """
+    Описание: Читает файл конфигурации. Формат определяется по расширению: .toml или .json.
+    Ключи совпадают с длинными параметрами командной строки (дефисы можно заменять подчеркиванием).
+
+    Параметры:
+    path (str): путь к файлу.
+
+    Возвращает: словарь параметров.
+    """
+    try:
+        if path.endswith('.toml'):
+            import tomllib
+            with open(path, 'rb') as f:
+                config = tomllib.load(f)
+        else:
+            with open(path, encoding='utf-8') as f:
+                config = json.load(f)
+    except (OSError, ValueError) as e:
+        raise ConfigError(f"Не удалось прочитать конфигурацию {path}: {e}")
+
+    config = {key.replace('-', '_'): value for key, value in config.items()}
+    unknown = set(config) - set(DEFAULTS)
+    if unknown:
+        raise ConfigError(f"Неизвестные параметры в {path}: {', '.join(sorted(unknown))}")
+    return config
+
+
+def _parse_date(value):
+    if value is None or isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    for fmt in ('%d-%m-%Y', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            pass
+    raise ConfigError(f"Некорректная дата: {value}")
+
+
+def _parse_indicators(spec):
+    """
+    Индикаторы задаются именами (параметры берутся из DEFAULT_INDICATORS) или, в конфигурации,
+    парами [имя, {параметры}].
+    """
+    defaults = dict(indicators.DEFAULT_INDICATORS)
+    result = []
+    for item in spec:
+        name, params = (item, defaults.get(item, {})) if isinstance(item, str) else item
+        if name not in indicators.INDICATORS:
+            raise ConfigError(f"Неизвестный индикатор: {name}. Доступны: {', '.join(indicators.INDICATORS)}")
+        result.append((name, dict(params)))
+    return result
+
+
+def resolve_options(argv=None):
+    """
+    Описание: Собирает параметры запуска: значения по умолчанию, затем файл конфигурации,
+    затем аргументы командной строки. Проверяет их согласованность.
+
+    Параметры:
+    argv (list): аргументы командной строки (по умолчанию sys.argv[1:]).
+
+    Возвращает: словарь параметров с разобранными датами, индикаторами и списком тикеров.
+    """
+    args = vars(build_parser().parse_args(argv))
+    options = dict(DEFAULTS)
+    if 'config' in args:
+        options.update(load_config(args.pop('config')))
+    options.update(args)
+
+    tickers = [t.upper() for t in _split(options['tickers']) or []]
+    if options['tickers_file']:
+        try:
+            tickers += read_tickers(options['tickers_file'])
+        except OSError as e:
+            raise ConfigError(f"Не удалось прочитать список тикеров: {e}")
+    options['tickers'] = list(dict.fromkeys(tickers))
+    if not options['tickers']:
+        raise ConfigError("Не указан ни один тикер")
+
+    options['start'] = _parse_date(options['start'])
+    options['end'] = _parse_date(options['end'])
+    if (options['start'] is None) != (options['end'] is None):
+        raise ConfigError("Даты начала и окончания задаются вместе")
+    if options['start'] is not None:
+        if options['period']:
+            raise ConfigError("Укажите либо период, либо даты начала и окончания")
+        if options['end'] < options['start']:
+            raise ConfigError("Дата окончания должна быть позже даты начала")
+    elif not options['period']:
+        raise ConfigError("Укажите период или даты начала и окончания")
+    elif options['period'] not in PERIODS:
+        raise ConfigError(f"Неизвестный период: {options['period']}. Доступны: {', '.join(PERIODS)}")
+    if options['interval'] not in INTERVALS:
+        raise ConfigError(f"Неизвестный интервал: {options['interval']}. Доступны: {', '.join(INTERVALS)}")
+
+    if options['timeframe'] is not None and options['timeframe'] not in TIMEFRAMES:
+        raise ConfigError(f"Неизвестный таймфрейм: {options['timeframe']}. Доступны: {', '.join(TIMEFRAMES)}")
+    if options['timeframe'] is not None and options['interval'] not in TIMEFRAMES:
+        raise ConfigError(f"Агрегация возможна только из интервалов {', '.join(TIMEFRAMES)}")
+    if options['timeframe'] is not None and TIMEFRAMES[options['timeframe']][0] < TIMEFRAMES[options['interval']][0]:
+        raise ConfigError(f"Таймфрейм {options['timeframe']} мельче интервала данных {options['interval']}")
+
+    if options['window'] is not None and options['window'] < 1:
+        raise ConfigError("Длина окна должна быть положительной")
+
+    if not is_valid_style(options['style']):
+        raise ConfigError(f"Неизвестный стиль графиков: {options['style']}")
+
+    if options['provider'] not in PROVIDERS:
+        raise ConfigError(f"Неизвестный провайдер: {options['provider']}. Доступны: {', '.join(PROVIDERS)}")
+    if options['provider'] == 'local' and not options['data_dir']:
+        raise ConfigError("Для провайдера local укажите каталог с данными (--data-dir)")
+
+    options['indicators'] = _parse_indicators(_split(options['indicators']))
+    options['outputs'] = _split(options['outputs'])
+    unknown = set(options['outputs']) - set(OUTPUTS)
+    if unknown:
+        raise ConfigError(f"Неизвестные результаты: {', '.join(sorted(unknown))}. Доступны: {', '.join(OUTPUTS)}")
+    return options
+
+
+def _make_provider(options):
+    if options['provider'] == 'local':
+        return get_provider('local', directory=options['data_dir'], sep=options['csv_sep'])
+    if options['provider'] == 'synthetic':
+        return get_provider('synthetic', seed=options['seed'])
+    return get_provider('yfinance')
+
+
+def _fetch(profiler, ticker, fetch_kwargs, compact):
+    # В компактном режиме исходный DataFrame не хранится: запоминается только его объем для отчета
+    with profiler.stage('fetch', ticker):
+        data = dd.fetch_stock_data(ticker, **fetch_kwargs)
+        if compact:
+            return compact_prices(data), memory_usage(data)
+        return data, None
+
+
+def run_pipeline(options, profiler=None):
+    """
+    Описание: Выполняет весь конвейер без интерактивного ввода: загрузка котировок (в пуле потоков),
+    расчет индикаторов, скрининг колебаний, графики и экспорт. Ошибка по тикеру записывается в сводку
+    и не прерывает обработку остальных. Каждый этап и каждый тикер измеряются профайлером.
+
+    Параметры:
+    options (dict): параметры из resolve_options.
+    profiler (Profiler): профайлер этапов (по умолчанию создается новый без tracemalloc).
+
+    Возвращает: словарь-сводку со статусом по тикерам, уведомлениями и временем этапов в секундах.
+    """
+    if profiler is None:
+        profiler = Profiler()
+    tickers = options['tickers']
+    period = options['period'] or 'custom'
+    directory = options['output_dir']
+    outputs = options['outputs']
+    status = {ticker: {'status': 'ok', 'rows': 0, 'error': None} for ticker in tickers}
+    # Ошибки результатов по всем тикерам сразу (дашборд, тепловая карта)
+    errors = {}
+    os.makedirs(directory, exist_ok=True)
+
+    def fail(ticker, stage, error):
+        status[ticker].update(status=f"{stage}_error", error=f"{type(error).__name__}: {error}")
+
+    def fail_output(output, error):
+        errors[output] = f"{type(error).__name__}: {error}"
+
+    # Загрузка: сетевой ввод-вывод, поэтому в пуле потоков. Кэш нужен только для сетевого источника
+    provider = _make_provider(options)
+    cache = StockDataCache() if options['cache'] and options['provider'] == 'yfinance' else None
+    fetch_kwargs = {'start_date': options['start'], 'end_date': options['end'],
+                    'period': options['period'], 'cache': cache, 'provider': provider,
+                    'interval': options['interval']}
+    raw, sizes = {}, {}
+    with profiler.stage('fetch'), ThreadPoolExecutor(max_workers=options['workers']) as threads:
+        futures = {ticker: threads.submit(_fetch, profiler, ticker, fetch_kwargs, options['compact'])
+                   for ticker in tickers}
+        for ticker, future in futures.items():
+            try:
+                data, original_size = future.result()
+            except Exception as e:
+                fail(ticker, 'fetch', e)
+                continue
+            status[ticker]['rows'] = len(data)
+            if data.empty:
+                status[ticker].update(status='no_data', error='нет данных за выбранный период')
+            else:
+                raw[ticker] = data
+                sizes[ticker] = original_size
+
+    results = {}
+    dtype = np.float32 if options['compact'] else np.float64
+    store = IndicatorStore(options['indicator_store']) if options['indicator_store'] else None
+    with profiler.stage('indicators'):
+        # Котировки забираются из raw: после объединения с индикаторами в памяти остается только results
+        for ticker in list(raw):
+            data = raw.pop(ticker)
+            try:
+                with profiler.stage('indicators', ticker):
+                    if options['timeframe'] and options['timeframe'] != options['interval']:
+                        data = TimeframeCache(data, options['interval']).get(options['timeframe'])
+                    if store is not None:
+                        key = f"{ticker}_{options['timeframe'] or options['interval']}"
+                        block = store.compute(key, data, options['indicators'], dtype)
+                    else:
+                        block = indicators.compute_indicators(data, options['indicators'], dtype)
+                    results[ticker] = pd.concat([data.drop(columns=block.columns, errors='ignore'), block], axis=1)
+            except Exception as e:
+                fail(ticker, 'indicators', e)
+                continue
+            if options['compact']:
+                # Сравнивается то, что действительно хранится: итоговая таблица против исходных данных
+                # с индикаторами в float64
+                before = sizes[ticker] + block.shape[0] * block.shape[1] * np.dtype(np.float64).itemsize
+                status[ticker]['memory'] = memory_report(before, results[ticker])
+
+    alerts = []
+    if results:
+        with profiler.stage('alerts'):
+            windows = (None,) if options['window'] is None else (None, options['window'])
+            table = screener.screen_fluctuations(screener.build_close_panel(results), windows,
+                                                 (options['threshold'],), alerts_only=True)
+            table['peak_date'] = table['peak_date'].astype(str)
+            alerts = table.to_dict('records')
+
+    with profiler.stage('plot'):
+        renderer = ChartRenderer(options['style'], directory) if 'png' in outputs else None
+        for ticker, data in results.items():
+            # Графики рассчитаны на полный набор индикаторов; недостающие ряды остаются пустыми
+            plot_data = data.reindex(columns=data.columns.union(dplt.PLOT_COLUMNS, sort=False))
+            try:
+                # Время каждого вида графиков по тикеру записывается отдельно: png, plotly, bokeh
+                if renderer is not None:
+                    with profiler.stage('png', ticker):
+                        path = renderer.render(plot_data, ticker, period, max_points=options['max_points'])
+                    print(f"График сохранен как {path}")
+                if 'plotly' in outputs:
+                    with profiler.stage('plotly', ticker):
+                        dplt.create_interactive_plotly(plot_data, ticker, options['max_points'], directory)
+                if 'bokeh' in outputs:
+                    with profiler.stage('bokeh', ticker):
+                        dplt.create_interactive_bokeh(plot_data.copy(), ticker, options['max_points'], directory)
+            except Exception as e:
+                fail(ticker, 'plot', e)
+        if 'dashboard' in outputs and results:
+            try:
+                dashboard.create_dashboard(results, directory=directory, max_points=options['max_points'])
+            except Exception as e:
+                fail_output('dashboard', e)
+        if 'heatmap' in outputs and len(results) >= 2:
+            try:
+                corr = correlation.correlation_matrix(correlation.returns_panel(results))
+                dplt.create_correlation_heatmap(corr, filename=f"correlation_{period}.png", directory=directory)
+            except Exception as e:
+                fail_output('heatmap', e)
+
+    with profiler.stage('export'):
+        for ticker, data in results.items():
+            try:
+                with profiler.stage('export', ticker):
+                    if 'csv' in outputs:
+                        dd.export_data_to_csv(data, ticker, period, directory, options['incremental'])
+                    for fmt in exporters.EXPORTERS:
+                        if fmt in outputs:
+                            exporters.export_data(data, ticker, fmt, os.path.join(directory, 'datasets'))
+            except Exception as e:
+                fail(ticker, 'export', e)
+
+    failed = [ticker for ticker, entry in status.items() if entry['status'] != 'ok']
+    if not failed and not errors:
+        exit_code = EXIT_OK
+    elif len(failed) < len(tickers):
+        exit_code = EXIT_PARTIAL
+    else:
+        exit_code = EXIT_FAILED
+
+    profile = profiler.summary()
+    timings = {ticker: {name: entry['wall'] for name, entry in stages.items()}
+               for ticker, stages in profile['tickers'].items()}
+    return {
+        'exit_code': exit_code,
+        'tickers': {ticker: {**entry, 'timings': timings.get(ticker, {})} for ticker, entry in status.items()},
+        'alerts': alerts,
+        'errors': errors,
+        'timings': {**dict.fromkeys(STAGES, 0.0),
+                    **{name: entry['wall'] for name, entry in profile['stages'].items()},
+                    'total': profile['total']['wall']},
+    }
+
+
+def main(argv=None):
+    """
+    Точка входа командной строки. Возвращает код завершения (EXIT_*).
+    """
+    try:
+        options = resolve_options(argv)
+    except ConfigError as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return EXIT_USAGE
+
+    # Сообщения функций конвейера уходят в stderr, чтобы stdout содержал только JSON-сводку
+    profiler = Profiler(options['trace_memory'], options['profile_dump'])
+    with contextlib.redirect_stdout(sys.stderr):
+        summary = run_pipeline(options, profiler)
+    profile = options['profile']
+    if profile is None and options['profile_dump']:
+        profile = os.path.join(options['profile_dump'], 'profile.json')
+    if profile:
+        profiler.write_json(profile)
+
+    text = json.dumps(summary, ensure_ascii=False, indent=2, default=str)
+    if options['summary']:
+        with open(options['summary'], 'w', encoding='utf-8') as f:
+            f.write(text)
+    print(text)
+    return summary['exit_code']
+
+
+if __name__ == "__main__":
+    sys.exit(main())
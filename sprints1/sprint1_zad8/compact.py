@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+
+
+# Колонки котировок, которые используются дальше (Dividends и Stock Splits из yfinance не нужны)
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# Шаг цены по умолчанию: float32 допускается, если ошибка округления меньше половины шага
+PRICE_TICK = 1e-4
+
+
+def memory_usage(data, index=True):
+    """Объем памяти DataFrame в байтах (с учетом индекса, если index=True)."""
+    return int(data.memory_usage(index=index, deep=True).sum())
+
+
+def _fits_float32(values, tick):
+    converted = values.astype(np.float32)
+    if not np.array_equal(np.isfinite(converted), np.isfinite(values)):
+        return False
+    finite = np.isfinite(values)
+    return bool(np.all(np.abs(converted[finite].astype(np.float64) - values[finite]) <= tick / 2))
+
+
+def compact_prices(data, columns=PRICE_COLUMNS, tick=PRICE_TICK):
+    """
+    Описание: Компактное представление котировок для длинной истории: остаются только нужные колонки,
+    вещественные колонки переводятся в float32, если ошибка округления по каждому значению не превышает
+    половины шага цены tick (иначе остаются float64), целые (Volume) - в наименьший подходящий целый тип.
+    Для цен до нескольких сотен при шаге 0.0001 float32 точен; для дорогих акций проверка оставит float64.
+
+    Параметры:
+    data (DataFrame): данные от fetch_stock_data.
+    columns (list): колонки, которые нужно оставить (отсутствующие в data пропускаются).
+    tick (float): шаг цены, определяющий допустимую ошибку float32.
+
+    Возвращает: новый DataFrame с тем же индексом.
+    """
+    result = {}
+    for column in columns:
+        if column not in data.columns:
+            continue
+        series = data[column]
+        if pd.api.types.is_float_dtype(series.dtype):
+            values = series.to_numpy(dtype=np.float64)
+            if _fits_float32(values, tick):
+                series = pd.Series(values.astype(np.float32), index=data.index, name=column)
+        elif pd.api.types.is_integer_dtype(series.dtype):
+            series = pd.to_numeric(series, downcast='unsigned' if series.min() >= 0 else 'integer')
+        result[column] = series
+    return pd.DataFrame(result, index=data.index)
+
+
+def memory_report(original, prices, block=None):
+    """
+    Описание: Сравнивает объем памяти исходных данных и компактного представления.
+    Исходный объем - данные от fetch_stock_data плюс колонки индикаторов в float64 (так их добавляют
+    функции data_download), компактный - компактные котировки плюс отдельный блок индикаторов
+    (индекс у блока общий с котировками и не учитывается повторно).
+
+    Параметры:
+    original (DataFrame или int): исходные данные или их объем в байтах (memory_usage).
+    prices (DataFrame): результат compact_prices.
+    block (DataFrame): блок индикаторов (необязательно).
+
+    Возвращает: словарь с ключами before, after, saved (байты) и ratio (во сколько раз меньше).
+    """
+    before = original if isinstance(original, int) else memory_usage(original)
+    after = memory_usage(prices)
+    if block is not None:
+        before += block.shape[0] * block.shape[1] * np.dtype(np.float64).itemsize
+        after += memory_usage(block, index=False)
+    return {'before': before, 'after': after, 'saved': before - after, 'ratio': before / after if after else None}
+
+
+def print_memory_report(report, ticker=None):
+    """Выводит в консоль экономию памяти из memory_report."""
+    prefix = f"{ticker}: " if ticker else ""
+    print(f"{prefix}память {report['before'] / 2 ** 20:.2f} МБ -> {report['after'] / 2 ** 20:.2f} МБ, "
+          f"сэкономлено {report['saved'] / 2 ** 20:.2f} МБ (в {report['ratio']:.1f} раза меньше)")
@@ -0,0 +1,187 @@
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from screener import build_close_panel
+
+
+def returns_panel(datasets, log=False):
+    """
+    Описание: Доходности всех тикеров на общей сетке дат (даты x тикеры). Если у тикера нет бара
+    на дату, доходность на эту и следующую дату - NaN (пропуски не заполняются).
+
+    Параметры:
+    datasets (dict или DataFrame): словарь {тикер: DataFrame с 'Close'} или готовая панель цен закрытия.
+    log (bool): логарифмические доходности вместо простых.
+
+    Возвращает: DataFrame доходностей без первой даты.
+    """
+    panel = build_close_panel(datasets) if isinstance(datasets, dict) else datasets
+    close = panel.to_numpy(dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = np.log(close[1:] / close[:-1]) if log else close[1:] / close[:-1] - 1
+    return pd.DataFrame(returns, index=panel.index[1:], columns=panel.columns)
+
+
+class _Moments:
+    """
+    Попарные суммы по общим наблюдениям двух тикеров, из которых считаются ковариация и корреляция:
+    n[i, j] - число дат, где есть оба тикера; sx[i, j] - сумма x_i по этим датам; sxx[i, j] - сумма x_i^2;
+    sxy[i, j] - сумма x_i * x_j. Пропуски обнуляются, а маска наличия учитывается матричным умножением,
+    поэтому все N^2 пар считаются пятью умножениями матриц без цикла по парам.
+    """
+
+    def __init__(self, size):
+        self.n = np.zeros((size, size))
+        self.sx = np.zeros((size, size))
+        self.sxx = np.zeros((size, size))
+        self.sxy = np.zeros((size, size))
+
+    @staticmethod
+    def prepare(returns):
+        returns = np.atleast_2d(np.asarray(returns, dtype=np.float64))
+        mask = np.isfinite(returns)
+        return np.where(mask, returns, 0.0), mask.astype(np.float64)
+
+    def add(self, x, mask, weights=None):
+        """
+        Добавляет строки доходностей x с маской наличия mask. weights - вес каждой строки
+        (1 - добавить, -1 - вычесть); добавление и вычитание строк выполняется одним умножением матриц.
+        """
+        wx, wmask = (x, mask) if weights is None else (x * weights[:, None], mask * weights[:, None])
+        for total, product in ((self.n, wmask.T @ mask), (self.sx, wx.T @ mask),
+                               (self.sxx, (wx * x).T @ mask), (self.sxy, wx.T @ x)):
+            total += product
+
+    def covariance(self, min_periods):
+        n = self.n
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cov = (self.sxy - self.sx * self.sx.T / n) / (n - 1)
+        cov[n < max(min_periods, 2)] = np.nan
+        return cov
+
+    def correlation(self, min_periods):
+        n = self.n
+        with np.errstate(divide='ignore', invalid='ignore'):
+            numerator = n * self.sxy - self.sx * self.sx.T
+            variance = n * self.sxx - self.sx * self.sx
+            corr = numerator / np.sqrt(np.maximum(variance, 0) * np.maximum(variance.T, 0))
+        corr[n < max(min_periods, 2)] = np.nan
+        np.clip(corr, -1.0, 1.0, out=corr)
+        return corr
+
+
+def covariance_matrix(returns, min_periods=2):
+    """
+    Описание: Матрица ковариаций доходностей по всем парам тикеров (по общим датам каждой пары,
+    как DataFrame.cov), посчитанная матричными умножениями NumPy.
+
+    Параметры:
+    returns (DataFrame): доходности, даты x тикеры (см. returns_panel).
+    min_periods (int): минимальное число общих наблюдений пары, иначе NaN.
+
+    Возвращает: DataFrame N x N.
+    """
+    moments = _Moments(returns.shape[1])
+    moments.add(*_Moments.prepare(returns.to_numpy()))
+    return pd.DataFrame(moments.covariance(min_periods), index=returns.columns, columns=returns.columns)
+
+
+def correlation_matrix(returns, min_periods=2):
+    """
+    Описание: Матрица корреляций Пирсона доходностей по всем парам тикеров (по общим датам каждой пары,
+    как DataFrame.corr), посчитанная матричными умножениями NumPy. Для 1000 и более тикеров не создаются
+    отдельные Series на каждую пару.
+
+    Параметры:
+    returns (DataFrame): доходности, даты x тикеры (см. returns_panel).
+    min_periods (int): минимальное число общих наблюдений пары, иначе NaN.
+
+    Возвращает: DataFrame N x N.
+    """
+    moments = _Moments(returns.shape[1])
+    moments.add(*_Moments.prepare(returns.to_numpy()))
+    return pd.DataFrame(moments.correlation(min_periods), index=returns.columns, columns=returns.columns)
+
+
+class RollingCorrelation:
+    """
+    Описание: Скользящие матрицы ковариаций и корреляций по последним window барам с обновлением
+    за O(N^2) на новый бар: в суммы добавляется внешнее произведение новой строки доходностей и
+    вычитается строка, вышедшая из окна. Чтобы ошибки округления не накапливались, каждые window
+    обновлений суммы пересчитываются заново по строкам окна.
+
+    Параметры:
+    tickers (list): тикеры в порядке столбцов.
+    window (int): длина окна в барах.
+    min_periods (int): минимальное число общих наблюдений пары в окне (по умолчанию window // 2).
+    """
+
+    def __init__(self, tickers, window, min_periods=None):
+        self.tickers = list(tickers)
+        self.window = window
+        self.min_periods = window // 2 if min_periods is None else min_periods
+        self.rows = deque()
+        self.moments = _Moments(len(self.tickers))
+        self.updates = 0
+
+    def seed(self, returns):
+        """Заполняет окно последними window строками доходностей (DataFrame или ndarray) одним расчетом."""
+        values = returns.to_numpy() if isinstance(returns, pd.DataFrame) else np.asarray(returns)
+        x, mask = _Moments.prepare(values[-self.window:])
+        self.rows = deque(zip(x, mask))
+        self.moments = _Moments(len(self.tickers))
+        self.moments.add(x, mask)
+        self.updates = 0
+
+    def update(self, row):
+        """Добавляет строку доходностей нового бара (NaN - нет данных по тикеру)."""
+        x, mask = _Moments.prepare(row)
+        self.rows.append((x[0], mask[0]))
+        if len(self.rows) > self.window:
+            # Новая строка входит в окно, старая выходит: одно обновление ранга 2
+            old_x, old_mask = self.rows.popleft()
+            self.moments.add(np.vstack((x, old_x)), np.vstack((mask, old_mask)), np.array([1.0, -1.0]))
+        else:
+            self.moments.add(x, mask)
+
+        self.updates += 1
+        if self.updates >= self.window:
+            x, mask = np.array([r[0] for r in self.rows]), np.array([r[1] for r in self.rows])
+            self.moments = _Moments(len(self.tickers))
+            self.moments.add(x, mask)
+            self.updates = 0
+
+    def covariance(self):
+        """Матрица ковариаций по текущему окну (DataFrame N x N)."""
+        return pd.DataFrame(self.moments.covariance(self.min_periods), index=self.tickers, columns=self.tickers)
+
+    def correlation(self):
+        """Матрица корреляций по текущему окну (DataFrame N x N)."""
+        return pd.DataFrame(self.moments.correlation(self.min_periods), index=self.tickers, columns=self.tickers)
+
+
+def rolling_correlations(returns, window, step=1, min_periods=None):
+    """
+    Описание: Генератор скользящих матриц корреляций по истории доходностей. Матрицы не хранятся
+    все сразу (для N тикеров и T дат это T x N x N чисел), а выдаются по одной каждые step баров.
+
+    Параметры:
+    returns (DataFrame): доходности, даты x тикеры.
+    window (int): длина окна в барах.
+    step (int): шаг выдачи матриц в барах.
+    min_periods (int): минимальное число общих наблюдений пары в окне.
+
+    Возвращает: генератор пар (дата, DataFrame корреляций) начиная с первого полного окна.
+    """
+    rolling = RollingCorrelation(returns.columns, window, min_periods)
+    values = returns.to_numpy(dtype=np.float64)
+    if len(values) < window:
+        return
+    rolling.seed(values[:window])
+    yield returns.index[window - 1], rolling.correlation()
+    for i in range(window, len(values)):
+        rolling.update(values[i])
+        if (i - window + 1) % step == 0:
+            yield returns.index[i], rolling.correlation()
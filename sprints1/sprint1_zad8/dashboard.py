@@ -0,0 +1,157 @@
+import os
+import re
+import html
+import json
+import base64
+
+import numpy as np
+from plotly.offline import get_plotlyjs, get_plotlyjs_version
+
+from downsampling import downsample
+
+
+# Колонки дашборда и панели, на которых они выводятся (как в create_and_save_plot)
+DASHBOARD_PANELS = {
+    'Close': 'y', 'Moving_Average': 'y',
+    'Standard_Deviation': 'y2',
+    'RSI': 'y3',
+    'MACD': 'y4', 'Signal_Line': 'y4',
+}
+
+HTML_TEMPLATE = """<!DOCTYPE html>
+<html lang="ru">
+<head>
+<meta charset="utf-8">
+<title>__TITLE__</title>
+__PLOTLYJS__
+<style>
+body { font-family: sans-serif; margin: 16px; }
+#chart { width: 100%; height: 85vh; }
+</style>
+</head>
+<body>
+<label>Тикер: <select id="ticker"></select></label>
+<div id="chart"></div>
+__PAYLOADS__
+<script>
+const META = __META__;
+const loaded = {};
+
+// Данные тикера декодируются из base64 в типизированные массивы только при первом выборе
+function loadTicker(i) {
+    if (loaded[i]) return loaded[i];
+    const text = document.getElementById('payload-' + i).textContent.trim();
+    const binary = atob(text);
+    const bytes = new Uint8Array(binary.length);
+    for (let k = 0; k < binary.length; k++) bytes[k] = binary.charCodeAt(k);
+    const entry = META.tickers[i];
+    const n = entry.rows;
+    const series = {x: new Float64Array(bytes.buffer, 0, n)};
+    entry.columns.forEach(function (column, k) {
+        series[column] = new Float32Array(bytes.buffer, 8 * n + 4 * n * k, n);
+    });
+    loaded[i] = series;
+    return series;
+}
+
+function show(i) {
+    const entry = META.tickers[i];
+    const series = loadTicker(i);
+    const traces = entry.columns.map(function (column) {
+        return {x: series.x, y: series[column], name: column, mode: 'lines', yaxis: META.panels[column]};
+    });
+    const layout = {
+        title: {text: entry.ticker + ' Цена акций с течением времени'},
+        xaxis: {type: 'date', title: {text: 'Дата'}},
+        yaxis: {domain: [0.55, 1], title: {text: 'Цена'}},
+        yaxis2: {domain: [0.38, 0.52], title: {text: 'Std'}},
+        yaxis3: {domain: [0.19, 0.35], title: {text: 'RSI'}},
+        yaxis4: {domain: [0, 0.16], title: {text: 'MACD'}},
+        shapes: [70, 30].map(function (level) {
+            return {type: 'line', xref: 'paper', x0: 0, x1: 1, yref: 'y3', y0: level, y1: level,
+                    line: {dash: 'dash', color: level === 70 ? 'red' : 'green', width: 1}};
+        }),
+        legend: {orientation: 'h'}
+    };
+    Plotly.react('chart', traces, layout);
+}
+
+const select = document.getElementById('ticker');
+META.tickers.forEach(function (entry, i) {
+    const option = document.createElement('option');
+    option.value = i;
+    option.textContent = entry.ticker;
+    select.appendChild(option);
+});
+select.addEventListener('change', function () { show(Number(select.value)); });
+if (META.tickers.length) show(0);
+</script>
+</body>
+</html>
+"""
+
+
+def _encode_payload(data, columns):
+    """
+    Упаковывает ряды тикера в один двоичный буфер: время в миллисекундах (float64),
+    затем колонки в float32. Возвращает строку base64.
+    """
+    index = data.index
+    if getattr(index, 'tz', None) is not None:
+        index = index.tz_localize(None)
+    timestamps = index.to_numpy(dtype='datetime64[ms]').astype(np.int64).astype('<f8')
+    parts = [timestamps.tobytes()] + [data[column].to_numpy(dtype='<f4').tobytes() for column in columns]
+    return base64.b64encode(b''.join(parts)).decode('ascii')
+
+
+def create_dashboard(datasets, filename="dashboard.html", directory="plotfiles", max_points=None,
+                     include_plotlyjs=True, title="Биржевые данные"):
+    """
+    Описание: Создает один самодостаточный HTML-дашборд для набора тикеров вместо отдельных файлов
+    create_interactive_plotly и create_interactive_bokeh на каждый тикер. Библиотека Plotly подключается
+    один раз, а ряды каждого тикера хранятся компактным двоичным блоком (float64 для дат, float32 для
+    значений) и декодируются в типизированные массивы только при выборе тикера в списке.
+    Размер файла растет с объемом данных, а не с числом тикеров.
+
+    Параметры:
+    datasets (dict): словарь {тикер: DataFrame с ценами и индикаторами}.
+    filename (str): имя HTML-файла.
+    directory (str): каталог для сохранения.
+    max_points (int): прореживать каждый ряд до этого числа точек (по умолчанию без прореживания).
+    include_plotlyjs (bool или 'cdn'): встроить Plotly в файл или подключить с CDN.
+    title (str): заголовок страницы.
+
+    Возвращает: путь к сохраненному файлу.
+    """
+    meta = {'panels': DASHBOARD_PANELS, 'tickers': []}
+    payloads = []
+    for i, (ticker, data) in enumerate(datasets.items()):
+        columns = [column for column in DASHBOARD_PANELS if column in data.columns]
+        data = downsample(data, max_points, columns)
+        meta['tickers'].append({'ticker': ticker, 'rows': len(data), 'columns': columns})
+        payloads.append(f'<script type="application/octet-stream" id="payload-{i}">'
+                        f'{_encode_payload(data, columns)}</script>')
+
+    if include_plotlyjs == 'cdn':
+        plotlyjs = f'<script src="https://cdn.plot.ly/plotly-{get_plotlyjs_version()}.min.js"></script>'
+    else:
+        plotlyjs = f'<script type="text/javascript">{get_plotlyjs()}</script>'
+
+    # JSON вставляется в <script>: '<' экранируется, чтобы имя тикера не могло закрыть блок ('</script>')
+    # или открыть комментарий. Все заполнители подставляются за один проход, поэтому текст одной
+    # подстановки не принимается за другой заполнитель
+    values = {
+        'META': json.dumps(meta, ensure_ascii=False).replace('<', '\\u003c'),
+        'PAYLOADS': '\n'.join(payloads),
+        'TITLE': html.escape(title),
+        'PLOTLYJS': plotlyjs,
+    }
+    page = re.sub(r'__(META|PAYLOADS|TITLE|PLOTLYJS)__', lambda match: values[match.group(1)], HTML_TEMPLATE)
+
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+    filepath = os.path.join(directory, filename)
+    with open(filepath, 'w', encoding='utf-8') as f:
+        f.write(page)
+    print(f"Дашборд для {len(datasets)} тикеров сохранен как {filepath}")
+    return filepath
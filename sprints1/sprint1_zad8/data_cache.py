@@ -0,0 +1,200 @@
+import os
+import json
+from datetime import datetime, timedelta
+
+import pandas as pd
+import yfinance as yf
+
+
+# Каталог по умолчанию для локального кэша котировок
+CACHE_DIRECTORY = os.path.join("plotfiles", "cache")
+
+# Приблизительная длина предустановленных периодов yfinance в календарных днях
+PERIOD_DAYS = {
+    '1mo': 31, '3mo': 92, '6mo': 183,
+    '1y': 366, '2y': 731, '5y': 1827, '10y': 3653,
+}
+
+# Периоды yfinance в торговых днях: '5d' - последние 5 торговых дней, а не 5 календарных
+TRADING_DAY_PERIODS = {'1d': 1, '5d': 5}
+
+# Все предустановленные периоды и интервалы yfinance
+PERIODS = (*TRADING_DAY_PERIODS, *PERIOD_DAYS, 'ytd', 'max')
+INTERVALS = ('1m', '2m', '5m', '15m', '30m', '60m', '90m', '1h', '1d', '5d', '1wk', '1mo', '3mo')
+
+# Начало истории для периода 'max'
+MAX_PERIOD_START = datetime(1970, 1, 1)
+
+
+def yfinance_source(ticker, start_date, end_date, interval='1d'):
+    """
+    Источник данных по умолчанию: загружает котировки через yfinance за полуинтервал [start_date, end_date).
+    """
+    return yf.Ticker(ticker).history(start=start_date, end=end_date, interval=interval)
+
+
+def period_to_dates(period, now=None):
+    """
+    Описание: Переводит предустановленный период yfinance ('1mo', '1y', 'ytd', 'max' и т.д.)
+    в пару дат (начало, конец), чтобы запрос по периоду можно было обслужить из кэша.
+    Месячные и годовые периоды переводятся в календарные дни (PERIOD_DAYS). Для периодов в торговых
+    днях ('1d', '5d') возвращается окно с запасом на выходные и праздники; лишние дни отбрасывает trim_period.
+
+    Параметры:
+    period (str): временной период.
+    now (datetime): текущий момент (по умолчанию datetime.now()).
+
+    Возвращает: кортеж (start_date, end_date), конец не включается.
+    """
+    now = now or datetime.now()
+    end_date = datetime(now.year, now.month, now.day) + timedelta(days=1)
+    if period == 'max':
+        return MAX_PERIOD_START, end_date
+    if period == 'ytd':
+        return datetime(now.year, 1, 1), end_date
+    if period in TRADING_DAY_PERIODS:
+        return end_date - timedelta(days=2 * TRADING_DAY_PERIODS[period] + 7), end_date
+    if period not in PERIOD_DAYS:
+        raise ValueError(f"Неизвестный период: {period}")
+    return end_date - timedelta(days=PERIOD_DAYS[period]), end_date
+
+
+def trim_period(data, period):
+    """Для периодов в торговых днях ('1d', '5d') оставляет строки последних торговых дней, как yfinance."""
+    if period not in TRADING_DAY_PERIODS or data.empty:
+        return data
+    days = _naive_index(data).normalize()
+    return data[days >= days.unique()[-TRADING_DAY_PERIODS[period]:].min()]
+
+
+def _naive_index(data):
+    """Индекс DataFrame без часового пояса (для сравнения с датами диапазонов)."""
+    index = pd.DatetimeIndex(data.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return index
+
+
+def _merge_ranges(ranges):
+    """Объединяет пересекающиеся и смежные диапазоны [start, end)."""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def _missing_ranges(ranges, start_date, end_date):
+    """Возвращает части диапазона [start_date, end_date), которые еще не покрыты кэшем."""
+    missing = []
+    cursor = start_date
+    for start, end in ranges:
+        if end <= cursor:
+            continue
+        if start >= end_date:
+            break
+        if start > cursor:
+            missing.append((cursor, start))
+        cursor = max(cursor, end)
+    if cursor < end_date:
+        missing.append((cursor, end_date))
+    return missing
+
+
+class StockDataCache:
+    """
+    Описание: Постоянный локальный кэш исторических котировок в формате Parquet.
+
+    Для каждой пары (тикер, интервал) хранится один файл с данными и файл с уже загруженными
+    диапазонами дат. При запросе скачиваются только отсутствующие участки (хвост или пропуски),
+    после чего они объединяются с сохраненными данными.
+
+    Параметры:
+    directory (str): каталог кэша.
+    source (callable): функция source(ticker, start_date, end_date, interval), возвращающая DataFrame.
+    По умолчанию используется yfinance; в тестах можно передать заглушку и работать без сети.
+    """
+
+    def __init__(self, directory=CACHE_DIRECTORY, source=yfinance_source):
+        self.directory = directory
+        self.source = source
+
+    def _paths(self, ticker, interval):
+        name = f"{ticker}_{interval}"
+        return (os.path.join(self.directory, f"{name}.parquet"),
+                os.path.join(self.directory, f"{name}.json"))
+
+    def load(self, ticker, interval='1d'):
+        """
+        Читает из кэша все данные и список загруженных диапазонов для тикера.
+
+        Возвращает: кортеж (DataFrame или None, список диапазонов [start, end)).
+        """
+        data_path, meta_path = self._paths(ticker, interval)
+        if not (os.path.exists(data_path) and os.path.exists(meta_path)):
+            return None, []
+        with open(meta_path, encoding='utf-8') as f:
+            meta = json.load(f)
+        ranges = [[datetime.fromisoformat(start), datetime.fromisoformat(end)] for start, end in meta['ranges']]
+        return pd.read_parquet(data_path), ranges
+
+    def save(self, ticker, interval, data, ranges):
+        """Сохраняет данные и список загруженных диапазонов для тикера."""
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory)
+        data_path, meta_path = self._paths(ticker, interval)
+        data.to_parquet(data_path)
+        meta = {'ranges': [[start.isoformat(), end.isoformat()] for start, end in ranges]}
+        with open(meta_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+
+    def get(self, ticker, start_date, end_date, interval='1d'):
+        """
+        Описание: Возвращает котировки за полуинтервал [start_date, end_date), догружая из источника
+        только те участки, которых еще нет в кэше.
+
+        Параметры:
+        ticker (str): тикер акций.
+        start_date (datetime): дата начала.
+        end_date (datetime): дата окончания (не включается).
+        interval (str): интервал баров yfinance ('1d', '1h', '5m' и т.д.).
+
+        Возвращает: DataFrame с историческими данными акций.
+        """
+        cached, ranges = self.load(ticker, interval)
+        missing = _missing_ranges(ranges, start_date, end_date)
+
+        if missing:
+            parts = [] if cached is None else [cached]
+            loaded = []
+            for gap_start, gap_end in missing:
+                part = self.source(ticker, gap_start, gap_end, interval)
+                # Пустой ответ yfinance бывает и при ошибке сети или лимите запросов: такой участок
+                # не считаем загруженным, чтобы следующий запрос попробовал его снова
+                if part is not None and not part.empty:
+                    parts.append(part)
+                    loaded.append((gap_start, gap_end))
+
+            if parts:
+                cached = pd.concat(parts)
+                cached = cached[~cached.index.duplicated(keep='last')].sort_index()
+
+            # Сегодняшний бар еще формируется, поэтому текущий день не считаем загруженным
+            today = datetime.combine(datetime.now().date(), datetime.min.time())
+            ranges = _merge_ranges(ranges + [[gap_start, min(gap_end, today)]
+                                             for gap_start, gap_end in loaded if gap_start < today])
+            if cached is not None:
+                self.save(ticker, interval, cached, ranges)
+
+        if cached is None:
+            return pd.DataFrame()
+
+        index = _naive_index(cached)
+        return cached[(index >= start_date) & (index < end_date)]
+
+    def get_period(self, ticker, period, interval='1d'):
+        """Возвращает котировки за предустановленный период (например, '1mo'), используя кэш."""
+        start_date, end_date = period_to_dates(period)
+        return trim_period(self.get(ticker, start_date, end_date, interval), period)
@@ -1,9 +1,12 @@
 import os
-import yfinance as yf
+import pandas as pd
+from compact import compact_prices
+from providers import YFinanceProvider
 from datetime import datetime
 
 
-def fetch_stock_data(ticker, start_date=None, end_date=None, period=None):
+def fetch_stock_data(ticker, start_date=None, end_date=None, period=None, cache=None, compact=False,
+                     provider=None, interval='1d'):
     """
     Описание: Эта функция получает исторические данные о ценах акций для
     указанного тикера за заданный временной период или между конкретными датами.
@@ -13,15 +16,23 @@ def fetch_stock_data(ticker, start_date=None, end_date=None, period=None):
     start_date (datetime): дата начала анализа (если указано).
     end_date (datetime): дата окончания анализа (если указано).
     period (str): временной период для данных (например, '1d', '5d', '1mo' и т.д., если не указаны даты).
+    cache (StockDataCache): локальный кэш котировок (если указан, из сети догружаются только недостающие данные).
+    compact (bool): вернуть только колонки OHLCV с float32 там, где позволяет точность (см. compact_prices).
+    provider (MarketDataProvider): источник котировок из providers.py (по умолчанию yfinance);
+    при указанном кэше данные догружаются из источника кэша.
+    interval (str): интервал баров ('1d', '1h', '5m', '1m' и т.д.); более крупные таймфреймы можно
+    получить из мелких баров без повторной загрузки (см. resample.py).
 
     Возвращает: DataFrame с историческими данными акций.
     """
-    stock = yf.Ticker(ticker)
-    if start_date and end_date:
-        data = stock.history(start=start_date, end=end_date)
+    if cache is not None:
+        if start_date and end_date:
+            data = cache.get(ticker, start_date, end_date, interval)
+        else:
+            data = cache.get_period(ticker, period, interval)
     else:
-        data = stock.history(period=period)
-    return data
+        data = (provider or YFinanceProvider()).history(ticker, start_date, end_date, period, interval)
+    return compact_prices(data) if compact else data
 
 
 def add_moving_average(data, window_size=5):
@@ -89,21 +100,23 @@ def notify_if_strong_fluctuations(data, threshold):
         print("Ошибка: отсутствует колонка 'Close'")
 
 
-def export_data_to_csv(data, ticker, period):
+def export_data_to_csv(data, ticker, period, directory="plotfiles", incremental=False):
     """
     Функция формирует имя файла, открывает его в каталоге plotfiles, принимает дату, тикер и период, делает
     выборку из данных и выводит в файл.
     :param data: DataFrame с данными для экспорта
     :param ticker: Тикер акции или инструмента
     :param period: Период данных
+    :param directory: Каталог для сохранения (по умолчанию plotfiles)
+    :param incremental: Дописывать в постоянный файл тикера вместо нового файла (export_data_to_csv_incremental)
     """
+    if incremental:
+        return export_data_to_csv_incremental(data, ticker, directory)
+
     # Формируем имя файла
     current_time = datetime.now().strftime("%H_%M_%d_%m_%Y")
     filename = f"{ticker}_{period}_{current_time}.csv"
 
-    # Указываем путь к каталогу plotfiles
-    directory = "plotfiles"
-
     # Проверяем, существует ли каталог, если нет, создаем его
     if not os.path.exists(directory):
         os.makedirs(directory)
@@ -116,6 +129,118 @@ def export_data_to_csv(data, ticker, period):
     print(f"Данные экспортированы в {filepath}")
 
 
+def _read_tail_lines(filepath, count, block_size=1 << 16):
+    """
+    Читает с конца файла последние count строк данных и одну строку перед ними (опорную),
+    не читая файл целиком. Возвращает список пар (смещение строки в байтах, текст строки без
+    перевода строки); заголовок (строка со смещением 0) в список не входит.
+    """
+    with open(filepath, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        buffer = b''
+        while position > 0 and buffer.count(b'\n') <= count + 1:
+            step = min(block_size, position)
+            position -= step
+            f.seek(position)
+            buffer = f.read(step) + buffer
+
+    if position > 0:
+        # Первая строка буфера может быть неполной
+        cut = buffer.index(b'\n') + 1
+        position, buffer = position + cut, buffer[cut:]
+    lines = []
+    for line in buffer.split(b'\n')[:-1]:
+        lines.append((position, line.rstrip(b'\r').decode('utf-8')))
+        position += len(line) + 1
+    if lines and lines[0][0] == 0:
+        lines = lines[1:]
+    return lines[-(count + 1):]
+
+
+def _csv_timestamps(values, like):
+    """Даты из первой колонки CSV в том же виде (с часовым поясом или без), что и индекс like."""
+    if getattr(like, 'tz', None) is not None:
+        return pd.to_datetime(values, format='ISO8601', utc=True).tz_convert(like.tz)
+    return pd.to_datetime(values, format='ISO8601')
+
+
+def export_data_to_csv_incremental(data, ticker, directory="plotfiles", tail_rows=50):
+    """
+    Описание: Инкрементальный экспорт в один постоянный файл тикера <тикер>.csv (разделитель ';').
+    Если файла нет или в нем другие колонки, файл записывается целиком. Иначе читаются только
+    последние tail_rows строк файла: строки, совпадающие с новыми данными, остаются на месте, файл
+    обрезается с первой изменившейся строки (например, хвост скользящих окон индикаторов или
+    незакрытый последний бар) и дописываются только изменившиеся и новые строки. Более ранние строки
+    файла не перечитываются и не перезаписываются, поэтому история в файле копится между запусками.
+
+    Параметры:
+    data (DataFrame): данные для экспорта, отсортированные по дате.
+    ticker (str): тикер акции или инструмента.
+    directory (str): каталог для сохранения (по умолчанию plotfiles).
+    tail_rows (int): сколько последних строк файла сравнивать с новыми данными.
+
+    Возвращает: словарь с ключами path, kept (строк из хвоста осталось без изменений),
+    rewritten (строк перезаписано) и appended (строк добавлено).
+    """
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+    filepath = os.path.join(directory, f"{ticker}.csv")
+    header = data.iloc[:0].to_csv(sep=';').splitlines()[0]
+
+    existing_header = None
+    if os.path.exists(filepath):
+        with open(filepath, encoding='utf-8') as f:
+            existing_header = f.readline().rstrip('\r\n')
+    if existing_header != header:
+        if existing_header is not None:
+            # Колонки изменились: старые строки до начала новых данных переносятся в новый формат
+            old = pd.read_csv(filepath, sep=';', index_col=0)
+            old.index = _csv_timestamps(old.index, data.index)
+            data = pd.concat([old[old.index < data.index[0]], data]) if len(data) else old
+        data.to_csv(filepath, sep=';', index=True)
+        print(f"Данные экспортированы в {filepath} ({len(data)} строк)")
+        return {'path': filepath, 'kept': 0, 'rewritten': 0, 'appended': len(data)}
+
+    tail = _read_tail_lines(filepath, tail_rows)
+    keys = _csv_timestamps([line.split(';', 1)[0] for _, line in tail], data.index)
+    positions = data.index.get_indexer(keys)
+    with open(filepath, 'rb') as f:
+        cut = f.seek(0, os.SEEK_END)
+    last_key = keys[-1] if len(tail) else None
+    kept_last, suffix, kept = last_key, [], 0
+
+    # Опорная строка (первая в tail) не перезаписывается; сравниваются строки в диапазоне новых данных
+    first = 1 if len(tail) > tail_rows else 0
+    overlap = [i for i in range(first, len(tail)) if len(data) and data.index[0] <= keys[i] <= data.index[-1]]
+    if overlap:
+        start = positions[overlap[0]]
+        rendered = data.iloc[start:].to_csv(sep=';', header=False) if start >= 0 else ''
+        rendered = {line.split(';', 1)[0]: line for line in rendered.splitlines()}
+        for i in overlap:
+            timestamp = tail[i][1].split(';', 1)[0]
+            if positions[i] < 0 or rendered.get(timestamp) != tail[i][1]:
+                cut = tail[i][0]
+                kept_last = keys[i - 1] if i > 0 else None
+                # Строки файла позже новых данных сохраняются как есть
+                suffix = [line for key, (_, line) in zip(keys, tail) if key > data.index[-1]]
+                break
+            kept += 1
+
+    new_rows = data if kept_last is None else data[data.index > kept_last]
+    with open(filepath, 'r+b') as f:
+        f.truncate(cut)
+    new_rows.to_csv(filepath, sep=';', header=False, mode='a')
+    if suffix:
+        with open(filepath, 'a', encoding='utf-8', newline='') as f:
+            f.write(os.linesep.join(suffix) + os.linesep)
+    appended = int((new_rows.index > last_key).sum()) if last_key is not None else len(new_rows)
+    rewritten = len(new_rows) - appended
+    print(f"Данные экспортированы в {filepath}: без изменений {kept}, перезаписано {rewritten}, "
+          f"добавлено {appended} строк")
+    return {'path': filepath, 'kept': kept, 'rewritten': rewritten, 'appended': appended}
+
+
 def calculate_rsi(data, window=14):
     """Calculate Relative Strength Index (RSI)"""
     delta = data['Close'].diff()
@@ -1,14 +1,23 @@
 import os
+import numpy as np
 import matplotlib.pyplot as plt
 import plotly.graph_objects as go
 from bokeh.plotting import figure, output_file, show
 from bokeh.io import save
+from downsampling import downsample
 
 
-def create_and_save_plot(data, ticker, period, style, filename=None):
+# Колонки, которые выводит create_and_save_plot
+PLOT_COLUMNS = ['Close', 'Moving_Average', 'Standard_Deviation', 'RSI', 'MACD', 'Signal_Line']
+
+
+def create_and_save_plot(data, ticker, period, style, filename=None, max_points=None):
     """
     Основная функция выдачи графиков по итогам работы программы.
+    Если задан max_points, каждый ряд перед построением прореживается до этого числа точек.
     """
+    data = downsample(data, max_points, PLOT_COLUMNS)
+
     # Существующий код для matplotlib
     print(style)
     plt.style.use(style)
@@ -64,10 +73,12 @@ def create_and_save_plot(data, ticker, period, style, filename=None):
     print(f"График сохранен как {filepath}")
 
 
-def create_interactive_plotly(data, ticker):
+def plotly_figure(data, ticker, max_points=None):
     """
-    Создает интерактивный график цен закрытия с использованием Plotly.
+    Фигура Plotly с ценой закрытия и скользящим средним (без сохранения).
+    Если задан max_points, ряды перед построением прореживаются до этого числа точек.
     """
+    data = downsample(data, max_points, ['Close', 'Moving_Average'])
     fig = go.Figure()
     fig.add_trace(go.Scatter(x=data.index, y=data['Close'], mode='lines', name='Price'))
     fig.add_trace(go.Scatter(x=data.index, y=data['Moving_Average'], mode='lines', name='Moving Average'))
@@ -76,23 +87,67 @@ def create_interactive_plotly(data, ticker):
                       xaxis_title='Дата',
                       yaxis_title='Цена',
                       legend=dict(x=0, y=1))
+    return fig
+
+
+def create_interactive_plotly(data, ticker, max_points=None, directory="plotfiles"):
+    """
+    Создает интерактивный график цен закрытия с использованием Plotly.
+    Если задан max_points, ряды перед построением прореживаются до этого числа точек.
+    """
+    fig = plotly_figure(data, ticker, max_points)
 
     # Сохранение интерактивного графика в HTML файл
-    plotly_path = f"plotfiles/{ticker}_interactive_plot.html"
+    plotly_path = os.path.join(directory, f"{ticker}_interactive_plot.html")
     fig.write_html(plotly_path)
     print(f"Интерактивный график сохранен как {plotly_path}")
 
 
-def create_interactive_bokeh(data, ticker):
+def create_interactive_bokeh(data, ticker, max_points=None, directory="plotfiles"):
     """
     Создает интерактивный график стандартного отклонения с использованием Bokeh.
+    Если задан max_points, ряд перед построением прореживается до этого числа точек.
     """
+    data = downsample(data, max_points, ['Standard_Deviation'])
     data.index = data.index.tz_localize(None)
-    output_file(f"plotfiles/{ticker}_standard_deviation.html")
+    bokeh_path = os.path.join(directory, f"{ticker}_standard_deviation.html")
+    output_file(bokeh_path)
 
     p = figure(title=f'{ticker} Стандартное отклонение цены закрытия', x_axis_label='Дата',
                y_axis_label='Standard Deviation', x_axis_type='datetime')
     p.line(data.index, data['Standard_Deviation'], legend_label='Standard Deviation', line_color='purple')
 
     save(p)  # Сохранить график в HTML файл
-    print(f"Bokeh график сохранен как plotfiles/{ticker}_standard_deviation.html")
\ No newline at end of file
+    print(f"Bokeh график сохранен как {bokeh_path}")
+
+
+def create_correlation_heatmap(matrix, filename="correlation_heatmap.png", title="Корреляция доходностей",
+                               directory="plotfiles", max_labels=50):
+    """
+    Сохраняет тепловую карту матрицы корреляций или ковариаций (DataFrame N x N из correlation.py)
+    в каталог plotfiles. Шкала симметрична относительно нуля; подписи тикеров выводятся, только если
+    их не больше max_labels, поэтому карта строится и для 1000 и более тикеров.
+    """
+    values = matrix.to_numpy(dtype=float)
+    limit = np.nanmax(np.abs(values)) if np.isfinite(values).any() else 1.0
+    size = min(4 + 0.25 * len(matrix), 14)
+
+    plt.figure(figsize=(size + 2, size))
+    plt.imshow(values, cmap='RdBu_r', vmin=-limit, vmax=limit, interpolation='nearest')
+    plt.colorbar()
+    if len(matrix) <= max_labels:
+        plt.xticks(range(len(matrix)), matrix.columns, rotation=90)
+        plt.yticks(range(len(matrix)), matrix.index)
+    else:
+        plt.xticks([])
+        plt.yticks([])
+    plt.title(f"{title} ({len(matrix)} тикеров)")
+
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+    filepath = os.path.join(directory, filename)
+    plt.tight_layout()
+    plt.savefig(filepath)
+    plt.close()
+    print(f"Тепловая карта сохранена как {filepath}")
+    return filepath
\ No newline at end of file
@@ -0,0 +1,114 @@
+import numpy as np
+
+
+def lttb_indices(x, y, target_points):
+    """
+    Описание: Алгоритм Largest-Triangle-Three-Buckets: ряд делится на target_points - 2 корзины,
+    из каждой берется точка, образующая наибольший треугольник с предыдущей выбранной точкой и средним
+    следующей корзины. Форма линии сохраняется визуально при многократно меньшем числе точек.
+
+    Параметры:
+    x (ndarray): координаты по оси X (возрастающие).
+    y (ndarray): значения ряда без NaN.
+    target_points (int): число точек на выходе.
+
+    Возвращает: ndarray индексов выбранных точек.
+    """
+    n = len(y)
+    if target_points >= n or target_points < 3:
+        return np.arange(n)
+
+    every = (n - 2) / (target_points - 2)
+    bounds = (np.arange(target_points - 1) * every).astype(np.int64) + 1
+    bounds[-1] = n - 1
+    selected = np.empty(target_points, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+
+    a = 0
+    for i in range(target_points - 2):
+        start, end = bounds[i], bounds[i + 1]
+        next_end = bounds[i + 2] if i + 2 < len(bounds) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def minmax_indices(y, target_points):
+    """
+    Описание: Прореживание по минимуму и максимуму: ряд делится на target_points / 2 корзин (например,
+    по одной на пиксель ширины графика), из каждой берутся точки минимума и максимума. Все пики и провалы
+    ряда гарантированно остаются на графике.
+
+    Параметры:
+    y (ndarray): значения ряда без NaN.
+    target_points (int): примерное число точек на выходе.
+
+    Возвращает: ndarray индексов выбранных точек.
+    """
+    n = len(y)
+    buckets = max(target_points // 2, 1)
+    if target_points >= n:
+        return np.arange(n)
+
+    size = -(-n // buckets)
+    padded = np.full(buckets * size, np.nan)
+    padded[:n] = y
+    padded = padded.reshape(buckets, size)
+    valid = ~np.isnan(padded).all(axis=1)
+    offsets = np.arange(buckets)[valid] * size
+    lows = offsets + np.nanargmin(padded[valid], axis=1)
+    highs = offsets + np.nanargmax(padded[valid], axis=1)
+    return np.unique(np.concatenate(([0, n - 1], lows, highs)))
+
+
+METHODS = {
+    'lttb': lambda x, y, target_points: lttb_indices(x, y, target_points),
+    'minmax': lambda x, y, target_points: minmax_indices(y, target_points),
+}
+
+
+# Наименьшее число точек на колонку: три точки LTTB и глобальные минимум и максимум
+MIN_COLUMN_POINTS = 5
+
+
+def downsample(data, target_points, columns=None, method='lttb'):
+    """
+    Описание: Визуальное прореживание данных перед построением графика. Для каждой колонки точки
+    выбираются отдельно (пропуски NaN не учитываются), глобальные максимум и минимум всегда сохраняются,
+    результат - строки data по объединению выбранных индексов. Бюджет target_points делится между
+    колонками поровну (первая и последняя строки входят в него), поэтому строк на выходе не больше
+    target_points; исключение - слишком малый бюджет, меньше MIN_COLUMN_POINTS точек на колонку.
+
+    Параметры:
+    data (DataFrame): данные с индексом-датами.
+    target_points (int): наибольшее число строк после прореживания.
+    columns (list): колонки, по которым выбираются точки (по умолчанию все числовые).
+    method (str): 'lttb' (Largest-Triangle-Three-Buckets) или 'minmax' (минимум/максимум по корзинам).
+
+    Возвращает: DataFrame с подмножеством строк data (или сам data, если точек и так меньше).
+    """
+    if method not in METHODS:
+        raise ValueError(f"Неизвестный метод прореживания: {method}")
+    if target_points is None or len(data) <= target_points:
+        return data
+    if columns is None:
+        columns = data.select_dtypes('number').columns
+
+    x = data.index.asi8.astype(np.float64) if hasattr(data.index, 'asi8') else np.arange(len(data), dtype=np.float64)
+    keep = [np.array([0, len(data) - 1])]
+    if len(columns) == 0:
+        return data.iloc[keep[0]]
+    # Точки на колонку вместе с ее минимумом и максимумом
+    budget = max((target_points - 2) // len(columns), MIN_COLUMN_POINTS)
+    for column in columns:
+        y = data[column].to_numpy(dtype=np.float64)
+        finite = np.flatnonzero(np.isfinite(y))
+        if len(finite) == 0:
+            continue
+        chosen = finite[METHODS[method](x[finite], y[finite], budget - 2)]
+        extremes = finite[[np.argmin(y[finite]), np.argmax(y[finite])]]
+        keep.extend((chosen, extremes))
+    return data.iloc[np.unique(np.concatenate(keep))]
@@ -0,0 +1,169 @@
+import os
+import glob
+import json
+import shutil
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+
+# Каталог наборов данных внутри plotfiles
+DATASET_DIRECTORY = os.path.join("plotfiles", "datasets")
+
+
+def _with_index_columns(schema, columns):
+    """Добавляет к списку колонок колонки индекса из метаданных pandas, чтобы индекс восстановился."""
+    if columns is None or not schema.metadata or b'pandas' not in schema.metadata:
+        return columns
+    index_columns = json.loads(schema.metadata[b'pandas'])['index_columns']
+    return list(columns) + [c for c in index_columns if isinstance(c, str) and c not in columns]
+
+
+class ParquetExporter:
+    """Колоночный формат Parquet со сжатием zstd: компактный на диске, читается по колонкам."""
+    extension = 'parquet'
+
+    def __init__(self, compression='zstd'):
+        self.compression = compression
+
+    def write(self, data, path):
+        pq.write_table(pa.Table.from_pandas(data), path, compression=self.compression)
+
+    def read(self, path, columns=None, memory_map=True):
+        columns = _with_index_columns(pq.read_schema(path), columns)
+        return pq.read_table(path, columns=columns, memory_map=memory_map).to_pandas()
+
+
+class FeatherExporter:
+    """
+    Формат Feather (Arrow IPC). Без сжатия файл отображается в память (memory map) и читается
+    без разбора и копирования буферов.
+    """
+    extension = 'feather'
+
+    def __init__(self, compression='uncompressed'):
+        self.compression = compression
+
+    def write(self, data, path):
+        feather.write_feather(pa.Table.from_pandas(data), path, compression=self.compression)
+
+    def read(self, path, columns=None, memory_map=True):
+        if columns is not None:
+            with pa.memory_map(path) as source:
+                columns = _with_index_columns(pa.ipc.open_file(source).schema, columns)
+        return feather.read_table(path, columns=columns, memory_map=memory_map).to_pandas()
+
+
+class CompressedCSVExporter:
+    """
+    CSV с разделителем ';' (как в export_data_to_csv), сжатый gzip. Часовой пояс индекса записывается
+    в заголовок колонки индекса ('Date[America/New_York]'), чтобы при чтении вернуть тот же пояс,
+    как у Parquet и Feather: даты со смещениями приводятся к UTC и переводятся обратно в этот пояс.
+    """
+    extension = 'csv.gz'
+
+    def write(self, data, path):
+        label = data.index.name or ''
+        tz = getattr(data.index, 'tz', None)
+        if tz is not None:
+            label = f"{label}[{tz}]"
+        data.to_csv(path, sep=';', index=True, index_label=label or None, compression='gzip')
+
+    def read(self, path, columns=None, memory_map=True):
+        data = pd.read_csv(path, sep=';', index_col=0, compression='gzip')
+        name = data.index.name or ''
+        if name.endswith(']') and '[' in name:
+            name, tz = name[:-1].rsplit('[', 1)
+            data.index = pd.to_datetime(data.index, utc=True, format='ISO8601').tz_convert(tz)
+        else:
+            data.index = pd.to_datetime(data.index, format='ISO8601')
+        data.index.name = name or None
+        return data if columns is None else data[columns]
+
+
+EXPORTERS = {
+    'parquet': ParquetExporter(),
+    'feather': FeatherExporter(),
+    'csv.gz': CompressedCSVExporter(),
+}
+
+
+def _exporter(fmt):
+    if fmt not in EXPORTERS:
+        raise ValueError(f"Неизвестный формат экспорта: {fmt}. Доступны: {', '.join(EXPORTERS)}")
+    return EXPORTERS[fmt]
+
+
+def _ticker_directory(ticker, fmt, directory):
+    return os.path.join(directory, fmt, f"ticker={ticker}")
+
+
+def export_data(data, ticker, fmt='parquet', directory=DATASET_DIRECTORY, partitioned=True):
+    """
+    Описание: Экспортирует данные в бинарный или сжатый формат. При partitioned=True данные
+    раскладываются по одному файлу на тикер и год: <directory>/<fmt>/ticker=<тикер>/year=<год>/data.<ext>,
+    иначе пишется один файл <directory>/<fmt>/ticker=<тикер>/data.<ext>. Повторный экспорт
+    перезаписывает файлы тикера.
+
+    Параметры:
+    data (DataFrame): DataFrame с данными для экспорта (индекс - даты).
+    ticker (str): тикер акции или инструмента.
+    fmt (str): формат из EXPORTERS ('parquet', 'feather', 'csv.gz').
+    directory (str): корневой каталог наборов данных.
+    partitioned (bool): разбивать ли данные по годам.
+
+    Возвращает: список путей к записанным файлам.
+    """
+    exporter = _exporter(fmt)
+    ticker_directory = _ticker_directory(ticker, fmt, directory)
+    if os.path.exists(ticker_directory):
+        shutil.rmtree(ticker_directory)
+
+    if partitioned:
+        parts = [(os.path.join(ticker_directory, f"year={year}"), part)
+                 for year, part in data.groupby(data.index.year)]
+    else:
+        parts = [(ticker_directory, data)]
+
+    paths = []
+    for part_directory, part in parts:
+        if not os.path.exists(part_directory):
+            os.makedirs(part_directory)
+        path = os.path.join(part_directory, f"data.{exporter.extension}")
+        exporter.write(part, path)
+        paths.append(path)
+
+    print(f"Данные {ticker} экспортированы в {ticker_directory} ({fmt}, файлов: {len(paths)})")
+    return paths
+
+
+def load_data(ticker, fmt='parquet', directory=DATASET_DIRECTORY, years=None, columns=None, memory_map=True):
+    """
+    Описание: Загружает данные тикера, сохраненные export_data. Файлы Parquet и Feather читаются
+    через отображение в память, без разбора текста.
+
+    Параметры:
+    ticker (str): тикер акции или инструмента.
+    fmt (str): формат из EXPORTERS.
+    directory (str): корневой каталог наборов данных.
+    years (list): загрузить только указанные годы (для секционированных данных).
+    columns (list): загрузить только указанные колонки.
+    memory_map (bool): читать файлы через отображение в память.
+
+    Возвращает: DataFrame с данными тикера, отсортированный по дате.
+    """
+    exporter = _exporter(fmt)
+    ticker_directory = _ticker_directory(ticker, fmt, directory)
+    paths = sorted(glob.glob(os.path.join(ticker_directory, f"data.{exporter.extension}")) +
+                   glob.glob(os.path.join(ticker_directory, "year=*", f"data.{exporter.extension}")))
+    if years is not None:
+        wanted = {f"year={year}" for year in years}
+        paths = [path for path in paths if os.path.basename(os.path.dirname(path)) in wanted]
+    if not paths:
+        raise FileNotFoundError(f"Нет данных {ticker} в формате {fmt} в каталоге {ticker_directory}")
+
+    parts = [exporter.read(path, columns=columns, memory_map=memory_map) for path in paths]
+    data = parts[0] if len(parts) == 1 else pd.concat(parts)
+    return data.sort_index()
@@ -0,0 +1,232 @@
+import os
+import json
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+import indicators
+
+
+# Каталог по умолчанию для сохраненных индикаторов
+STORE_DIRECTORY = os.path.join("plotfiles", "indicators")
+
+
+def _index_values(index):
+    """Метки индекса как int64 (наносекунды UTC для дат), чтобы сравнивать и хешировать их как массив."""
+    if isinstance(index, pd.DatetimeIndex):
+        return index.as_unit('ns').asi8
+    return np.asarray(index, dtype=np.int64)
+
+
+def data_hash(data):
+    """Хеш входа индикаторов: метки индекса и цены закрытия."""
+    digest = hashlib.sha256()
+    digest.update(np.ascontiguousarray(_index_values(data.index)).tobytes())
+    digest.update(np.ascontiguousarray(data['Close'].to_numpy(dtype=np.float64)).tobytes())
+    return digest.hexdigest()
+
+
+def _spec(spec):
+    name, params = (spec, {}) if isinstance(spec, str) else spec
+    if name not in indicators.INDICATORS:
+        raise ValueError(f"Неизвестный индикатор: {name}")
+    return name, dict(params)
+
+
+def _rolling_tail(name, lookback):
+    """
+    Пересчет хвоста индикатора на скользящем окне: значения начиная со строки start зависят только
+    от lookback предыдущих цен, поэтому считается только отрезок close[start - lookback:].
+    """
+    def compute(close, start, state, **params):
+        begin = max(start - lookback(params), 0)
+        block = indicators.compute_indicators(pd.DataFrame({'Close': close[begin:]}), [(name, params)])
+        return {column: block[column].to_numpy()[start - begin:] for column in block}, {}
+    return compute
+
+
+def _macd_tail(close, start, state, fast=12, slow=26, signal=9, columns=('MACD', 'Signal_Line')):
+    """
+    Пересчет хвоста MACD: EWM продолжаются с сохраненных значений перед строкой start
+    (ewm_mean с параметром init), поэтому прошлые цены не перечитываются.
+    """
+    tail = close[start:]
+    init = state if start else {}
+    fast_ewm = indicators.ewm_mean(tail, fast, init.get('fast'))
+    slow_ewm = indicators.ewm_mean(tail, slow, init.get('slow'))
+    macd = fast_ewm - slow_ewm
+    signal_line = indicators.ewm_mean(macd, signal, init.get('signal'))
+    state = {'fast': fast_ewm[-1], 'slow': slow_ewm[-1], 'signal': signal_line[-1]} if len(tail) else state
+    return {columns[0]: macd, columns[1]: signal_line}, state
+
+
+# Расчет значений индикатора начиная со строки start: имя -> функция (close, start, state, **params)
+TAIL_FUNCTIONS = {
+    'moving_average': _rolling_tail('moving_average', lambda params: params.get('window', 5) - 1),
+    'standard_deviation': _rolling_tail('standard_deviation', lambda params: params.get('window', 5) - 1),
+    'rsi': _rolling_tail('rsi', lambda params: params.get('window', 14)),
+    'macd': _macd_tail,
+}
+
+
+class IndicatorStore:
+    """
+    Описание: Постоянное хранилище посчитанных индикаторов с адресацией по содержимому. Запись индикатора
+    хранится в файле, имя которого - хеш цен (индекс и Close), имени индикатора и параметров, поэтому при
+    тех же ценах индикатор возвращается без расчета. Для каждой пары (тикер, индикатор с параметрами)
+    запоминается последняя запись; если цены изменились (дописаны новые бары или исправлены последние),
+    находится первая изменившаяся строка, значения до нее берутся из записи, а пересчитывается только
+    хвост: окна скользящих средних, RSI и стандартного отклонения от lookback строк до изменения,
+    EWM для MACD продолжаются с сохраненных значений. Все индикаторы причинные (значение зависит только
+    от прошлых цен), поэтому строки до изменения остаются верными.
+
+    Параметры:
+    directory (str): каталог хранилища.
+    """
+
+    def __init__(self, directory=STORE_DIRECTORY):
+        self.directory = directory
+        self.objects = os.path.join(directory, "objects")
+        self.refs_path = os.path.join(directory, "refs.json")
+        self.stats = {'hits': 0, 'partial': 0, 'misses': 0}
+        self._memory = {}
+        os.makedirs(self.objects, exist_ok=True)
+        self.refs = {}
+        # Записи, на которые перестали ссылаться после последней записи refs.json
+        self._released = set()
+        if os.path.exists(self.refs_path):
+            with open(self.refs_path, encoding='utf-8') as f:
+                self.refs = json.load(f)
+
+    @staticmethod
+    def _keys(ticker, name, params, prices_hash):
+        spec = json.dumps([name, params], sort_keys=True)
+        return f"{ticker}|{spec}", hashlib.sha256(f"{prices_hash}|{spec}".encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.objects, f"{key}.npz")
+
+    def _load(self, key):
+        if key in self._memory:
+            return self._memory[key]
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as stored:
+            meta = json.loads(str(stored['meta']))
+            entry = {
+                'index': stored['index'],
+                'close': stored['close'],
+                'columns': {column: stored[f'column_{i}'] for i, column in enumerate(meta['columns'])},
+                'state': meta['state'],
+            }
+        self._memory[key] = entry
+        return entry
+
+    def _save(self, key, entry):
+        meta = json.dumps({'columns': list(entry['columns']), 'state': entry['state']})
+        arrays = {f'column_{i}': values for i, values in enumerate(entry['columns'].values())}
+        with open(self._path(key), 'wb') as f:
+            np.savez(f, meta=np.array(meta), index=entry['index'], close=entry['close'], **arrays)
+        self._memory[key] = entry
+
+    def _set_ref(self, ref, key):
+        # Ссылка меняется в памяти; refs.json записывается один раз в _flush_refs
+        previous = self.refs.get(ref)
+        self.refs[ref] = key
+        if previous and previous != key:
+            self._released.add(previous)
+
+    def _flush_refs(self):
+        """Записывает refs.json и удаляет записи, на которые больше не ссылается ни один тикер."""
+        with open(self.refs_path, 'w', encoding='utf-8') as f:
+            json.dump(self.refs, f)
+        referenced = set(self.refs.values())
+        for key in self._released - referenced:
+            self._memory.pop(key, None)
+            if os.path.exists(self._path(key)):
+                os.remove(self._path(key))
+        self._released.clear()
+
+    @staticmethod
+    def _valid_prefix(entry, index, close):
+        """Число первых строк, в которых индекс и цены совпадают с сохраненной записью."""
+        n = min(len(entry['index']), len(index))
+        same = (entry['index'][:n] == index[:n]) & (
+            (entry['close'][:n] == close[:n]) | (np.isnan(entry['close'][:n]) & np.isnan(close[:n])))
+        return n if same.all() else int(np.argmin(same))
+
+    def get(self, ticker, data, spec, prices_hash=None, flush=True):
+        """
+        Описание: Значения одного индикатора для данных тикера: из хранилища, с пересчетом хвоста
+        или полным расчетом.
+
+        Параметры:
+        ticker (str): тикер (вместе с интервалом, если один тикер хранится в разных интервалах).
+        data (DataFrame): данные с колонкой 'Close'.
+        spec: индикатор в формате compute_indicators - имя или пара (имя, параметры).
+        prices_hash (str): готовый data_hash(data), чтобы не считать его для каждого индикатора.
+        flush (bool): сразу записать refs.json (compute записывает его один раз после всех индикаторов).
+
+        Возвращает: словарь {колонка: ndarray float64}.
+        """
+        name, params = _spec(spec)
+        ref, key = self._keys(ticker, name, params, prices_hash or data_hash(data))
+        entry = self._load(key)
+        if entry is not None:
+            self.stats['hits'] += 1
+            if self.refs.get(ref) != key:
+                self._set_ref(ref, key)
+                if flush:
+                    self._flush_refs()
+            return entry['columns']
+
+        index = _index_values(data.index)
+        close = np.ascontiguousarray(data['Close'].to_numpy(dtype=np.float64))
+        previous = self._load(self.refs[ref]) if ref in self.refs else None
+        start = self._valid_prefix(previous, index, close) if previous is not None else 0
+        if start and name == 'macd' and start != len(previous['index']):
+            # Состояние EWM сохранено только для последней строки записи
+            start = 0
+        if start and not all(np.isfinite(value) for value in previous['state'].values()):
+            start = 0
+
+        tail, state = TAIL_FUNCTIONS[name](close, start, previous['state'] if start else {}, **params)
+        if start:
+            self.stats['partial'] += 1
+            columns = {column: np.concatenate((previous['columns'][column][:start], values))
+                       for column, values in tail.items()}
+        else:
+            self.stats['misses'] += 1
+            columns = tail
+        columns = {column: np.asarray(values, dtype=np.float64) for column, values in columns.items()}
+        self._save(key, {'index': index, 'close': close, 'columns': columns,
+                         'state': {k: float(v) for k, v in state.items()}})
+        self._set_ref(ref, key)
+        if flush:
+            self._flush_refs()
+        return columns
+
+    def compute(self, ticker, data, indicator_set=indicators.DEFAULT_INDICATORS, dtype=np.float64):
+        """
+        Описание: Аналог indicators.compute_indicators, использующий хранилище.
+
+        Параметры:
+        ticker (str): тикер.
+        data (DataFrame): данные с колонкой 'Close'.
+        indicator_set (list): список индикаторов в формате compute_indicators.
+        dtype: тип колонок результата.
+
+        Возвращает: DataFrame с колонками индикаторов и индексом data.
+        """
+        prices_hash = data_hash(data)
+        block = {}
+        refs = dict(self.refs)
+        for spec in indicator_set:
+            block.update(self.get(ticker, data, spec, prices_hash, flush=False))
+        if self.refs != refs:
+            self._flush_refs()
+        if dtype != np.float64:
+            block = {column: values.astype(dtype) for column, values in block.items()}
+        return pd.DataFrame(block, index=data.index)
@@ -0,0 +1,224 @@
+import numpy as np
+import pandas as pd
+
+
+# Набор индикаторов, который main.py строит функциями data_download
+DEFAULT_INDICATORS = [
+    ('moving_average', {'window': 5}),
+    ('macd', {'fast': 12, 'slow': 26, 'signal': 9}),
+    ('rsi', {'window': 14}),
+    ('standard_deviation', {'window': 5}),
+]
+
+# Размер блока для векторизованного расчета EWM
+EWM_BLOCK = 64
+
+
+def _linear_recurrence(values, decay, gain, init):
+    """
+    Считает y[t] = decay * y[t-1] + gain * values[t] при y[-1] = init без цикла по элементам:
+    внутри блока - одно матричное умножение на треугольную матрицу весов, а значения, переносимые
+    между блоками, подчиняются той же рекуррентности и считаются рекурсивно.
+    """
+    n = len(values)
+    blocks = -(-n // EWM_BLOCK)
+    if n == blocks * EWM_BLOCK:
+        padded = values.reshape(blocks, EWM_BLOCK)
+    else:
+        padded = np.zeros(blocks * EWM_BLOCK)
+        padded[:n] = values
+        padded = padded.reshape(blocks, EWM_BLOCK)
+
+    k = np.arange(EWM_BLOCK)
+    lags = k[:, None] - k[None, :]
+    weights = np.where(lags >= 0, gain * decay ** np.maximum(lags, 0), 0.0)
+    result = padded @ weights.T
+
+    # Значение перед каждым блоком: c[b] = decay^K * c[b-1] + result[b-1, -1]
+    if blocks == 1:
+        carries = np.array([init])
+    else:
+        tail = _linear_recurrence(np.ascontiguousarray(result[:-1, -1]), decay ** EWM_BLOCK, 1.0, init)
+        carries = np.concatenate(([init], tail))
+
+    result += carries[:, None] * decay ** (k + 1)
+    return result.ravel()[:n]
+
+
+def ewm_mean(x, span, init=None):
+    """
+    Описание: Экспоненциальное скользящее среднее, совпадающее с pandas ewm(span=span, adjust=False).mean(),
+    но посчитанное векторно по массиву float64.
+
+    Параметры:
+    x (ndarray): ряд значений.
+    span (int): период EWM.
+    init (float): значение EWM перед первым элементом ряда (по умолчанию ряд начинается с x[0]).
+
+    Возвращает: ndarray той же длины, что и x.
+    """
+    x = np.ascontiguousarray(x, dtype=np.float64)
+    alpha = 2.0 / (span + 1.0)
+    missing = np.isnan(x)
+    if not missing.any():
+        if len(x) == 0:
+            return x.copy()
+        start = x[0] if init is None else float(init)
+        return _linear_recurrence(x, 1.0 - alpha, alpha, start)
+
+    out = np.full(len(x), np.nan)
+    if missing.all():
+        return out
+    first = int(np.argmin(missing))
+    if missing[first:].any():
+        # Пропуски внутри ряда pandas обрабатывает особым образом - считаем так же, как он
+        return pd.Series(x).ewm(span=span, adjust=False).mean().to_numpy()
+
+    values = x[first:]
+    start = values[0] if init is None else float(init)
+    out[first:] = _linear_recurrence(values, 1.0 - alpha, alpha, start)
+    return out
+
+
+def rolling_sum(x, window):
+    """
+    Сумма по скользящему окну как разность накопленных сумм: два прохода по массиву при любом окне.
+    Погрешность растет с длиной ряда так же, как у онлайн-алгоритма pandas rolling.
+    Пропуски (NaN) суммируются как нули и отдельно считаются накопленной суммой isnan: NaN получают
+    только окна, в которые попал пропуск (как pandas rolling), а не все значения после него.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    out = np.empty(len(x))
+    out[:window - 1] = np.nan
+    if len(x) >= window:
+        missing = np.isnan(x)
+        has_missing = missing.any()
+        cumulative = np.cumsum(np.where(missing, 0.0, x) if has_missing else x)
+        out[window - 1] = cumulative[window - 1]
+        np.subtract(cumulative[window:], cumulative[:-window], out=out[window:])
+        if has_missing:
+            counts = np.cumsum(missing)
+            in_window = counts[window - 1:] - np.concatenate(([0], counts[:-window]))
+            out[window - 1:][in_window > 0] = np.nan
+    return out
+
+
+class _Pass:
+    """
+    Общие промежуточные результаты одного прохода по ценам закрытия: приращения, прибыли/убытки,
+    скользящие суммы по окнам и EWM по периодам. Каждое значение считается один раз и переиспользуется
+    всеми индикаторами, которым оно нужно.
+    """
+
+    def __init__(self, close):
+        self.close = close
+        self._cache = {}
+
+    def _get(self, key, compute):
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    def series(self, name):
+        if name == 'close':
+            return self.close
+        if name == 'delta':
+            return self._get('delta', lambda: np.concatenate(([np.nan], np.diff(self.close))))
+        if name == 'gain':
+            return self._get('gain', lambda: np.fmax(self.series('delta'), 0.0))
+        if name == 'loss':
+            return self._get('loss', lambda: np.fmax(-self.series('delta'), 0.0))
+        raise KeyError(name)
+
+    def rolling_mean(self, name, window):
+        return self._get(('mean', name, window), lambda: rolling_sum(self.series(name), window) / window)
+
+    def rolling_std(self, name, window):
+        def compute():
+            x = self.series(name)
+            out = np.empty(len(x))
+            out[:window - 1] = np.nan
+            if len(x) >= window > 1:
+                # Двухпроходная формула через общее скользящее среднее: устойчива к округлению
+                count = len(x) - window + 1
+                mean = self.rolling_mean(name, window)[window - 1:]
+                squares = np.zeros(count)
+                deviation = np.empty(count)
+                for lag in range(window):
+                    np.subtract(x[lag:lag + count], mean, out=deviation)
+                    deviation *= deviation
+                    squares += deviation
+                squares /= window - 1
+                np.sqrt(squares, out=out[window - 1:])
+            elif len(x) >= window:
+                out[window - 1:] = np.nan
+            return out
+        return self._get(('std', name, window), compute)
+
+    def ewm(self, span):
+        return self._get(('ewm', span), lambda: ewm_mean(self.close, span))
+
+
+def _moving_average(state, window=5, column='Moving_Average'):
+    return {column: state.rolling_mean('close', window)}
+
+
+def _standard_deviation(state, window=5, column='Standard_Deviation'):
+    return {column: state.rolling_std('close', window)}
+
+
+def _rsi(state, window=14, column='RSI'):
+    gain = state.rolling_mean('gain', window)
+    loss = state.rolling_mean('loss', window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = 100 - (100 / (1 + gain / loss))
+    return {column: rsi}
+
+
+def _macd(state, fast=12, slow=26, signal=9, columns=('MACD', 'Signal_Line')):
+    macd = state.ewm(fast) - state.ewm(slow)
+    return {columns[0]: macd, columns[1]: ewm_mean(macd, signal)}
+
+
+INDICATORS = {
+    'moving_average': _moving_average,
+    'standard_deviation': _standard_deviation,
+    'rsi': _rsi,
+    'macd': _macd,
+}
+
+
+def compute_indicators(data, indicators=DEFAULT_INDICATORS, dtype=np.float64):
+    """
+    Описание: Вычисляет набор индикаторов за один векторизованный проход NumPy по ценам закрытия.
+    Промежуточные величины (скользящие суммы, EWM) общие для всех индикаторов. Результат совпадает
+    с функциями add_moving_average, calculate_macd, calculate_rsi и calculate_standard_deviation.
+
+    Параметры:
+    data (DataFrame): DataFrame, содержащий данные акций с колонкой 'Close'.
+    indicators (list): декларативный список индикаторов: имя или пара (имя, параметры), например
+    [('moving_average', {'window': 20}), ('rsi', {'window': 14}), 'macd'].
+    dtype: тип колонок результата; расчет всегда идет в float64, np.float32 вдвое уменьшает блок
+    индикаторов для длинной истории (см. compact.py).
+
+    Возвращает: новый DataFrame с колонками индикаторов и тем же индексом; исходный data не изменяется.
+    """
+    close = np.ascontiguousarray(data['Close'].to_numpy(dtype=np.float64))
+    state = _Pass(close)
+    block = {}
+    for spec in indicators:
+        name, params = (spec, {}) if isinstance(spec, str) else spec
+        if name not in INDICATORS:
+            raise ValueError(f"Неизвестный индикатор: {name}")
+        block.update(INDICATORS[name](state, **params))
+    if dtype != np.float64:
+        block = {column: values.astype(dtype) for column, values in block.items()}
+    return pd.DataFrame(block, index=data.index)
+
+
+def apply_indicators(data, indicators=DEFAULT_INDICATORS, dtype=np.float64):
+    """
+    Возвращает копию data с добавленными колонками индикаторов, посчитанными compute_indicators.
+    """
+    block = compute_indicators(data, indicators, dtype)
+    return pd.concat([data.drop(columns=block.columns, errors='ignore'), block], axis=1)
@@ -1,5 +1,14 @@
 import data_download as dd
 import data_plotting as dplt
+from data_cache import StockDataCache
+import batch
+import dashboard
+import screener
+import alerts
+import correlation
+import cli
+from profiling import Profiler
+import sys
 from datetime import datetime
 
 
@@ -12,14 +21,26 @@ def main():
     print("Вот несколько примеров биржевых тикеров, которые вы можете рассмотреть: AAPL (Apple Inc), GOOGL (Alphabet Inc), MSFT (Microsoft Corporation), AMZN (Amazon.com Inc), TSLA (Tesla Inc).")
     print("Общие периоды времени для данных о запасах включают: 1d, 5d, 1mo, 3mo, 6mo, 1y, 2y, 5y, 10y, ytd, max")
 
+    # Локальный кэш котировок: повторные запуски догружают только новые данные
+    cache = StockDataCache()
+
+    # Время, процессорное время и память по этапам выводятся в конце работы
+    profiler = Profiler()
+
     # Выбор способа ввода периода
     period_choice = input(
-        "Вы хотите ввести предустановленный период или конкретные даты? (укажите 'период' или 'даты'): ")
+        "Вы хотите ввести предустановленный период, конкретные даты или обработать список тикеров из файла? "
+        "(укажите 'период', 'даты' или 'пакет'): ")
+
+    if period_choice.lower() == 'пакет':
+        batch_main(cache)
+        return
 
     if period_choice.lower() == 'период':
         period = input("Введите период для данных (например, '1mo' для одного месяца): ")
         ticker = input("Введите тикер акции (например, 'AAPL' для Apple Inc): ")
-        stock_data = dd.fetch_stock_data(ticker, period=period)
+        with profiler.stage('fetch'):
+            stock_data = dd.fetch_stock_data(ticker, period=period, cache=cache)
 
     elif period_choice.lower() == 'даты':
         ticker = input("Введите тикер акции (например, 'AAPL' для Apple Inc): ")
@@ -46,7 +67,9 @@ def main():
                 print("Некорректный формат даты. Пожалуйста, попробуйте еще раз.")
 
         # Передача дат в fetch_stock_data
-        stock_data = dd.fetch_stock_data(ticker, start_date=start_date_obj, end_date=end_date_obj)
+        with profiler.stage('fetch'):
+            stock_data = dd.fetch_stock_data(ticker, start_date=start_date_obj, end_date=end_date_obj,
+                                             cache=cache)
 
     else:
         print("Неверный выбор. Пожалуйста, попробуйте снова.")
@@ -59,32 +82,93 @@ def main():
 
     style = input("Введите стиль графика (_classic_test_patch,  bmh, classic, dark_background, fast, fivethirtyeight, ggplot, grayscale ): ")
 
+    # Запрос у пользователя ограничения числа точек на графиках (для длинной истории)
+    max_points = input("Введите максимальное число точек на графике (Enter - без прореживания): ")
+    max_points = int(max_points) if max_points.strip() else None
+
     # Вычисляем и выводим среднюю цену закрытия акций
     dd.calculate_and_display_average_price(stock_data)
 
     # Уведомление о сильных колебаниях
     dd.notify_if_strong_fluctuations(stock_data, threshold)
 
-    # Добавляем скользящее среднее в данные
-    stock_data = dd.add_moving_average(stock_data)
+    # Поиск колебаний внутри периода по скользящему окну
+    window = input("Введите длину окна в барах для поиска колебаний внутри периода (Enter - пропустить): ")
+    if window.strip():
+        events = alerts.scan_fluctuations(stock_data, int(window), threshold)
+        starts = events[events['event'] == 'start']
+        print(f"Найдено превышений порога {threshold}% в окне {window} баров: {len(starts)}")
+        if not events.empty:
+            print(events.to_string(index=False))
 
-    # Расчёт MACD и RSI
-    stock_data = dd.calculate_macd(stock_data)
-    stock_data = dd.calculate_rsi(stock_data)
+    with profiler.stage('indicators'):
+        # Добавляем скользящее среднее в данные
+        stock_data = dd.add_moving_average(stock_data)
 
-    # Добавляем стандартное отклонение в данные
-    stock_data = dd.calculate_standard_deviation(stock_data)
+        # Расчёт MACD и RSI
+        stock_data = dd.calculate_macd(stock_data)
+        stock_data = dd.calculate_rsi(stock_data)
+
+        # Добавляем стандартное отклонение в данные
+        stock_data = dd.calculate_standard_deviation(stock_data)
 
     # Рисуем график
-    dplt.create_and_save_plot(stock_data, ticker, period_choice, style)
+    with profiler.stage('matplotlib'):
+        dplt.create_and_save_plot(stock_data, ticker, period_choice, style, max_points=max_points)
 
     # Интерактивчик
-    dplt.create_interactive_plotly(stock_data, ticker)
-    dplt.create_interactive_bokeh(stock_data, ticker)
+    with profiler.stage('plotly'):
+        dplt.create_interactive_plotly(stock_data, ticker, max_points=max_points)
+    with profiler.stage('bokeh'):
+        dplt.create_interactive_bokeh(stock_data, ticker, max_points=max_points)
 
     # Экспорт данных в CSV
-    dd.export_data_to_csv(stock_data, ticker, 'custom')
+    with profiler.stage('export'):
+        dd.export_data_to_csv(stock_data, ticker, 'custom')
+
+    profiler.print_report()
+
+
+def batch_main(cache):
+    """
+    Пакетный режим: загрузка и расчет индикаторов для списка тикеров из файла.
+    """
+    path = input("Введите путь к файлу со списком тикеров (по одному или через запятую): ")
+    period = input("Введите период для данных (например, '1mo' для одного месяца): ")
+
+    tickers = batch.read_tickers(path)
+    print(f"Загружено тикеров: {len(tickers)}")
+
+    results, report = batch.run_batch(tickers, period=period, cache=cache)
+    batch.print_batch_report(report)
+
+    # Скрининг колебаний по всем тикерам одним вызовом вместо notify_if_strong_fluctuations на каждый
+    if results:
+        threshold = float(input("Введите порог колебания цены в процентах (например, 5 для 5%): "))
+        panel = screener.build_close_panel(results)
+        alerts = screener.screen_fluctuations(panel, windows=(None, 5, 21), thresholds=(threshold,),
+                                              alerts_only=True)
+        if alerts.empty:
+            print(f"Ни одна акция не колебалась более чем на {threshold}%.")
+        else:
+            print(f"Уведомление: колебания более {threshold}% (окно в барах, 'all' - весь период):")
+            print(alerts.to_string(index=False))
+
+    # Экспорт данных в CSV по каждому успешно обработанному тикеру
+    for ticker, stock_data in results.items():
+        dd.export_data_to_csv(stock_data, ticker, period)
+
+    # Один интерактивный дашборд на все тикеры вместо HTML-файла на каждый
+    dashboard.create_dashboard(results)
+
+    # Корреляции доходностей по портфелю тикеров
+    if len(results) >= 2:
+        corr = correlation.correlation_matrix(correlation.returns_panel(results))
+        dplt.create_correlation_heatmap(corr, filename=f"correlation_{period}.png")
 
 
 if __name__ == "__main__":
+    # С аргументами командной строки программа работает без интерактивного ввода (см. cli.py)
+    if len(sys.argv) > 1:
+        sys.exit(cli.main())
     main()
@@ -0,0 +1,195 @@
+import os
+import sys
+import json
+import time
+import pstats
+import cProfile
+import platform
+import threading
+import contextlib
+import tracemalloc
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows: пик RSS недоступен без сторонних библиотек
+    resource = None
+
+
+def _max_rss():
+    """Максимальный размер резидентной памяти процесса за все время работы, в байтах (или None)."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+
+def _versions():
+    versions = {'python': platform.python_version(), 'platform': platform.platform()}
+    for name in ('numpy', 'pandas', 'matplotlib', 'plotly', 'bokeh', 'yfinance'):
+        module = sys.modules.get(name)
+        if module is not None:
+            versions[name] = getattr(module, '__version__', None)
+    return versions
+
+
+class Profiler:
+    """
+    Описание: Инструментирование этапов конвейера. Для каждого этапа (и тикера внутри этапа) записываются
+    время по часам, процессорное время и пиковая память:
+    - wall - время по часам, с;
+    - cpu - процессорное время, с (для этапа - всего процесса, для тикера - потока, в котором он обработан);
+    - peak_memory - пик памяти, выделенной Python и NumPy за этап, байты (только при включенном tracemalloc);
+    - max_rss, max_rss_growth - максимум резидентной памяти процесса на конец этапа и его рост за этап, байты.
+    Память измеряется только в главном потоке: для тикеров, обработанных в пуле потоков, она не разделима.
+
+    В режиме дампа (dump_directory) для каждого этапа верхнего уровня дополнительно сохраняются профиль
+    cProfile (<этап>.prof и <этап>.txt со статистикой по cumulative) и снимок tracemalloc (<этап>.tracemalloc).
+
+    Параметры:
+    trace_memory (bool): включить tracemalloc для точного пика памяти по этапам (замедляет работу).
+    dump_directory (str): каталог для дампов cProfile и tracemalloc (None - без дампов).
+    """
+
+    def __init__(self, trace_memory=False, dump_directory=None):
+        self.dump_directory = dump_directory
+        self.trace_memory = trace_memory or dump_directory is not None
+        self.records = []
+        self.allocations = {}
+        self._depth = 0
+        self._peaks = []
+        self._profiles = {}
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self._started = (time.perf_counter(), time.process_time())
+        self._created = datetime.now().isoformat(timespec='seconds')
+
+    @contextlib.contextmanager
+    def stage(self, name, ticker=None):
+        """
+        Контекстный менеджер, измеряющий этап name (для тикера ticker, если указан).
+        Этапы тикеров можно вкладывать в этапы верхнего уровня и выполнять в пуле потоков.
+        """
+        main_thread = threading.current_thread() is threading.main_thread()
+        top_level = main_thread and self._depth == 0 and ticker is None
+        clock = time.process_time if ticker is None else time.thread_time
+
+        if main_thread:
+            self._depth += 1
+            rss_start = _max_rss()
+            if self.trace_memory:
+                self._push_peak()
+        profile = None
+        if top_level and self.dump_directory is not None:
+            profile = self._profiles.setdefault(name, cProfile.Profile())
+            profile.enable()
+
+        wall, cpu = time.perf_counter(), clock()
+        try:
+            yield
+        finally:
+            record = {'stage': name, 'ticker': ticker,
+                      'wall': time.perf_counter() - wall, 'cpu': clock() - cpu,
+                      'peak_memory': None, 'max_rss': None, 'max_rss_growth': None}
+            if profile is not None:
+                profile.disable()
+            if main_thread:
+                self._depth -= 1
+                if self.trace_memory:
+                    record['peak_memory'] = self._pop_peak()
+                rss = _max_rss()
+                if rss is not None:
+                    record.update(max_rss=rss, max_rss_growth=rss - rss_start)
+                if top_level and self.dump_directory is not None:
+                    self._snapshot(name)
+            self.records.append(record)
+
+    def _push_peak(self):
+        # Пик внешнего этапа сохраняется до сброса счетчика, чтобы вложенный этап его не потерял
+        if self._peaks:
+            self._peaks[-1] = max(self._peaks[-1], tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+        self._peaks.append(0)
+
+    def _pop_peak(self):
+        peak = max(self._peaks.pop(), tracemalloc.get_traced_memory()[1])
+        if self._peaks:
+            self._peaks[-1] = max(self._peaks[-1], peak)
+        tracemalloc.reset_peak()
+        return peak
+
+    def _snapshot(self, name):
+        os.makedirs(self.dump_directory, exist_ok=True)
+        snapshot = tracemalloc.take_snapshot()
+        snapshot.dump(os.path.join(self.dump_directory, f"{name}.tracemalloc"))
+        self.allocations[name] = [{'location': str(stat.traceback), 'size': stat.size, 'count': stat.count}
+                                  for stat in snapshot.statistics('lineno')[:10]]
+
+    def summary(self):
+        """
+        Описание: Сводка измерений: этапы верхнего уровня (сумма времени и максимум памяти по всем
+        вызовам этапа), этапы по тикерам и общие показатели с момента создания профайлера.
+
+        Возвращает: словарь, пригодный для сохранения в JSON.
+        """
+        stages, tickers = {}, {}
+        for record in self.records:
+            values = {key: record[key] for key in ('wall', 'cpu', 'peak_memory', 'max_rss', 'max_rss_growth')}
+            if record['ticker'] is None:
+                target = stages
+            else:
+                target = tickers.setdefault(record['ticker'], {})
+            entry = target.setdefault(record['stage'], {'calls': 0, 'wall': 0.0, 'cpu': 0.0, 'peak_memory': None,
+                                                        'max_rss': None, 'max_rss_growth': None})
+            entry['calls'] += 1
+            entry['wall'] += values['wall']
+            entry['cpu'] += values['cpu']
+            for key in ('peak_memory', 'max_rss', 'max_rss_growth'):
+                if values[key] is not None:
+                    entry[key] = values[key] if entry[key] is None else max(entry[key], values[key])
+
+        wall, cpu = self._started
+        result = {
+            'created': self._created,
+            'environment': _versions(),
+            'argv': sys.argv,
+            'stages': stages,
+            'tickers': tickers,
+            'total': {'wall': time.perf_counter() - wall, 'cpu': time.process_time() - cpu, 'max_rss': _max_rss()},
+        }
+        if self.allocations:
+            result['allocations'] = self.allocations
+        return result
+
+    def write_json(self, path):
+        """
+        Сохраняет summary() в JSON-файл (для сравнения результатов между версиями), а в режиме дампа -
+        профили cProfile по этапам. Возвращает путь к JSON-файлу.
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, ensure_ascii=False, indent=2)
+
+        for name, profile in self._profiles.items():
+            profile.dump_stats(os.path.join(self.dump_directory, f"{name}.prof"))
+            with open(os.path.join(self.dump_directory, f"{name}.txt"), 'w', encoding='utf-8') as f:
+                pstats.Stats(profile, stream=f).sort_stats('cumulative').print_stats(30)
+        return path
+
+    def print_report(self):
+        """
+        Выводит в консоль таблицу этапов: время по часам, процессорное время и память. С tracemalloc
+        память - пик выделений за этап, без него - рост максимума RSS процесса за этап (max_rss_growth):
+        сам max_rss - максимум за все время работы процесса и к этапу не относится.
+        """
+        summary = self.summary()
+        key, label = ('peak_memory', 'пик памяти, МБ') if self.trace_memory else ('max_rss_growth', 'рост RSS, МБ')
+        print(f"{'этап':<14} {'вызовов':>8} {'время, с':>9} {'CPU, с':>8} {label:>15}")
+        for name, entry in summary['stages'].items():
+            memory = entry[key]
+            memory = f"{memory / 2 ** 20:.1f}" if memory is not None else '-'
+            print(f"{name:<14} {entry['calls']:>8} {entry['wall']:>9.3f} {entry['cpu']:>8.3f} {memory:>15}")
+        print(f"{'всего':<14} {'':>8} {summary['total']['wall']:>9.3f} {summary['total']['cpu']:>8.3f}")
+
@@ -0,0 +1,206 @@
+import os
+import abc
+import gzip
+import zlib
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+from data_cache import period_to_dates, trim_period
+
+
+# Длина бара в минутах для внутридневных интервалов (торговая сессия 9:30-16:00, 390 минут)
+INTRADAY_MINUTES = {'1m': 1, '2m': 2, '5m': 5, '15m': 15, '30m': 30, '60m': 60, '90m': 90, '1h': 60}
+SESSION_MINUTES = 390
+
+
+def _select(data, start_date=None, end_date=None):
+    """Строки data за полуинтервал [start_date, end_date) по индексу без часового пояса."""
+    index = pd.DatetimeIndex(data.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    mask = np.ones(len(index), dtype=bool)
+    if start_date is not None:
+        mask &= index >= pd.Timestamp(start_date)
+    if end_date is not None:
+        mask &= index < pd.Timestamp(end_date)
+    return data[mask]
+
+
+class MarketDataProvider(abc.ABC):
+    """
+    Описание: Интерфейс источника котировок. Метод history возвращает DataFrame в формате
+    yfinance (колонки Open, High, Low, Close, Volume, индекс - даты) за даты или за период.
+    Объект провайдера можно вызывать как функцию source(ticker, start_date, end_date, interval)
+    и передавать в StockDataCache.
+    """
+
+    @abc.abstractmethod
+    def history(self, ticker, start_date=None, end_date=None, period=None, interval='1d'):
+        """Котировки тикера за полуинтервал [start_date, end_date) или за период period."""
+
+    def __call__(self, ticker, start_date, end_date, interval='1d'):
+        return self.history(ticker, start_date, end_date, interval=interval)
+
+
+class YFinanceProvider(MarketDataProvider):
+    """Котировки из сети через yfinance.Ticker.history (поведение fetch_stock_data по умолчанию)."""
+
+    def history(self, ticker, start_date=None, end_date=None, period=None, interval='1d'):
+        stock = yf.Ticker(ticker)
+        if start_date and end_date:
+            return stock.history(start=start_date, end=end_date, interval=interval)
+        return stock.history(period=period, interval=interval)
+
+
+class LocalFileProvider(MarketDataProvider):
+    """
+    Описание: Котировки из локального каталога: файл <тикер>.parquet, <тикер>.feather, <тикер>.csv
+    или <тикер>.csv.gz (первая колонка CSV - даты). Файл читается один раз и повторно - только после
+    изменения. Период отсчитывается от последнего бара в файле, а не от текущей даты, чтобы старые
+    выгрузки давали одинаковый результат при каждом запуске.
+
+    Параметры:
+    directory (str): каталог с файлами.
+    sep (str): разделитель CSV; None - определяется по заголовку файла (export_data_to_csv пишет ';').
+    """
+
+    EXTENSIONS = ('.parquet', '.feather', '.csv', '.csv.gz')
+
+    def __init__(self, directory, sep=None):
+        self.directory = directory
+        self.sep = sep
+        self._loaded = {}
+
+    def _path(self, ticker):
+        for extension in self.EXTENSIONS:
+            path = os.path.join(self.directory, f"{ticker}{extension}")
+            if os.path.exists(path):
+                return path
+        raise FileNotFoundError(f"Нет файла котировок для {ticker} в каталоге {self.directory}")
+
+    @staticmethod
+    def _sniff(path):
+        """Разделитель CSV по строке заголовка: ';' (выгрузки этого проекта) или ','."""
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rt', encoding='utf-8') as f:
+            header = f.readline()
+        return ';' if header.count(';') > header.count(',') else ','
+
+    def load(self, ticker):
+        """Читает все котировки тикера из файла."""
+        path = self._path(ticker)
+        mtime = os.path.getmtime(path)
+        if path in self._loaded and self._loaded[path][0] == mtime:
+            return self._loaded[path][1]
+
+        if path.endswith(('.parquet', '.feather')):
+            data = pd.read_parquet(path) if path.endswith('.parquet') else pd.read_feather(path)
+            # Файлы из pandas (exporters) хранят индекс дат в метаданных; без них даты - первая колонка
+            if isinstance(data.index, pd.RangeIndex):
+                data = data.set_index(data.columns[0])
+        else:
+            data = pd.read_csv(path, sep=self.sep or self._sniff(path), index_col=0)
+            try:
+                data.index = pd.to_datetime(data.index, format='ISO8601')
+            except ValueError:
+                # Даты с разными смещениями часового пояса (например, летнее и зимнее время)
+                data.index = pd.to_datetime(data.index, format='ISO8601', utc=True)
+        data = data.sort_index()
+        self._loaded[path] = (mtime, data)
+        return data
+
+    def history(self, ticker, start_date=None, end_date=None, period=None, interval='1d'):
+        data = self.load(ticker)
+        if start_date and end_date:
+            return _select(data, start_date, end_date)
+        if data.empty or period is None:
+            return data
+        last = pd.Timestamp(data.index[-1])
+        if last.tz is not None:
+            last = last.tz_localize(None)
+        return trim_period(_select(data, *period_to_dates(period, now=last.to_pydatetime())), period)
+
+
+class SyntheticProvider(MarketDataProvider):
+    """
+    Описание: Синтетические котировки - случайное блуждание логарифма цены - любого объема без сети.
+    Ряд тикера детерминирован (зависит от seed, тикера и интервала) и всегда строится от даты origin,
+    поэтому одна и та же дата в разных запросах дает одну и ту же цену, а кэш и догрузка работают как
+    с настоящим источником. Бары будущего не создаются.
+
+    Параметры:
+    seed (int): зерно генератора.
+    start_price (float): цена в дату origin.
+    volatility (float): стандартное отклонение дневной лог-доходности (внутридневная пересчитывается).
+    origin (str): дата начала истории.
+    timezone (str): часовой пояс индекса.
+    """
+
+    def __init__(self, seed=0, start_price=100.0, volatility=0.02, origin='2000-01-03', timezone='America/New_York'):
+        self.seed = seed
+        self.start_price = start_price
+        self.volatility = volatility
+        self.origin = pd.Timestamp(origin)
+        self.timezone = timezone
+
+    def _index(self, end_date, interval):
+        days = pd.bdate_range(self.origin, pd.Timestamp(end_date).normalize(), tz=self.timezone)
+        if interval == '1d':
+            return days.rename('Date')
+        if interval not in INTRADAY_MINUTES:
+            raise ValueError(f"Неподдерживаемый интервал синтетических данных: {interval}")
+        step = INTRADAY_MINUTES[interval]
+        offsets = pd.timedelta_range('09:30:00', periods=-(-SESSION_MINUTES // step), freq=f'{step}min')
+        return (days.repeat(len(offsets)) + np.tile(offsets, len(days))).rename('Datetime')
+
+    def generate(self, ticker, end_date, interval='1d'):
+        """
+        Описание: Строит ряд тикера от origin до end_date (не включая).
+
+        Возвращает: DataFrame в формате yfinance (Open, High, Low, Close, Volume, Dividends, Stock Splits).
+        """
+        index = self._index(end_date, interval)
+        index = index[index.tz_localize(None) < pd.Timestamp(end_date)]
+        bars_per_day = 1 if interval == '1d' else -(-SESSION_MINUTES // INTRADAY_MINUTES[interval])
+        sigma = self.volatility / np.sqrt(bars_per_day)
+
+        rng = np.random.default_rng([self.seed, zlib.crc32(ticker.encode()), zlib.crc32(interval.encode())])
+        n = len(index)
+        close = self.start_price * np.exp(np.cumsum(rng.normal(0, sigma, n)))
+        open_ = np.concatenate(([self.start_price], close))[:n]
+        wick = np.abs(rng.normal(0, sigma / 2, (2, n)))
+        return pd.DataFrame({
+            'Open': open_,
+            'High': np.maximum(open_, close) * (1 + wick[0]),
+            'Low': np.minimum(open_, close) * (1 - wick[1]),
+            'Close': close,
+            'Volume': rng.lognormal(13, 0.5, n).astype(np.int64) // bars_per_day,
+            'Dividends': 0.0,
+            'Stock Splits': 0.0,
+        }, index=index)
+
+    def history(self, ticker, start_date=None, end_date=None, period=None, interval='1d'):
+        by_period = not (start_date and end_date)
+        if by_period:
+            start_date, end_date = period_to_dates(period)
+        end_date = min(pd.Timestamp(end_date), pd.Timestamp(datetime.now()))
+        data = _select(self.generate(ticker, end_date, interval), start_date, end_date)
+        return trim_period(data, period) if by_period else data
+
+
+# Доступные провайдеры: имя -> класс
+PROVIDERS = {
+    'yfinance': YFinanceProvider,
+    'local': LocalFileProvider,
+    'synthetic': SyntheticProvider,
+}
+
+
+def get_provider(name, **kwargs):
+    """Создает провайдера по имени из PROVIDERS с параметрами kwargs."""
+    if name not in PROVIDERS:
+        raise ValueError(f"Неизвестный провайдер: {name}. Доступны: {', '.join(PROVIDERS)}")
+    return PROVIDERS[name](**kwargs)
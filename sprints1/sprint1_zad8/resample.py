@@ -0,0 +1,205 @@
+import numpy as np
+import pandas as pd
+
+import indicators
+
+
+MINUTE = 60 * 10 ** 9
+DAY = 24 * 60 * MINUTE
+
+# Начало торговой сессии: внутридневные бары отсчитываются от 9:30, как часовые бары yfinance
+SESSION_OPEN = (9 * 60 + 30) * MINUTE
+
+# Таймфреймы: (длина бара, сдвиг начала бара) в наносекундах местного времени.
+# Неделя начинается в понедельник (1970-01-05 - понедельник, 4 дня от начала эпохи).
+TIMEFRAMES = {
+    '1m': (MINUTE, 0),
+    '5m': (5 * MINUTE, SESSION_OPEN % (5 * MINUTE)),
+    '15m': (15 * MINUTE, SESSION_OPEN % (15 * MINUTE)),
+    '30m': (30 * MINUTE, SESSION_OPEN % (30 * MINUTE)),
+    '1h': (60 * MINUTE, SESSION_OPEN % (60 * MINUTE)),
+    '1d': (DAY, 0),
+    '1w': (7 * DAY, 4 * DAY),
+}
+
+# Правила агрегации колонок; остальные колонки в результат не попадают
+AGGREGATIONS = {
+    'Open': 'first',
+    'High': 'max',
+    'Low': 'min',
+    'Close': 'last',
+    'Volume': 'sum',
+    'Dividends': 'sum',
+    'Stock Splits': 'max',
+}
+
+
+def _timeframe(name):
+    if name not in TIMEFRAMES:
+        raise ValueError(f"Неизвестный таймфрейм: {name}. Доступны: {', '.join(TIMEFRAMES)}")
+    return TIMEFRAMES[name]
+
+
+# Наносекунд в единице хранения индекса pandas
+UNIT_NS = {'s': 10 ** 9, 'ms': 10 ** 6, 'us': 10 ** 3, 'ns': 1}
+
+
+def _local_ticks(index):
+    """
+    Время баров по местным часам (для разбиения на дни и недели без учета смещения UTC) в единицах
+    хранения индекса, без перевода в наносекунды. Возвращает пару (значения int64, единица).
+    """
+    index = pd.DatetimeIndex(index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return index.asi8, index.unit
+
+
+def _local_ns(index):
+    """Время баров в наносекундах по местным часам."""
+    values, unit = _local_ticks(index)
+    return values * UNIT_NS[unit]
+
+
+def nests(fine, coarse, data=None):
+    """
+    Можно ли строить таймфрейм coarse из уже агрегированного fine: каждый бар fine целиком
+    попадает в один бар coarse. Часовые бары с 9:30 в общем случае не вкладываются в дни (бар 23:30
+    пересек бы полночь); если передан data - бары fine, проверяются их фактические интервалы, и для
+    торговой сессии внутри дня дневные бары из часовых строить можно.
+    """
+    fine_step, fine_offset = _timeframe(fine)
+    coarse_step, coarse_offset = _timeframe(coarse)
+    if coarse_step % fine_step:
+        return False
+    if (coarse_offset - fine_offset) % fine_step == 0:
+        return True
+    if data is None:
+        return False
+    starts = _local_ns(data.index)
+    return np.array_equal((starts - coarse_offset) // coarse_step,
+                          (starts + fine_step - 1 - coarse_offset) // coarse_step)
+
+
+def resample_ohlcv(data, timeframe):
+    """
+    Описание: Агрегирует бары в более крупный таймфрейм за один проход: номер бара нового таймфрейма
+    считается целочисленной арифметикой по времени, границы групп находятся одним сравнением соседних
+    номеров, а каждая колонка сворачивается по группам ufunc.reduceat (Open - первый, High - максимум,
+    Low - минимум, Close - последний, Volume - сумма). Пустые интервалы (ночь, выходные) не создаются.
+    Метка бара - его начало по местному времени (например, 10:30 для часа 10:30-11:30, полночь для дня,
+    понедельник для недели).
+
+    Параметры:
+    data (DataFrame): бары, отсортированные по времени, с колонками Open, High, Low, Close, Volume.
+    timeframe (str): '1m', '5m', '15m', '30m', '1h', '1d' или '1w'.
+
+    Возвращает: DataFrame с агрегированными барами в том же часовом поясе.
+    """
+    step, offset = _timeframe(timeframe)
+    columns = [column for column in AGGREGATIONS if column in data.columns]
+    if data.empty:
+        return data[columns].iloc[:0]
+
+    ticks, unit = _local_ticks(data.index)
+    step, offset = step // UNIT_NS[unit], offset // UNIT_NS[unit]
+    codes = (ticks - offset) // step
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(codes)) + 1))
+    ends = np.concatenate((starts[1:], [len(codes)])) - 1
+
+    result = {}
+    for column in columns:
+        values = data[column].to_numpy()
+        rule = AGGREGATIONS[column]
+        if rule == 'first':
+            result[column] = values[starts]
+        elif rule == 'last':
+            result[column] = values[ends]
+        elif rule == 'max':
+            result[column] = np.fmax.reduceat(values, starts)
+        elif rule == 'min':
+            result[column] = np.fmin.reduceat(values, starts)
+        else:
+            result[column] = np.add.reduceat(values, starts)
+
+    labels = pd.DatetimeIndex((codes[starts] * step + offset).astype(f'datetime64[{unit}]'), name=data.index.name)
+    tz = getattr(data.index, 'tz', None)
+    if tz is not None:
+        labels = labels.tz_localize(tz, ambiguous=np.ones(len(labels), dtype=bool), nonexistent='shift_forward')
+    return pd.DataFrame(result, index=labels)
+
+
+class TimeframeCache:
+    """
+    Описание: Набор таймфреймов одного тикера, построенных из одной загрузки мелких баров.
+    Каждый производный таймфрейм считается один раз и кэшируется; более крупный строится из самого
+    крупного уже готового таймфрейма, который в него вкладывается (1h из 5m, 1d из 1h и т.д.),
+    а не из исходных баров. Индикаторы по таймфреймам тоже кэшируются. При дозагрузке новых баров
+    (extend) пересчитываются только последние бары каждого таймфрейма.
+
+    Параметры:
+    data (DataFrame): исходные бары (например, fetch_stock_data(..., interval='1m')).
+    base (str): таймфрейм исходных баров.
+    """
+
+    def __init__(self, data, base='1m'):
+        _timeframe(base)
+        self.base = base
+        self.frames = {base: data.sort_index()}
+        self._indicators = {}
+
+    def _source(self, timeframe):
+        candidates = [name for name, frame in self.frames.items()
+                      if name != timeframe and nests(name, timeframe, frame)]
+        if self.base not in candidates:
+            raise ValueError(f"Таймфрейм {timeframe} нельзя построить из баров {self.base}")
+        return max(candidates, key=lambda name: TIMEFRAMES[name][0])
+
+    def get(self, timeframe):
+        """Возвращает бары таймфрейма timeframe (из кэша или агрегируя ближайший более мелкий)."""
+        if timeframe not in self.frames:
+            self.frames[timeframe] = resample_ohlcv(self.frames[self._source(timeframe)], timeframe)
+        return self.frames[timeframe]
+
+    def get_many(self, timeframes):
+        """Строит несколько таймфреймов от мелкого к крупному. Возвращает словарь {таймфрейм: DataFrame}."""
+        for timeframe in sorted(timeframes, key=lambda name: TIMEFRAMES[name][0]):
+            self.get(timeframe)
+        return {timeframe: self.frames[timeframe] for timeframe in timeframes}
+
+    def indicators(self, timeframe, indicator_set=indicators.DEFAULT_INDICATORS):
+        """
+        Возвращает бары таймфрейма с индикаторами (indicators.apply_indicators), результат кэшируется.
+        """
+        key = (timeframe, repr(indicator_set))
+        if key not in self._indicators:
+            self._indicators[key] = indicators.apply_indicators(self.get(timeframe), indicator_set)
+        return self._indicators[key]
+
+    def extend(self, data):
+        """
+        Описание: Добавляет новые исходные бары (повторяющиеся метки заменяются новыми). В каждом
+        производном таймфрейме пересчитываются только бары начиная с того, в который попадает
+        первый новый бар; кэш индикаторов сбрасывается.
+
+        Параметры:
+        data (DataFrame): новые бары исходного таймфрейма.
+        """
+        if data.empty:
+            return
+        data = data.sort_index()
+        first = _local_ns(data.index[:1])[0]
+        base = pd.concat([self.frames[self.base], data])
+        self.frames[self.base] = base[~base.index.duplicated(keep='last')].sort_index()
+        self._indicators.clear()
+
+        # Крупные таймфреймы обновляются после мелких, из которых строятся
+        derived = sorted((name for name in self.frames if name != self.base), key=lambda name: TIMEFRAMES[name][0])
+        for timeframe in derived:
+            step, offset = TIMEFRAMES[timeframe]
+            cut = (first - offset) // step * step + offset
+            source = self.frames[self._source(timeframe)]
+            tail = source[_local_ns(source.index) >= cut]
+            frame = self.frames[timeframe]
+            head = frame[_local_ns(frame.index) < cut]
+            self.frames[timeframe] = pd.concat([head, resample_ohlcv(tail, timeframe)])
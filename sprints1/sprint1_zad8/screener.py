@@ -0,0 +1,127 @@
+import numpy as np
+import pandas as pd
+
+
+# Колонки таблицы screen_fluctuations
+RESULT_COLUMNS = ['ticker', 'window', 'threshold', 'fluctuation', 'peak_date', 'breach_bars', 'alert']
+
+
+def build_close_panel(datasets):
+    """
+    Собирает широкую таблицу цен закрытия (даты x тикеры) из словаря {тикер: DataFrame}.
+    Даты объединяются, у тикеров без бара на дату стоит NaN.
+    """
+    return pd.concat({ticker: data['Close'] for ticker, data in datasets.items()}, axis=1).sort_index()
+
+
+def _check_window(window, rows):
+    """Окно должно быть положительным и не длиннее истории: иначе посчитался бы другой показатель."""
+    if window < 1:
+        raise ValueError("Длина окна должна быть положительной")
+    if window > rows:
+        raise ValueError(f"Окно {window} баров длиннее истории ({rows} баров)")
+
+
+def _rolling_extreme(values, window, accumulate):
+    """
+    Скользящий максимум или минимум по оси 0 для всех колонок сразу алгоритмом ван Херка - Гил-Вермана:
+    массив режется на блоки длины window, внутри блоков считаются префиксные и суффиксные экстремумы,
+    и экстремум любого окна - это экстремум суффикса одного блока и префикса следующего. Стоимость O(n)
+    при любой длине окна. NaN пропускаются; для окон, не помещающихся в начало ряда, результат NaN.
+    """
+    rows, columns = values.shape
+    blocks = -(-rows // window)
+    padded = np.full((blocks * window, columns), np.nan)
+    padded[:rows] = values
+    padded = padded.reshape(blocks, window, columns)
+
+    prefix = accumulate(padded, axis=1).reshape(-1, columns)
+    suffix = accumulate(padded[:, ::-1], axis=1)[:, ::-1].reshape(-1, columns)
+
+    out = np.full((rows, columns), np.nan)
+    ends = np.arange(window - 1, rows)
+    out[window - 1:] = accumulate(np.stack((suffix[ends - window + 1], prefix[ends])), axis=0)[-1]
+    return out
+
+
+def rolling_fluctuation(panel, window=None):
+    """
+    Описание: Колебание цены в процентах, (max - min) / min * 100, по скользящему окну из window баров
+    для всех тикеров панели одной векторной операцией. При window=None окно - весь период, как в
+    notify_if_strong_fluctuations.
+
+    Параметры:
+    panel (DataFrame): цены закрытия, даты x тикеры.
+    window (int): длина окна в барах (None - весь период). Неположительное окно и окно длиннее истории -
+    ValueError.
+
+    Возвращает: DataFrame той же формы, что panel; значение в строке - колебание в окне, заканчивающемся на этом баре.
+    """
+    values = panel.to_numpy(dtype=np.float64)
+    if window is not None:
+        _check_window(window, len(values))
+    if len(values) == 0:
+        return pd.DataFrame(values, index=panel.index, columns=panel.columns)
+    window = len(values) if window is None else window
+    highs = _rolling_extreme(values, window, np.fmax.accumulate)
+    lows = _rolling_extreme(values, window, np.fmin.accumulate)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fluctuation = (highs - lows) / lows * 100
+    return pd.DataFrame(fluctuation, index=panel.index, columns=panel.columns)
+
+
+def screen_fluctuations(panel, windows=(None,), thresholds=(5,), alerts_only=False):
+    """
+    Описание: Скринер сильных колебаний для всего набора тикеров за один вызов. Для каждого окна
+    колебания считаются сразу по всей панели, затем сравниваются со всеми порогами.
+
+    Параметры:
+    panel (DataFrame): цены закрытия, даты x тикеры (см. build_close_panel).
+    windows (list): длины окон в барах; None - весь период. Неположительное окно - ValueError, окна
+    длиннее истории пропускаются с сообщением.
+    thresholds (list): пороги колебания в процентах.
+    alerts_only (bool): вернуть только строки, где порог превышен.
+
+    Возвращает: DataFrame с колонками ticker, window, threshold, fluctuation (наибольшее колебание, %),
+    peak_date (конец окна с наибольшим колебанием), breach_bars (число окон с превышением порога), alert.
+    """
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    tickers = np.asarray(panel.columns)
+    for window in windows:
+        if window is not None and window < 1:
+            raise ValueError("Длина окна должна быть положительной")
+    if panel.empty:
+        # Нет баров или тикеров: скользящих окон нет
+        return pd.DataFrame(columns=RESULT_COLUMNS)
+    frames = []
+    for window in windows:
+        if window is not None and window > len(panel):
+            print(f"Окно {window} баров длиннее истории ({len(panel)} баров) - колебания в нем не считаются")
+            continue
+        fluctuation = rolling_fluctuation(panel, window).to_numpy()
+        valid = ~np.isnan(fluctuation).all(axis=0)
+        peak = np.full(len(tickers), np.nan)
+        peak_date = np.full(len(tickers), pd.NaT, dtype=object)
+        peak[valid] = np.nanmax(fluctuation[:, valid], axis=0)
+        peak_date[valid] = panel.index[np.nanargmax(fluctuation[:, valid], axis=0)]
+
+        # Превышения по всем порогам сразу: пороги x бары x тикеры
+        with np.errstate(invalid='ignore'):
+            breaches = (fluctuation[None, :, :] > thresholds[:, None, None]).sum(axis=1)
+
+        frames.append(pd.DataFrame({
+            'ticker': np.tile(tickers, len(thresholds)),
+            'window': 'all' if window is None else window,
+            'threshold': np.repeat(thresholds, len(tickers)),
+            'fluctuation': np.tile(peak, len(thresholds)),
+            'peak_date': np.tile(peak_date, len(thresholds)),
+            'breach_bars': breaches.ravel(),
+        }))
+
+    if not frames:
+        return pd.DataFrame(columns=RESULT_COLUMNS)
+    result = pd.concat(frames, ignore_index=True)
+    result['alert'] = result['breach_bars'] > 0
+    if alerts_only:
+        result = result[result['alert']]
+    return result.sort_values(['alert', 'fluctuation'], ascending=False, ignore_index=True)
@@ -0,0 +1,328 @@
+import sys
+import json
+import time
+import asyncio
+import argparse
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit, parse_qs
+
+import matplotlib.style as mplstyle
+
+import data_download as dd
+import data_plotting as dplt
+import indicators
+from batch_plotting import ChartRenderer
+from compact import memory_usage
+from data_cache import StockDataCache, PERIODS, INTERVALS
+from providers import PROVIDERS, get_provider
+
+
+HTTP_STATUS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 500: 'Internal Server Error'}
+
+# Время жизни кэшированных данных и ответов в секундах, если диапазон захватывает текущий день
+DEFAULT_TTL = 300
+
+CONTENT_TYPES = {
+    'png': 'image/png',
+    'html': 'text/html; charset=utf-8',
+    'json': 'application/json; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+
+class LRUCache:
+    """
+    Описание: Кэш с вытеснением давно не использованных элементов по числу элементов и общему размеру.
+    Элемент может иметь время жизни: после него get возвращает None, как при промахе.
+
+    Параметры:
+    max_items (int): наибольшее число элементов.
+    max_bytes (int): наибольший общий размер элементов в байтах.
+    size (function): размер элемента в байтах (по умолчанию len).
+    """
+
+    def __init__(self, max_items=256, max_bytes=64 * 2 ** 20, size=len):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.size = size
+        self.items = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        if key in self.items and self.items[key][2] is not None and self.items[key][2] <= time.monotonic():
+            self.bytes -= self.items.pop(key)[1]
+        if key not in self.items:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.items.move_to_end(key)
+        return self.items[key][0]
+
+    def put(self, key, value, ttl=None):
+        """Добавляет элемент; ttl - время жизни в секундах (None - без ограничения)."""
+        size = self.size(value)
+        if size > self.max_bytes:
+            return
+        if key in self.items:
+            self.bytes -= self.items.pop(key)[1]
+        self.items[key] = (value, size, None if ttl is None else time.monotonic() + ttl)
+        self.bytes += size
+        while len(self.items) > self.max_items or self.bytes > self.max_bytes:
+            self.bytes -= self.items.popitem(last=False)[1][1]
+
+    def stats(self):
+        return {'items': len(self.items), 'bytes': self.bytes, 'hits': self.hits, 'misses': self.misses}
+
+
+# Рендереры процесса-обработчика по стилям: фигура строится один раз на процесс
+_renderers = {}
+
+
+def _render_png(data, ticker, style, max_points):
+    if style not in _renderers:
+        _renderers[style] = ChartRenderer(style)
+    return _renderers[style].render_bytes(data, ticker, max_points)
+
+
+def _render_html(data, ticker, max_points):
+    return dplt.plotly_figure(data, ticker, max_points).to_html(include_plotlyjs='cdn').encode('utf-8')
+
+
+class ReportServer:
+    """
+    Описание: Асинхронный HTTP-сервис с данными индикаторов и графиками по тикеру и диапазону дат.
+    Одинаковые одновременные запросы объединяются: данные загружаются и график строится один раз, а все
+    ожидающие клиенты получают один результат. Готовые ответы (PNG, HTML, JSON, CSV) и загруженные данные
+    хранятся в LRU-кэшах. Загрузка котировок выполняется в пуле потоков, построение графиков - в пуле
+    процессов, поэтому медленный рендер не задерживает других клиентов.
+
+    Адреса (параметры запроса: period - период yfinance, по умолчанию 1y, или start и end в формате
+    YYYY-MM-DD; interval - интервал баров, по умолчанию 1d; max_points - прореживание графиков):
+    /data/<тикер>.json, /data/<тикер>.csv - котировки с индикаторами;
+    /chart/<тикер>.png?style=... - график в формате create_and_save_plot;
+    /chart/<тикер>.html - интерактивный график Plotly;
+    /stats - состояние кэшей.
+
+    Параметры:
+    cache (StockDataCache): локальный кэш котировок (по умолчанию без кэша).
+    provider (MarketDataProvider): источник котировок (по умолчанию yfinance).
+    processes (int): число процессов рендеринга (по умолчанию по числу ядер).
+    max_items (int), max_bytes (int): размеры LRU-кэша ответов.
+    ttl (int): время жизни в секундах данных и ответов, диапазон которых захватывает текущий день
+    (запросы по периоду и с датой окончания не раньше сегодняшней); прошлые диапазоны не устаревают.
+    """
+
+    def __init__(self, cache=None, provider=None, processes=None, max_items=256, max_bytes=64 * 2 ** 20,
+                 ttl=DEFAULT_TTL):
+        self.cache = cache
+        self.provider = provider
+        self.ttl = ttl
+        self.responses = LRUCache(max_items, max_bytes)
+        self.datasets = LRUCache(32, 4 * max_bytes, size=memory_usage)
+        self._pending = {}
+        self._threads = ThreadPoolExecutor(max_workers=8)
+        # Процессы запускаются через spawn: fork процесса с работающими потоками загрузки может зависнуть
+        self._processes = ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context('spawn'))
+
+    def _ttl(self, end):
+        """Время жизни результата: диапазоны, захватывающие текущий день, еще дополняются новыми барами."""
+        return None if end is not None and end < datetime.now() - timedelta(days=1) else self.ttl
+
+    async def _coalesce(self, key, lru, factory, ttl=None):
+        """
+        Результат из LRU-кэша, иначе из уже выполняющейся задачи с тем же ключом, иначе новая задача.
+        Задача защищена от отмены: если клиент отключился, остальные ожидающие получат результат.
+        """
+        value = lru.get(key)
+        if value is not None:
+            return value
+        if key not in self._pending:
+            async def run():
+                try:
+                    result = await factory()
+                    lru.put(key, result, ttl)
+                    return result
+                finally:
+                    del self._pending[key]
+            self._pending[key] = asyncio.ensure_future(run())
+        return await asyncio.shield(self._pending[key])
+
+    def _load(self, ticker, start, end, period, interval):
+        data = dd.fetch_stock_data(ticker, start, end, period, cache=self.cache, provider=self.provider,
+                                   interval=interval)
+        if data.empty:
+            raise LookupError(f"Нет данных для {ticker}")
+        return indicators.apply_indicators(data)
+
+    async def dataset(self, ticker, start=None, end=None, period='1y', interval='1d'):
+        """Котировки тикера с индикаторами (загрузка в пуле потоков, с объединением запросов и кэшем)."""
+        loop = asyncio.get_running_loop()
+        key = ('data', ticker, start, end, None if start else period, interval)
+        return await self._coalesce(key, self.datasets, lambda: loop.run_in_executor(
+            self._threads, self._load, ticker, start, end, period, interval), self._ttl(end))
+
+    @staticmethod
+    def _options(query):
+        def value(name, default=None):
+            return query.get(name, [default])[0]
+        start, end = value('start'), value('end')
+        if bool(start) != bool(end):
+            raise ValueError("Нужно указать обе даты: start и end")
+        period, interval, style = value('period', '1y'), value('interval', '1d'), value('style', 'default')
+        if period not in PERIODS:
+            raise ValueError(f"Неизвестный период: {period}. Доступны: {', '.join(PERIODS)}")
+        if interval not in INTERVALS:
+            raise ValueError(f"Неизвестный интервал: {interval}. Доступны: {', '.join(INTERVALS)}")
+        # Стили - только встроенные: путь к файлу стиля из запроса не принимается
+        if style != 'default' and style not in mplstyle.available:
+            raise ValueError(f"Неизвестный стиль графика: {style}")
+        max_points = value('max_points')
+        try:
+            max_points = int(max_points) if max_points else None
+        except ValueError:
+            raise ValueError(f"max_points должно быть целым числом: {max_points}")
+        if max_points is not None and max_points < 3:
+            raise ValueError("max_points должно быть не меньше 3")
+        try:
+            start = datetime.fromisoformat(start) if start else None
+            end = datetime.fromisoformat(end) if end else None
+        except ValueError:
+            raise ValueError("Даты start и end задаются в формате YYYY-MM-DD")
+        if start is not None and start > end:
+            raise ValueError("Дата start должна быть не позже end")
+        return {
+            'start': start,
+            'end': end,
+            'period': period,
+            'interval': interval,
+            'max_points': max_points,
+            'style': style,
+        }
+
+    async def respond(self, path, query):
+        """
+        Описание: Обрабатывает запрос GET.
+
+        Возвращает: кортеж (код ответа, тип содержимого, тело в bytes).
+        """
+        if path == '/stats':
+            stats = {'responses': self.responses.stats(), 'datasets': self.datasets.stats(), 'pending': len(self._pending)}
+            return 200, CONTENT_TYPES['json'], json.dumps(stats).encode('utf-8')
+
+        parts = path.strip('/').split('/')
+        if len(parts) != 2 or parts[0] not in ('data', 'chart') or '.' not in parts[1]:
+            return 404, CONTENT_TYPES['json'], b'{"error": "not found"}'
+        kind, (ticker, fmt) = parts[0], parts[1].rsplit('.', 1)
+        # Тикер в верхнем регистре: aapl и AAPL - один и тот же ключ кэша и объединения запросов
+        ticker = ticker.upper()
+        if (kind, fmt) not in (('data', 'json'), ('data', 'csv'), ('chart', 'png'), ('chart', 'html')):
+            return 404, CONTENT_TYPES['json'], b'{"error": "not found"}'
+
+        options = self._options(query)
+        data_options = {name: options[name] for name in ('start', 'end', 'period', 'interval')}
+        if options['start']:
+            data_options['period'] = None
+        # В ключ ответа входят только параметры, от которых он зависит: стиль - только у PNG
+        key_options = dict(data_options)
+        if kind == 'chart':
+            key_options['max_points'] = options['max_points']
+        if fmt == 'png':
+            key_options['style'] = options['style']
+        key = (kind, fmt, ticker, tuple(sorted(key_options.items(), key=lambda item: item[0])))
+        loop = asyncio.get_running_loop()
+
+        async def build():
+            data = await self.dataset(ticker, **data_options)
+            if fmt == 'json':
+                return data.to_json(orient='split', date_format='iso').encode('utf-8')
+            if fmt == 'csv':
+                return data.to_csv(sep=';').encode('utf-8')
+            if fmt == 'png':
+                return await loop.run_in_executor(self._processes, _render_png, data, ticker,
+                                                  options['style'], options['max_points'])
+            return await loop.run_in_executor(self._processes, _render_html, data, ticker, options['max_points'])
+
+        return 200, CONTENT_TYPES[fmt], await self._coalesce(key, self.responses, build, self._ttl(options['end']))
+
+    async def handle(self, reader, writer):
+        """Обслуживает одно соединение: читает запрос, отправляет ответ и закрывает соединение."""
+        try:
+            request = await reader.readline()
+            while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                pass
+            try:
+                method, target, _ = request.decode('latin-1').split(' ', 2)
+            except ValueError:
+                return
+            url = urlsplit(target)
+            try:
+                if method != 'GET':
+                    status, content_type, body = 405, CONTENT_TYPES['json'], b'{"error": "method not allowed"}'
+                else:
+                    status, content_type, body = await self.respond(url.path, parse_qs(url.query))
+            except (ValueError, LookupError) as e:
+                status, content_type = (404 if isinstance(e, LookupError) else 400), CONTENT_TYPES['json']
+                body = json.dumps({'error': str(e)}, ensure_ascii=False).encode('utf-8')
+            except Exception as e:
+                status, content_type = 500, CONTENT_TYPES['json']
+                body = json.dumps({'error': f"{type(e).__name__}: {e}"}).encode('utf-8')
+
+            writer.write(f"HTTP/1.1 {status} {HTTP_STATUS[status]}\r\nContent-Type: {content_type}\r\n"
+                         f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode('latin-1') + body)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host='127.0.0.1', port=8080):
+        """Запускает сервер и обслуживает запросы до остановки."""
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"Сервер отчетов: http://{host}:{port}/chart/AAPL.png?period=1y")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.close()
+
+    def close(self):
+        """Останавливает пулы потоков и процессов."""
+        self._threads.shutdown(wait=False)
+        self._processes.shutdown(wait=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP-сервер данных и графиков акций")
+    parser.add_argument('--host', default='127.0.0.1', help="адрес (по умолчанию 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=8080, help="порт (по умолчанию 8080)")
+    parser.add_argument('--provider', choices=list(PROVIDERS), default='yfinance', help="источник котировок")
+    parser.add_argument('--data-dir', help="каталог с файлами котировок для провайдера local")
+    parser.add_argument('--no-cache', dest='cache', action='store_false', help="не использовать локальный кэш котировок")
+    parser.add_argument('--processes', type=int, help="число процессов рендеринга (по умолчанию по числу ядер)")
+    parser.add_argument('--ttl', type=int, default=DEFAULT_TTL,
+                        help=f"время жизни данных и ответов за текущий день в секундах (по умолчанию {DEFAULT_TTL})")
+    options = parser.parse_args(argv)
+
+    if options.provider == 'local':
+        if not options.data_dir:
+            parser.error("для провайдера local нужен --data-dir")
+        provider = get_provider('local', directory=options.data_dir)
+    else:
+        provider = get_provider(options.provider)
+    cache = StockDataCache(source=provider) if options.cache and options.provider == 'yfinance' else None
+
+    server = ReportServer(cache, provider, options.processes, ttl=options.ttl)
+    try:
+        asyncio.run(server.serve(options.host, options.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
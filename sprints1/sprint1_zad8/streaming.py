@@ -0,0 +1,321 @@
+import math
+from collections import deque
+
+import numpy as np
+
+from indicators import ewm_mean
+
+
+class RollingStats:
+    """
+    Описание: Скользящие среднее и стандартное отклонение по окну из window последних значений.
+    Обновление за O(1): при сдвиге окна среднее и сумма квадратов отклонений пересчитываются
+    по формуле Уэлфорда для замены одного значения другим. Раз в window обновлений они считаются
+    заново по самому окну, чтобы ошибка округления не накапливалась (амортизированно это тоже O(1)).
+    Пропуск (NaN) делает значения NaN, пока он в окне (как pandas rolling); после его выхода из окна
+    среднее и сумма квадратов считаются заново.
+
+    Параметры:
+    window (int): размер окна.
+    """
+
+    def __init__(self, window=5):
+        self.window = window
+        self.values = deque()
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.updates = 0
+        # Количество пропусков (NaN) в окне
+        self.missing = 0
+
+    def seed(self, history):
+        """Инициализирует окно последними значениями истории."""
+        self.values.clear()
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.missing = 0
+        for value in np.asarray(history, dtype=np.float64)[-self.window:]:
+            self.update(value)
+        return self
+
+    def update(self, value):
+        """Добавляет новое значение и сдвигает окно."""
+        value = float(value)
+        old = self.values.popleft() if len(self.values) == self.window else None
+        self.values.append(value)
+        old_missing = old is not None and math.isnan(old)
+        self.missing += math.isnan(value) - old_missing
+        if self.missing or old_missing:
+            # Пока в окне пропуск, значения - NaN; когда он вышел из окна, окно считается заново
+            if not self.missing:
+                self._recompute()
+        elif old is None:
+            delta = value - self.mean
+            self.mean += delta / len(self.values)
+            self.m2 += delta * (value - self.mean)
+        else:
+            old_mean = self.mean
+            self.mean += (value - old) / self.window
+            self.m2 += (value - old) * (value - self.mean + old - old_mean)
+            self.updates += 1
+            if self.updates % self.window == 0:
+                self._recompute()
+        return self
+
+    def _recompute(self):
+        self.mean = sum(self.values) / len(self.values)
+        self.m2 = sum((v - self.mean) ** 2 for v in self.values)
+
+    @property
+    def full(self):
+        return len(self.values) == self.window
+
+    def average(self):
+        """Скользящее среднее (NaN, пока окно не заполнено)."""
+        return self.mean if self.full and not self.missing else math.nan
+
+    def std(self):
+        """Выборочное стандартное отклонение по окну (NaN, пока окно не заполнено)."""
+        if not self.full or self.missing or self.window < 2:
+            return math.nan
+        return math.sqrt(max(self.m2, 0.0) / (self.window - 1))
+
+
+class EWM:
+    """
+    Описание: Экспоненциальное скользящее среднее с состоянием из двух чисел (значение и вес прошлого
+    значения), эквивалентное pandas ewm(span=span, adjust=False).mean(). На пропуске (NaN) значение
+    не меняется, а вес прошлого значения уменьшается, как в pandas при ignore_na=False.
+
+    Параметры:
+    span (int): период EWM.
+    """
+
+    def __init__(self, span):
+        self.span = span
+        self.alpha = 2.0 / (span + 1.0)
+        self.value = math.nan
+        self.weight = 1.0
+
+    def seed(self, history):
+        """Инициализирует состояние значением EWM на последнем баре истории."""
+        history = np.asarray(history, dtype=np.float64)
+        return self.restore(history, ewm_mean(history, self.span))
+
+    def restore(self, history, values):
+        """Состояние по уже посчитанному ряду EWM values для истории history."""
+        self.value = values[-1] if len(history) else math.nan
+        # Вес прошлого значения убывает на каждом пропуске в конце истории
+        valid = np.flatnonzero(~np.isnan(history))
+        gap = len(history) - 1 - valid[-1] if len(valid) else 0
+        self.weight = (1.0 - self.alpha) ** gap
+        return self
+
+    def update(self, value):
+        value = float(value)
+        if math.isnan(self.value):
+            self.value = value
+            return self.value
+        self.weight *= 1.0 - self.alpha
+        if not math.isnan(value):
+            self.value = (self.weight * self.value + self.alpha * value) / (self.weight + self.alpha)
+            self.weight = 1.0
+        return self.value
+
+
+class MACD:
+    """
+    Описание: MACD и сигнальная линия с инкрементальным обновлением (три состояния EWM).
+
+    Параметры:
+    fast (int), slow (int), signal (int): периоды быстрой, медленной и сигнальной EWM.
+    """
+
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.fast = EWM(fast)
+        self.slow = EWM(slow)
+        self.signal = EWM(signal)
+
+    def seed(self, history):
+        history = np.asarray(history, dtype=np.float64)
+        if len(history):
+            fast = ewm_mean(history, self.fast.span)
+            slow = ewm_mean(history, self.slow.span)
+            self.fast.restore(history, fast)
+            self.slow.restore(history, slow)
+            self.signal.seed(fast - slow)
+        return self
+
+    def update(self, value):
+        """Возвращает пару (MACD, сигнальная линия) после нового значения."""
+        macd = self.fast.update(value) - self.slow.update(value)
+        return macd, self.signal.update(macd)
+
+
+class RSI:
+    """
+    Описание: Relative Strength Index с инкрементальным обновлением.
+
+    По умолчанию средние прибыли и убытки считаются простым скользящим средним по окну, как в
+    data_download.calculate_rsi. При wilder=True используется сглаживание Уайлдера:
+    avg = (avg * (window - 1) + value) / window.
+
+    Параметры:
+    window (int): период RSI.
+    wilder (bool): использовать сглаживание Уайлдера вместо простого среднего.
+    """
+
+    def __init__(self, window=14, wilder=False):
+        self.window = window
+        self.wilder = wilder
+        self.last_price = math.nan
+        self.started = False
+        self.gains = deque()
+        self.losses = deque()
+        self.gain_sum = 0.0
+        self.loss_sum = 0.0
+        # Количество ненулевых значений в окне: при нуле сумма обнуляется точно, без остатка округления
+        self.gain_count = 0
+        self.loss_count = 0
+        self.avg_gain = math.nan
+        self.avg_loss = math.nan
+
+    def seed(self, history):
+        history = np.asarray(history, dtype=np.float64)
+        if len(history) == 0:
+            return self
+        delta = np.concatenate(([0.0], np.diff(history)))
+        gains = np.fmax(delta, 0.0)
+        losses = np.fmax(-delta, 0.0)
+        self.last_price = history[-1]
+        self.started = True
+
+        if not self.wilder:
+            self.gains = deque(gains[-self.window:].tolist())
+            self.losses = deque(losses[-self.window:].tolist())
+            self.gain_sum, self.loss_sum = sum(self.gains), sum(self.losses)
+            self.gain_count = sum(1 for g in self.gains if g)
+            self.loss_count = sum(1 for loss in self.losses if loss)
+        elif len(history) > self.window:
+            # Первое значение - простое среднее первых window приращений, далее сглаживание Уайлдера,
+            # то есть EWM с alpha = 1 / window (span = 2 * window - 1)
+            span = 2 * self.window - 1
+            first_gain = gains[1:self.window + 1].mean()
+            first_loss = losses[1:self.window + 1].mean()
+            rest_gain, rest_loss = gains[self.window + 1:], losses[self.window + 1:]
+            self.avg_gain = ewm_mean(rest_gain, span, init=first_gain)[-1] if len(rest_gain) else first_gain
+            self.avg_loss = ewm_mean(rest_loss, span, init=first_loss)[-1] if len(rest_loss) else first_loss
+        else:
+            self.gains = deque(gains[1:].tolist())
+            self.losses = deque(losses[1:].tolist())
+        return self
+
+    def _push(self, gain, loss):
+        self.gains.append(gain)
+        self.losses.append(loss)
+        self.gain_sum += gain
+        self.loss_sum += loss
+        self.gain_count += gain != 0
+        self.loss_count += loss != 0
+        if len(self.gains) > self.window:
+            old_gain, old_loss = self.gains.popleft(), self.losses.popleft()
+            self.gain_sum -= old_gain
+            self.loss_sum -= old_loss
+            self.gain_count -= old_gain != 0
+            self.loss_count -= old_loss != 0
+        if not self.gain_count:
+            self.gain_sum = 0.0
+        if not self.loss_count:
+            self.loss_sum = 0.0
+
+    def update(self, price):
+        """Добавляет новую цену закрытия и возвращает текущее значение RSI (NaN, пока данных мало)."""
+        price = float(price)
+        first = not self.started
+        self.started = True
+        # Как и в calculate_rsi, приращение первого бара и приращения рядом с пропуском (NaN) нулевые
+        delta = price - self.last_price
+        if math.isnan(delta):
+            delta = 0.0
+        self.last_price = price
+        gain, loss = max(delta, 0.0), max(-delta, 0.0)
+
+        if not self.wilder:
+            self._push(gain, loss)
+            if len(self.gains) < self.window:
+                return math.nan
+            return self._rsi(self.gain_sum, self.loss_sum)
+
+        if first:
+            return math.nan
+        if math.isnan(self.avg_gain):
+            # Накопление первых window приращений для стартового простого среднего
+            self.gains.append(gain)
+            self.losses.append(loss)
+            if len(self.gains) < self.window:
+                return math.nan
+            self.avg_gain = sum(self.gains) / self.window
+            self.avg_loss = sum(self.losses) / self.window
+            self.gains.clear()
+            self.losses.clear()
+        else:
+            self.avg_gain += (gain - self.avg_gain) / self.window
+            self.avg_loss += (loss - self.avg_loss) / self.window
+        return self._rsi(self.avg_gain, self.avg_loss)
+
+    @staticmethod
+    def _rsi(gain, loss):
+        if loss == 0:
+            return 100.0 if gain > 0 else math.nan
+        return 100 - (100 / (1 + gain / loss))
+
+
+class StreamingIndicators:
+    """
+    Описание: Набор инкрементальных индикаторов для одного тикера: те же колонки, что строят функции
+    data_download (Moving_Average, MACD, Signal_Line, RSI, Standard_Deviation). После инициализации
+    по истории каждый новый бар обрабатывается за O(1), без пересчета всей истории.
+
+    Параметры:
+    ma_window (int): окно скользящего среднего.
+    std_window (int): окно стандартного отклонения.
+    rsi_window (int): период RSI.
+    macd (tuple): периоды MACD (быстрая, медленная, сигнальная).
+    wilder (bool): сглаживание Уайлдера для RSI.
+    """
+
+    def __init__(self, ma_window=5, std_window=5, rsi_window=14, macd=(12, 26, 9), wilder=False):
+        self.moving_average = RollingStats(ma_window)
+        self.deviation = self.moving_average if std_window == ma_window else RollingStats(std_window)
+        self.macd = MACD(*macd)
+        self.rsi = RSI(rsi_window, wilder=wilder)
+
+    @classmethod
+    def from_history(cls, data, **kwargs):
+        """Создает набор индикаторов и инициализирует его ценами закрытия из DataFrame."""
+        indicators = cls(**kwargs)
+        close = data['Close'].to_numpy(dtype=np.float64)
+        indicators.moving_average.seed(close)
+        if indicators.deviation is not indicators.moving_average:
+            indicators.deviation.seed(close)
+        indicators.macd.seed(close)
+        indicators.rsi.seed(close)
+        return indicators
+
+    def update(self, close):
+        """
+        Обрабатывает новую цену закрытия.
+
+        Возвращает: словарь {колонка: значение} для нового бара.
+        """
+        self.moving_average.update(close)
+        if self.deviation is not self.moving_average:
+            self.deviation.update(close)
+        macd, signal = self.macd.update(close)
+        return {
+            'Moving_Average': self.moving_average.average(),
+            'MACD': macd,
+            'Signal_Line': signal,
+            'RSI': self.rsi.update(close),
+            'Standard_Deviation': self.deviation.std(),
+        }
@@ -0,0 +1,121 @@
+import math
+import random
+import time
+import types
+import tkinter as tk
+
+from drawing_app import DrawingApp
+
+
+class LegacyDrawingApp(DrawingApp):
+    """Прежний вариант рисования для сравнения: отдельный элемент Canvas и вызов line на каждое движение мыши."""
+
+    def paint(self, event):
+        x, y = self.canvas_coords(event)
+        if self.last_x is not None and self.last_y is not None:
+            self.canvas.create_line(self.last_x, self.last_y, x, y,
+                                    width=self.brush_size_scale.get(), fill=self.pen_color,
+                                    capstyle=tk.ROUND, smooth=tk.TRUE)
+
+            self.image.line([self.last_x, self.last_y, x, y], fill=self.pen_color,
+                            width=self.brush_size_scale.get())
+
+        self.last_x = x
+        self.last_y = y
+
+    def reset(self, event):
+        self.last_x, self.last_y = None, None
+
+
+def make_strokes(count=200, length=150, width=1280, height=720, seed=0):
+    """Случайные плавные штрихи: список штрихов, каждый - список координат (x, y) событий мыши."""
+    rng = random.Random(seed)
+    strokes = []
+    for _ in range(count):
+        x, y = rng.uniform(0, width), rng.uniform(0, height)
+        angle = rng.uniform(0, 2 * math.pi)
+        points = []
+        for _ in range(length):
+            angle += rng.uniform(-0.3, 0.3)
+            x = min(max(x + 4 * math.cos(angle), 0), width - 1)
+            y = min(max(y + 4 * math.sin(angle), 0), height - 1)
+            points.append((int(x), int(y)))
+        strokes.append(points)
+    return strokes
+
+
+def replay(app, strokes, events_per_frame=4):
+    """
+    Описание: Воспроизводит штрихи как события мыши. После каждых events_per_frame событий наступает кадр:
+    отложенная отрисовка штриха (flush_stroke по таймеру FRAME_MS) выполняется сразу, как если бы таймер
+    сработал, и обрабатывается очередь Tk (root.update). Время кадра включает растеризацию, а время штриха -
+    все события, кадры и reset, поэтому варианты с отложенной и немедленной отрисовкой сравнимы.
+
+    Возвращает: словарь с задержкой обработки события (среднее и 95-й процентиль, мс), временем кадров
+    (среднее, мс), полным временем штриха (среднее, мс), числом элементов Canvas и временем полной
+    перерисовки и очистки холста (мс).
+    """
+    root = app.root
+    latencies, frames, totals = [], [], []
+    for points in strokes:
+        stroke_start = time.perf_counter()
+        for i, (x, y) in enumerate(points):
+            start = time.perf_counter()
+            app.paint(types.SimpleNamespace(x=x, y=y))
+            latencies.append(time.perf_counter() - start)
+            if i % events_per_frame == events_per_frame - 1:
+                start = time.perf_counter()
+                if app.flush_job is not None:
+                    root.after_cancel(app.flush_job)
+                    app.flush_stroke()
+                root.update()
+                frames.append(time.perf_counter() - start)
+        app.reset(None)
+        root.update()
+        totals.append(time.perf_counter() - stroke_start)
+
+    items = len(app.canvas.find_all())
+    # Полная перерисовка: прокрутка и возврат заставляют Tk перерисовать все элементы
+    start = time.perf_counter()
+    app.canvas.xview_moveto(0.5)
+    app.canvas.xview_moveto(0.0)
+    app.canvas.config(bg=app.canvas['bg'])
+    root.update()
+    redraw = time.perf_counter() - start
+
+    start = time.perf_counter()
+    app.clear_canvas()
+    root.update()
+    clear = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'items': items,
+        'event_mean_ms': 1000 * sum(latencies) / len(latencies),
+        'event_p95_ms': 1000 * latencies[int(0.95 * (len(latencies) - 1))],
+        'frame_mean_ms': 1000 * sum(frames) / len(frames) if frames else 0.0,
+        'stroke_mean_ms': 1000 * sum(totals) / len(totals),
+        'redraw_ms': 1000 * redraw,
+        'clear_ms': 1000 * clear,
+    }
+
+
+def main(count=200, length=150):
+    strokes = make_strokes(count, length)
+    print(f"Штрихов: {count}, событий мыши: {count * length}")
+    print(f"{'Вариант':<24} {'Элементы':>9} {'Событие, мс':>12} {'p95, мс':>9} {'Кадр, мс':>9} "
+          f"{'Штрих, мс':>10} {'Перерисовка, мс':>16} {'Очистка, мс':>12}")
+    variants = (('по сегментам (прежний)', LegacyDrawingApp, 'items'), ('ломаная на штрих', DrawingApp, 'items'),
+                ('растр PhotoImage', DrawingApp, 'raster'))
+    for name, app_class, render_mode in variants:
+        root = tk.Tk()
+        app = app_class(root, render_mode, autosave_ms=None)
+        result = replay(app, strokes)
+        root.destroy()
+        print(f"{name:<24} {result['items']:>9} {result['event_mean_ms']:>12.3f} {result['event_p95_ms']:>9.3f} "
+              f"{result['frame_mean_ms']:>9.2f} {result['stroke_mean_ms']:>10.2f} {result['redraw_ms']:>16.1f} "
+              f"{result['clear_ms']:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,88 @@
+import os
+import time
 import tkinter as tk
 from tkinter import colorchooser, filedialog, messagebox, simpledialog
-from PIL import Image, ImageDraw
+from tiles import TiledImage
+from strokes import Stroke, StrokeLog
+from project import Project, PROJECT_EXTENSION
+
+
+# Наибольший размер холста: изображение хранится тайлами, память зависит только от закрашенной площади
+MAX_CANVAS_SIZE = 20000
+
+# Наибольший размер видимой области холста, остальное прокручивается
+VIEW_WIDTH = 1280
+VIEW_HEIGHT = 720
+
+# Интервал отрисовки накопленных точек штриха в мс (примерно один кадр)
+FRAME_MS = 16
+
+# Наибольшее число точек в одном элементе Canvas: длинный штрих продолжается новым элементом
+MAX_ITEM_POINTS = 1000
+
+# Способ отображения: 'raster' - одно изображение PhotoImage с видимой областью, в которое переносятся
+# только измененные прямоугольники; 'items' - штрихи как элементы Canvas (ломаные и текст)
+RENDER_MODE = 'raster'
+
+# Интервал автосохранения проекта в мс и каталог автосохранений, пока проект не сохранен под своим именем
+AUTOSAVE_MS = 30000
+AUTOSAVE_DIRECTORY = 'autosave'
+
+
+def autosave_path():
+    # У каждой сессии свой каталог: новый запуск не затирает автосохранение прошлой (например, упавшей) сессии
+    name = time.strftime('%Y%m%d-%H%M%S') + f'-{os.getpid()}' + PROJECT_EXTENSION
+    return os.path.join(AUTOSAVE_DIRECTORY, name)
+
+
+def is_autosave(path):
+    return os.path.dirname(os.path.abspath(path)) == os.path.abspath(AUTOSAVE_DIRECTORY)
 
 
 class DrawingApp:
 
-    def __init__(self, root):
+    def __init__(self, root, render_mode=RENDER_MODE, autosave_ms=AUTOSAVE_MS):
         self.root = root
+        self.render_mode = render_mode
+        self.autosave_ms = autosave_ms
+        self.project = None
+        self.save_error = None
         self.root.title("Рисовалка с сохранением в PNG")
 
         self.canvas_width = 1280
         self.canvas_height = 720
-        self.image = Image.new("RGB", (self.canvas_width, self.canvas_height), "white")
-        self.draw = ImageDraw.Draw(self.image)
-
-        self.canvas = tk.Canvas(root, width=self.canvas_width, height=self.canvas_height, bg='white')
-        self.canvas.pack()
+        self.background_color = "white"
+        self.image = TiledImage(self.canvas_width, self.canvas_height, self.background_color)
+        # История штрихов для отмены и повтора; элементы Canvas каждого штриха
+        self.log = StrokeLog(self.image)
+        self.stroke_items = {}
+        # Растровый режим: PhotoImage размером с видимую область, ее левый верхний угол на холсте
+        self.photo = None
+        self.photo_item = None
+        self.view_origin = (0, 0)
+        self.view_job = None
+
+        # Холст с полосами прокрутки: большие рисунки показываются по частям
+        canvas_frame = tk.Frame(root)
+        canvas_frame.pack()
+        self.canvas = tk.Canvas(canvas_frame, bg='white')
+        x_scroll = tk.Scrollbar(canvas_frame, orient=tk.HORIZONTAL, command=self.canvas.xview)
+        y_scroll = tk.Scrollbar(canvas_frame, orient=tk.VERTICAL, command=self.canvas.yview)
+        self.canvas.config(xscrollcommand=lambda *args: self.on_scroll(x_scroll, args),
+                           yscrollcommand=lambda *args: self.on_scroll(y_scroll, args))
+        self.canvas.grid(row=0, column=0)
+        y_scroll.grid(row=0, column=1, sticky=tk.NS)
+        x_scroll.grid(row=1, column=0, sticky=tk.EW)
+        self.update_canvas_view()
 
         self.last_x, self.last_y = None, None
+        # Текущий штрих: запись в историю, одна ломаная на Canvas и точки, еще не нарисованные на изображении
+        self.stroke = None
+        self.stroke_item = None
+        self.current_items = []
+        self.stroke_points = []
+        self.pending_points = []
+        self.flush_job = None
         self.pen_color = 'black'
         self.brush_size = 1
         self.previous_color = self.pen_color
@@ -31,9 +96,18 @@ class DrawingApp:
         # Привязка горячих клавиш
         self.root.bind('<Control-s>', self.save_image)
         self.root.bind('<Control-c>', self.choose_color)
+        self.root.bind('<Control-z>', self.undo)
+        self.root.bind('<Control-y>', self.redo)
+        self.root.bind('<Control-o>', self.open_project)
 
         self.eraser_mode = False
 
+        # Автосохранение в фоновом потоке; при закрытии окна проект сохраняется полностью
+        if self.autosave_ms:
+            self.root.after_idle(self.recover_autosave)
+            self.root.after(self.autosave_ms, self.autosave)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
     def setup_ui(self):
         control_frame = tk.Frame(self.root)
         control_frame.pack(fill=tk.X)
@@ -41,12 +115,24 @@ class DrawingApp:
         clear_button = tk.Button(control_frame, text="Очистить", command=self.clear_canvas)
         clear_button.pack(side=tk.LEFT)
 
+        undo_button = tk.Button(control_frame, text="Отменить", command=self.undo)
+        undo_button.pack(side=tk.LEFT)
+
+        redo_button = tk.Button(control_frame, text="Повторить", command=self.redo)
+        redo_button.pack(side=tk.LEFT)
+
         color_button = tk.Button(control_frame, text="Выбрать цвет", command=self.choose_color)
         color_button.pack(side=tk.LEFT)
 
         save_button = tk.Button(control_frame, text="Сохранить", command=self.save_image)
         save_button.pack(side=tk.LEFT)
 
+        save_project_button = tk.Button(control_frame, text="Сохранить проект", command=self.save_project)
+        save_project_button.pack(side=tk.LEFT)
+
+        open_project_button = tk.Button(control_frame, text="Открыть проект", command=self.open_project)
+        open_project_button.pack(side=tk.LEFT)
+
         # Кнопка для изменения размера холста
         resize_button = tk.Button(control_frame, text="Изменить размер холста", command=self.change_canvas_size)
         resize_button.pack(side=tk.LEFT)
@@ -69,21 +155,73 @@ class DrawingApp:
         self.color_preview = tk.Label(control_frame, bg=self.pen_color, width=6, height=1)
         self.color_preview.pack(side=tk.LEFT)
 
+    def update_canvas_view(self):
+        # Видимая область не больше VIEW_WIDTH x VIEW_HEIGHT, прокручивается весь холст
+        self.canvas.config(width=min(self.canvas_width, VIEW_WIDTH), height=min(self.canvas_height, VIEW_HEIGHT),
+                           scrollregion=(0, 0, self.canvas_width, self.canvas_height))
+        if self.render_mode == 'raster':
+            # PhotoImage только под видимую область: для холста 20000x20000 полное изображение в Tk не поместится
+            if self.photo_item is not None:
+                self.canvas.delete(self.photo_item)
+            self.photo = tk.PhotoImage(width=min(self.canvas_width, VIEW_WIDTH),
+                                       height=min(self.canvas_height, VIEW_HEIGHT))
+            self.photo_item = self.canvas.create_image(0, 0, image=self.photo, anchor=tk.NW)
+            self.refresh_view()
+
+    def on_scroll(self, scrollbar, args):
+        # Прокрутка: в растровом режиме видимая область обновляется один раз после всех событий
+        scrollbar.set(*args)
+        if self.render_mode == 'raster' and self.view_job is None:
+            self.view_job = self.root.after_idle(self.refresh_view)
+
+    def refresh_view(self):
+        # Переносит PhotoImage в текущий угол видимой области и заполняет его изображением целиком
+        self.view_job = None
+        if self.photo is None:
+            return
+        x, y = int(self.canvas.canvasx(0)), int(self.canvas.canvasy(0))
+        self.view_origin = (x, y)
+        self.canvas.coords(self.photo_item, x, y)
+        self.push_region((x, y, x + self.photo.width() - 1, y + self.photo.height() - 1))
+
+    def push_region(self, box):
+        """
+        Описание: Переносит прямоугольник box = (x0, y0, x1, y1) изображения (x1, y1 включаются) в PhotoImage,
+        если он попадает в видимую область. Передается только этот прямоугольник в формате PPM, поэтому
+        стоимость обновления зависит от размера измененной области, а не от числа штрихов на холсте.
+
+        Параметры:
+        box (tuple): прямоугольник в координатах холста.
+        """
+        if self.render_mode != 'raster' or self.photo is None:
+            return
+        left, top = self.view_origin
+        x0, y0 = max(int(box[0]), left, 0), max(int(box[1]), top, 0)
+        x1 = min(int(box[2]) + 1, left + self.photo.width(), self.canvas_width)
+        y1 = min(int(box[3]) + 1, top + self.photo.height(), self.canvas_height)
+        if x1 <= x0 or y1 <= y0:
+            return
+        region = self.image.crop((x0, y0, x1, y1))
+        data = b'P6 %d %d 255\n' % region.size + region.tobytes()
+        self.photo.tk.call(self.photo.name, 'put', data, '-format', 'ppm', '-to', x0 - left, y0 - top)
+
+    def canvas_coords(self, event):
+        # Координаты события в системе холста с учетом прокрутки
+        return int(self.canvas.canvasx(event.x)), int(self.canvas.canvasy(event.y))
+
     def change_canvas_size(self):
         size = simpledialog.askstring("Размер холста", "Введите ширину и высоту через пробел (например, '1280 720'):")
 
         if size:
             try:
                 width, height = map(int, size.split())
-                if 100 <= width <= 3000 and 100 <= height <= 3000:
+                if 100 <= width <= MAX_CANVAS_SIZE and 100 <= height <= MAX_CANVAS_SIZE:
                     self.canvas_width = width
                     self.canvas_height = height
-                    self.canvas.config(width=self.canvas_width, height=self.canvas_height)
-                    self.image = Image.new("RGB", (self.canvas_width, self.canvas_height), "white")
-                    self.draw = ImageDraw.Draw(self.image)
-                    self.clear_canvas()  # Очистить холст
+                    self.update_canvas_view()
+                    self.new_image()  # Новый пустой холст
                 else:
-                    messagebox.showerror("Ошибка", "Размеры должны быть от 100 до 3000.")
+                    messagebox.showerror("Ошибка", f"Размеры должны быть от 100 до {MAX_CANVAS_SIZE}.")
             except ValueError:
                 messagebox.showerror("Ошибка", "Пожалуйста, введите два числа.")
 
@@ -93,9 +231,13 @@ class DrawingApp:
             self.canvas.bind('<Button-1>', lambda event: self.draw_text(event, text))
 
     def draw_text(self, event, text):
-        x, y = event.x, event.y
-        self.draw.text((x, y), text, fill=self.pen_color)  # Рисуем текст на изображении
-        self.canvas.create_text(x, y, text=text, fill=self.pen_color)  # Рисуем текст на холсте
+        x, y = self.canvas_coords(event)
+        stroke = Stroke('text', self.pen_color, points=(x, y), text=text)
+        self.log.add(stroke)  # Рисуем текст на изображении
+        if self.render_mode == 'raster':
+            self.push_region(stroke.bbox)
+        else:
+            self.stroke_items[stroke] = [self.canvas.create_text(x, y, text=text, fill=self.pen_color)]  # И на холсте
 
         # Снимаем привязку после добавления текста
         self.canvas.unbind('<Button-1>')
@@ -103,9 +245,8 @@ class DrawingApp:
     def change_background_color(self):
         new_color = colorchooser.askcolor()[1]
         if new_color:
-            # Обновляем только фон: создаем новое изображение с цветом фона
-            self.image = Image.new("RGB", (self.canvas_width, self.canvas_height), new_color)
-            # Очищаем холст
+            # Обновляем только фон: очищаем холст и создаем новое изображение с цветом фона
+            self.background_color = new_color
             self.clear_canvas()
             # Устанавливаем новый цвет фона на Canvas
             self.canvas.config(bg=new_color)
@@ -117,7 +258,7 @@ class DrawingApp:
             self.eraser_mode = False
         else:
             self.previous_color = self.pen_color
-            self.pen_color = 'white'
+            self.pen_color = self.background_color
             self.eraser_button.config(text="Ластик_ON", fg="red")
             self.eraser_mode = True
 
@@ -125,7 +266,9 @@ class DrawingApp:
         return f'#{rgb[0]:02x}{rgb[1]:02x}{rgb[2]:02x}'
 
     def pick_color(self, event):
-        x, y = event.x, event.y
+        x, y = self.canvas_coords(event)
+        if not (0 <= x < self.canvas_width and 0 <= y < self.canvas_height):
+            return
         rgb_color = self.image.getpixel((x, y))
         self.pen_color = self.rgb_to_hex(rgb_color)
         self.update_color_preview()
@@ -134,24 +277,127 @@ class DrawingApp:
         self.color_preview.config(bg=self.pen_color)
 
     def paint(self, event):
-        if self.last_x is not None and self.last_y is not None:
-            self.canvas.create_line(self.last_x, self.last_y, event.x, event.y,
-                                    width=self.brush_size_scale.get(), fill=self.pen_color,
-                                    capstyle=tk.ROUND, smooth=tk.TRUE)
-
-            self.draw.line([self.last_x, self.last_y, event.x, event.y], fill=self.pen_color,
-                           width=self.brush_size_scale.get())
-
-        self.last_x = event.x
-        self.last_y = event.y
+        # Точки только накапливаются; Canvas и изображение обновляются раз в кадр в flush_stroke
+        x, y = self.canvas_coords(event)
+        if self.last_x is None or self.last_y is None:
+            self.stroke = Stroke('line', self.pen_color, self.brush_size_scale.get(), (x, y))
+            self.stroke_points = [x, y]
+            self.pending_points = [x, y]
+            self.stroke_item = None
+            self.current_items = []
+        else:
+            self.stroke.extend(x, y)
+            self.stroke_points += (x, y)
+            self.pending_points += (x, y)
+            if self.flush_job is None:
+                self.flush_job = self.root.after(FRAME_MS, self.flush_stroke)
+
+        self.last_x = x
+        self.last_y = y
+
+    def flush_stroke(self):
+        # Продлевает ломаную штриха на Canvas и рисует накопленный отрезок на изображении одним вызовом
+        self.flush_job = None
+        if len(self.pending_points) < 4:
+            return
+        color, width = self.stroke.color, self.stroke.width
+        if self.render_mode == 'raster':
+            # Изображение - единственный источник: в PhotoImage переносится только прямоугольник отрезка
+            self.push_region(self.image.line(self.pending_points, fill=color, width=width, joint='curve'))
+            self.pending_points = self.pending_points[-2:]
+            self.stroke_points = self.stroke_points[-2:]
+            return
+        if self.stroke_item is None:
+            self.stroke_item = self.canvas.create_line(*self.stroke_points, width=width, fill=color,
+                                                       capstyle=tk.ROUND, joinstyle=tk.ROUND)
+            self.current_items.append(self.stroke_item)
+        else:
+            self.canvas.coords(self.stroke_item, self.stroke_points)
+        self.image.line(self.pending_points, fill=color, width=width, joint='curve')
+        self.pending_points = self.pending_points[-2:]
+        if len(self.stroke_points) >= 2 * MAX_ITEM_POINTS:
+            self.stroke_points = self.stroke_points[-2:]
+            self.stroke_item = None
 
     def reset(self, event):
+        if self.flush_job is not None:
+            self.root.after_cancel(self.flush_job)
+        self.flush_stroke()
+        # Законченный штрих (хотя бы из двух точек) попадает в историю; он уже нарисован
+        if self.stroke is not None and len(self.stroke.points) >= 4:
+            self.log.add(self.stroke, render=False)
+            self.stroke_items[self.stroke] = self.current_items
+        self.stroke = None
+        self.current_items = []
         self.last_x, self.last_y = None, None
 
     def clear_canvas(self):
-        self.canvas.delete("all")
-        self.image = Image.new("RGB", (self.canvas_width, self.canvas_height), "white")
-        self.draw = ImageDraw.Draw(self.image)
+        # Очистка - заливка цветом фона, ее тоже можно отменить
+        self.clear_items()
+        self.log.add(Stroke('fill', self.background_color))
+        self.refresh_view()
+
+    def new_image(self):
+        # Новый холст текущего размера с пустой историей; прежний проект на диске не перезаписывается
+        self.set_project(None)
+        self.clear_items()
+        self.background_color = "white"
+        self.canvas.config(bg=self.background_color)
+        self.image = TiledImage(self.canvas_width, self.canvas_height, self.background_color)
+        self.log = StrokeLog(self.image)
+        self.refresh_view()
+
+    def clear_items(self):
+        # Удаляет элементы штрихов с Canvas (в растровом режиме их нет, PhotoImage остается)
+        if self.render_mode != 'raster':
+            self.canvas.delete("all")
+        self.stroke_item = None
+        self.stroke_items.clear()
+
+    def undo(self, event=None):
+        stroke = self.log.undo()
+        if stroke is None:
+            return
+        if stroke.kind == 'fill':
+            self.redraw_canvas()
+        elif self.render_mode == 'raster':
+            self.push_region(stroke.bbox)
+        else:
+            self.canvas.delete(*self.stroke_items.pop(stroke, []))
+
+    def redo(self, event=None):
+        stroke = self.log.redo()
+        if stroke is None:
+            return
+        if stroke.kind == 'fill':
+            self.redraw_canvas()
+        elif self.render_mode == 'raster':
+            self.push_region(stroke.bbox)
+        else:
+            self.draw_stroke_items(stroke)
+
+    def draw_stroke_items(self, stroke):
+        # Элементы Canvas для штриха из истории
+        if stroke.kind == 'text':
+            items = [self.canvas.create_text(stroke.points[0], stroke.points[1], text=stroke.text, fill=stroke.color)]
+        else:
+            points = stroke.points.tolist()
+            step = 2 * MAX_ITEM_POINTS
+            items = [self.canvas.create_line(*points[start:start + step + 2], width=stroke.width, fill=stroke.color,
+                                             capstyle=tk.ROUND, joinstyle=tk.ROUND)
+                     for start in range(0, max(len(points) - 2, 1), step)]
+        self.stroke_items[stroke] = items
+
+    def redraw_canvas(self):
+        # Canvas заново по истории: фон последней заливки и штрихи после нее
+        self.clear_items()
+        self.background_color = self.log.background() or "white"
+        self.canvas.config(bg=self.background_color)
+        if self.render_mode == 'raster':
+            self.refresh_view()
+            return
+        for stroke in self.log.visible():
+            self.draw_stroke_items(stroke)
 
     def choose_color(self, event=None):
         self.pen_color = colorchooser.askcolor(color=self.pen_color)[1]
@@ -161,9 +407,103 @@ class DrawingApp:
         file_path = filedialog.asksaveasfilename(defaultextension='.png',
                                                  filetypes=[('PNG files', '*.png'), ('All files', '*.*')])
         if file_path:
-            self.image.save(file_path)
+            self.image.save(file_path)  # PNG записывается потоково по полосам тайлов
             messagebox.showinfo("Информация", "Изображение успешно сохранено!")
 
+    def save_project(self, event=None):
+        file_path = filedialog.asksaveasfilename(defaultextension=PROJECT_EXTENSION,
+                                                 filetypes=[('Проект рисовалки', '*' + PROJECT_EXTENSION)])
+        if file_path:
+            previous = self.project
+            # Каталог выбран пользователем, поэтому существующий проект в нем можно заменить
+            self.set_project(Project(file_path, overwrite=True))
+            try:
+                self.project.save(self.image, self.log)  # Первое сохранение - целиком, дальше только изменения
+            except Exception as e:
+                messagebox.showerror("Ошибка", f"Не удалось сохранить проект: {e}")
+                return
+            # Работа сохранена под своим именем: автосохранение сессии больше не нужно
+            if (previous is not None and is_autosave(previous.path)
+                    and os.path.abspath(previous.path) != os.path.abspath(file_path)):
+                previous.delete()
+            messagebox.showinfo("Информация", "Проект успешно сохранен!")
+
+    def open_project(self, event=None):
+        path = filedialog.askdirectory(title="Открыть проект")
+        if path:
+            self.load_project(path)
+
+    def load_project(self, path):
+        try:
+            project, image, log = Project.open(path)
+        except (OSError, ValueError, KeyError) as e:
+            messagebox.showerror("Ошибка", f"Не удалось открыть проект: {e}")
+            return False
+        self.set_project(project)
+        # Тайлы загружены готовыми: штрихи не перерисовываются, в растровом режиме обновляется только видимая область
+        self.canvas_width, self.canvas_height = image.size
+        self.image, self.log = image, log
+        self.update_canvas_view()
+        self.redraw_canvas()
+        return True
+
+    def recover_autosave(self):
+        # Автосохранения прошлых сессий остаются, пока пользователь не откроет или не удалит их
+        if not os.path.isdir(AUTOSAVE_DIRECTORY):
+            return
+        names = sorted((name for name in os.listdir(AUTOSAVE_DIRECTORY) if name.endswith(PROJECT_EXTENSION)),
+                       reverse=True)
+        for name in names:
+            path = os.path.join(AUTOSAVE_DIRECTORY, name)
+            answer = messagebox.askyesnocancel(
+                "Восстановление", f"Найдено автосохранение {name}.\n"
+                                  f"Открыть его? Нет - удалить, Отмена - оставить на диске.")
+            if answer is None:
+                continue
+            if not answer:
+                Project(path).delete()
+            elif self.load_project(path):
+                break
+
+    def set_project(self, project):
+        if self.project is not None:
+            self.project.close()
+        self.project = project
+
+    def autosave(self):
+        # Во время штриха не сохраняем: его тайлы уже изменены, а в истории его еще нет.
+        # Пустой неизмененный холст не сохраняем
+        try:
+            if self.stroke is None and (self.project is not None or self.log.strokes):
+                if self.project is None:
+                    self.project = Project(autosave_path())
+                self.project.save_async(self.image, self.log)
+                self.report_save_error(self.project.error)
+        except Exception as e:
+            self.report_save_error(e)
+        finally:
+            self.root.after(self.autosave_ms, self.autosave)
+
+    def report_save_error(self, error):
+        # Одна и та же ошибка автосохранения показывается один раз, а не при каждой попытке
+        message = None if error is None else str(error)
+        if message is not None and message != self.save_error:
+            messagebox.showerror("Ошибка", f"Не удалось сохранить проект {self.project.path}: {error}")
+        self.save_error = message
+
+    def on_close(self):
+        try:
+            if self.project is None and self.log.strokes:
+                self.project = Project(autosave_path())
+            if self.project is not None:
+                self.project.save(self.image, self.log)
+        except Exception as e:
+            messagebox.showerror("Ошибка", f"Не удалось сохранить проект {self.project.path}: {e}")
+        finally:
+            if self.project is not None:
+                self.project.close()
+            self.root.destroy()
+
 
 def main():
     root = tk.Tk()
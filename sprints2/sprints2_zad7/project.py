@@ -0,0 +1,297 @@
+import os
+import json
+import zlib
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+from tiles import TiledImage
+from strokes import Stroke, StrokeLog
+
+
+# Расширение каталога проекта
+PROJECT_EXTENSION = '.drawproj'
+
+# Версия формата проекта
+FORMAT_VERSION = 2
+
+
+def _replace(path, data):
+    """Записывает файл целиком через временный файл, чтобы сбой не оставил его наполовину записанным."""
+    temporary = path + '.tmp'
+    with open(temporary, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, path)
+
+
+def _tile_name(key, generation):
+    return f"{key[0]}_{key[1]}_{generation}.raw"
+
+
+def _parse_tile_name(name):
+    """Номер тайла и поколение из имени файла тайла или None для посторонних файлов (.DS_Store и т.п.)."""
+    if not name.endswith('.raw'):
+        return None
+    parts = name[:-4].split('_')
+    if len(parts) != 3 or not all(part.isdigit() for part in parts):
+        return None
+    tx, ty, generation = map(int, parts)
+    return (tx, ty), generation
+
+
+class Project:
+    """
+    Описание: Файл проекта рисовалки - каталог <имя>.drawproj:
+    project.json - размер холста, тайла, цвета фона, история (файл, число штрихов и примененных штрихов)
+    и список файлов тайлов;
+    strokes-<поколение>.jsonl - история штрихов, по одному штриху JSON в строке (с ограничивающим прямоугольником);
+    tiles/<tx>_<ty>_<поколение>.raw - закрашенные тайлы холста: пиксели RGB, сжатые zlib.
+    Сохранение инкрементное: записываются только тайлы, измененные после прошлого сохранения
+    (TiledImage.dirty), а в историю дописываются новые штрихи. Открытие читает готовые тайлы, штрихи
+    заново не рисуются.
+
+    Каждое сохранение - новое поколение: файлы, на которые ссылается project.json, не изменяются.
+    Измененные тайлы пишутся в новые файлы, история дописывается после последнего сохраненного штриха
+    (а если после отмены нарисован новый штрих, общая часть копируется в новый файл истории). Затем
+    project.json заменяется атомарно, и только после этого удаляются файлы прошлого поколения. При сбое
+    в любой момент открывается либо прежнее, либо новое сохранение целиком.
+
+    Сохранение делится на две части: changes в потоке интерфейса быстро собирает изменения (снимок
+    тайлов без копирования, TiledImage.snapshot), write записывает их и может выполняться в фоновом
+    потоке (save_async) - рисование в это время продолжается, измененные тайлы копируются.
+
+    Параметры:
+    path (str): каталог проекта.
+    overwrite (bool): разрешить заменить существующий проект в path, открытый не этим объектом
+    (иначе первое сохранение в чужой проект завершается FileExistsError). Новые файлы получают поколения
+    после поколений заменяемого проекта, поэтому до замены project.json он открывается целиком.
+    """
+
+    def __init__(self, path, overwrite=False):
+        self.path = path
+        self.overwrite = overwrite
+        self.tiles_path = os.path.join(path, 'tiles')
+        self.meta_path = os.path.join(path, 'project.json')
+        # Сохраненное состояние: изображение, штрихи в файле истории, смещения концов их строк,
+        # поколение, файл истории и поколения файлов тайлов
+        self.image = None
+        self.saved_strokes = []
+        self.offsets = []
+        self.generation = 0
+        self.strokes_file = None
+        self.tile_files = {}
+        # Ошибка последнего завершенного фонового сохранения (None - сохранено)
+        self.error = None
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._future = None
+
+    def changes(self, image, log):
+        """
+        Описание: Изменения после прошлого сохранения. Вызывается в потоке интерфейса.
+
+        Параметры:
+        image (TiledImage): холст.
+        log (StrokeLog): история штрихов холста.
+
+        Возвращает: словарь для write.
+        """
+        # Другое изображение (новый холст или первое сохранение) записывается целиком
+        full = image is not self.image
+        keys = set(image.tiles) if full else image.dirty
+        image.dirty = set()
+        self.image = image
+
+        prefix = 0
+        limit = min(len(self.saved_strokes), len(log.strokes))
+        while prefix < limit and self.saved_strokes[prefix] is log.strokes[prefix]:
+            prefix += 1
+        if full:
+            prefix = 0
+        lines = [json.dumps(stroke.to_dict()) + '\n' for stroke in log.strokes[prefix:]]
+        self.saved_strokes = list(log.strokes)
+
+        meta = {
+            'version': FORMAT_VERSION,
+            'width': image.width,
+            'height': image.height,
+            'tile_size': image.tile_size,
+            'background': list(image.background),
+            'initial_background': list(log.checkpoints[0][0]),
+            'strokes': len(log.strokes),
+            'position': log.position,
+        }
+        return {'full': full, 'keys': keys, 'tiles': image.snapshot()[1], 'prefix': prefix, 'lines': lines,
+                'meta': meta}
+
+    def _write_strokes(self, prefix, lines, generation):
+        """
+        Дописывает историю после первых prefix штрихов. Возвращает (файл истории, смещения строк).
+        Строки после последнего сохраненного штриха принадлежат прерванному сохранению и отбрасываются.
+        """
+        offsets = self.offsets[:prefix]
+        end = offsets[-1] if offsets else 0
+        name = self.strokes_file
+        if name is None or prefix < len(self.offsets):
+            # Сохраненная история заменяется: общая часть копируется в новый файл, старый остается до замены project.json
+            name = f"strokes-{generation}.jsonl"
+            with open(os.path.join(self.path, name), 'wb') as f:
+                if end:
+                    with open(os.path.join(self.path, self.strokes_file), 'rb') as source:
+                        f.write(source.read(end))
+        with open(os.path.join(self.path, name), 'r+b') as f:
+            f.seek(end)
+            f.truncate()
+            for line in lines:
+                end += f.write(line.encode('utf-8'))
+                offsets.append(end)
+            f.flush()
+            os.fsync(f.fileno())
+        return name, offsets
+
+    def write(self, changes):
+        """Записывает изменения из changes на диск. Возвращает число записанных и удаленных тайлов."""
+        try:
+            if changes['full'] and not self.generation and os.path.exists(self.meta_path):
+                if not self.overwrite:
+                    raise FileExistsError(f"В каталоге {self.path} уже есть другой проект")
+                # Файлы заменяемого проекта нужны до замены project.json: продолжаем после его поколений
+                self.generation = self._existing_generation()
+            os.makedirs(self.tiles_path, exist_ok=True)
+            generation = self.generation + 1
+            tiles = changes['tiles']
+            keys = changes['keys']
+            tile_files = {} if changes['full'] else dict(self.tile_files)
+            for key in keys:
+                if key in tiles:
+                    _replace(os.path.join(self.tiles_path, _tile_name(key, generation)),
+                             zlib.compress(tiles[key].tobytes(), 1))
+                    tile_files[key] = generation
+                else:
+                    tile_files.pop(key, None)
+            strokes_file, offsets = self._write_strokes(changes['prefix'], changes['lines'], generation)
+
+            # Замена project.json - момент сохранения: до нее открывается прежнее поколение целиком
+            meta = dict(changes['meta'], generation=generation, strokes_file=strokes_file,
+                        tiles=[[tx, ty, g] for (tx, ty), g in tile_files.items()])
+            _replace(self.meta_path, json.dumps(meta).encode('utf-8'))
+        except Exception:
+            # Следующее сохранение запишет проект целиком
+            self.image = None
+            raise
+
+        self.generation, self.strokes_file, self.offsets, self.tile_files = generation, strokes_file, offsets, tile_files
+        self._collect_garbage()
+        return len(keys)
+
+    def _existing_generation(self):
+        """Наибольшее поколение среди project.json и файлов в каталоге проекта."""
+        generations = [0]
+        try:
+            with open(self.meta_path, encoding='utf-8') as f:
+                generations.append(int(json.load(f).get('generation', 0)))
+        except (OSError, ValueError, TypeError, AttributeError):
+            pass
+        for name in os.listdir(self.path):
+            number = name[len('strokes-'):-len('.jsonl')]
+            if name.startswith('strokes-') and name.endswith('.jsonl') and number.isdigit():
+                generations.append(int(number))
+        if os.path.isdir(self.tiles_path):
+            generations.extend(parsed[1] for parsed in map(_parse_tile_name, os.listdir(self.tiles_path)) if parsed)
+        return max(generations)
+
+    def _collect_garbage(self):
+        """
+        Удаляет файлы тайлов и истории, на которые не ссылается текущий project.json. Проект уже сохранен,
+        поэтому неудаленный файл только занимает место и будет удален следующим сохранением.
+        """
+        try:
+            for name in os.listdir(self.path):
+                if name.startswith('strokes-') and name.endswith('.jsonl') and name != self.strokes_file:
+                    os.remove(os.path.join(self.path, name))
+            for name in os.listdir(self.tiles_path):
+                parsed = _parse_tile_name(name)
+                if parsed is not None and self.tile_files.get(parsed[0]) != parsed[1]:
+                    os.remove(os.path.join(self.tiles_path, name))
+        except OSError:
+            pass
+
+    def save(self, image, log):
+        """Сохраняет проект в текущем потоке (дожидается фонового сохранения, если оно идет)."""
+        self.wait()
+        return self.write(self.changes(image, log))
+
+    def save_async(self, image, log):
+        """
+        Описание: Запускает сохранение в фоновом потоке. Если предыдущее еще идет, ничего не делает.
+        Ошибка завершенного сохранения остается в self.error.
+
+        Возвращает: True, если сохранение запущено.
+        """
+        if self._future is not None and not self._future.done():
+            return False
+        self.wait()
+        self._future = self._executor.submit(self.write, self.changes(image, log))
+        return True
+
+    def wait(self):
+        """Дожидается фонового сохранения и запоминает его ошибку в self.error. Возвращает ошибку или None."""
+        if self._future is not None:
+            self.error = self._future.exception()
+            self._future = None
+        return self.error
+
+    def close(self):
+        """Дожидается фонового сохранения и останавливает поток. Возвращает ошибку сохранения или None."""
+        error = self.wait()
+        self._executor.shutdown()
+        return error
+
+    def delete(self):
+        """Удаляет каталог проекта (например, ненужное автосохранение)."""
+        self.close()
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    @classmethod
+    def open(cls, path):
+        """
+        Описание: Открывает проект: тайлы читаются готовыми, история восстанавливается без перерисовки.
+
+        Параметры:
+        path (str): каталог проекта.
+
+        Возвращает: кортеж (Project, TiledImage, StrokeLog).
+        """
+        project = cls(path)
+        with open(project.meta_path, encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('version') != FORMAT_VERSION:
+            raise ValueError(f"Неподдерживаемая версия проекта: {meta.get('version')}")
+        size = meta['tile_size']
+        image = TiledImage(meta['width'], meta['height'], tuple(meta['background']), size)
+        for tx, ty, generation in meta['tiles']:
+            with open(os.path.join(project.tiles_path, _tile_name((tx, ty), generation)), 'rb') as f:
+                image.tiles[(tx, ty)] = Image.frombytes('RGB', (size, size), zlib.decompress(f.read()))
+            project.tile_files[(tx, ty)] = generation
+
+        # Читаются только штрихи из project.json: строки после них - от прерванного сохранения
+        strokes, end = [], 0
+        if meta['strokes_file'] is not None:
+            with open(os.path.join(path, meta['strokes_file']), 'rb') as f:
+                for line in f:
+                    if len(strokes) == meta['strokes']:
+                        break
+                    strokes.append(Stroke.from_dict(json.loads(line)))
+                    end += len(line)
+                    project.offsets.append(end)
+        position = min(meta['position'], len(strokes))
+        log = StrokeLog.restored(image, strokes, position, meta['initial_background'])
+
+        image.dirty = set()
+        project.image = image
+        project.saved_strokes = list(strokes)
+        project.generation = meta['generation']
+        project.strokes_file = meta['strokes_file']
+        return project, image, log
@@ -0,0 +1,199 @@
+from array import array
+
+from PIL import ImageColor
+
+
+# Через сколько штрихов сохраняется снимок холста для отмены
+CHECKPOINT_INTERVAL = 32
+
+
+class Stroke:
+    """
+    Запись одного действия на холсте. kind: 'line' - ломаная кисти или ластика, 'text' - текст,
+    'fill' - заливка всего холста (очистка или смена фона). Точки хранятся в array('i') подряд
+    x0, y0, x1, y1, ... (4 байта на координату вместо объекта int в списке).
+    """
+
+    __slots__ = ('kind', 'color', 'width', 'points', 'text', 'bbox')
+
+    def __init__(self, kind, color, width=1, points=(), text=None):
+        self.kind = kind
+        self.color = color
+        self.width = width
+        self.points = array('i', points)
+        self.text = text
+        self.bbox = None
+
+    def extend(self, x, y):
+        self.points.append(x)
+        self.points.append(y)
+
+    def bounds(self):
+        """Ограничивающий прямоугольник ломаной с учетом толщины (как у TiledImage.line)."""
+        xs, ys = self.points[0::2], self.points[1::2]
+        pad = self.width // 2 + 1
+        return min(xs) - pad, min(ys) - pad, max(xs) + pad, max(ys) + pad
+
+    def render(self, image):
+        """Рисует штрих на TiledImage и запоминает его ограничивающий прямоугольник."""
+        if self.kind == 'line':
+            self.bbox = image.line(self.points.tolist(), fill=self.color, width=self.width, joint='curve')
+        elif self.kind == 'text':
+            self.bbox = image.text((self.points[0], self.points[1]), self.text, fill=self.color)
+        else:
+            image.fill(self.color)
+            self.bbox = (0, 0, image.width - 1, image.height - 1)
+        return self.bbox
+
+    def to_dict(self):
+        """Штрих как словарь для JSON (файл проекта)."""
+        return {'kind': self.kind, 'color': self.color, 'width': self.width, 'points': self.points.tolist(),
+                'text': self.text, 'bbox': list(self.bbox) if self.bbox is not None else None}
+
+    @classmethod
+    def from_dict(cls, data):
+        """Штрих из словаря to_dict."""
+        stroke = cls(data['kind'], data['color'], data['width'], data['points'], data['text'])
+        stroke.bbox = tuple(data['bbox']) if data['bbox'] is not None else None
+        return stroke
+
+
+def _overlaps(a, b):
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+class StrokeLog:
+    """
+    Описание: История штрихов холста с неограниченной отменой и повтором. Каждые interval штрихов
+    (и после каждой заливки) сохраняется снимок холста; снимок не копирует тайлы (TiledImage.snapshot),
+    поэтому занимает память только под тайлы, измененные после него. При отмене штриха
+    восстанавливаются из ближайшего предыдущего снимка только тайлы под этим штрихом, и в них заново
+    рисуются штрихи после снимка, которые их задевают, а не вся история.
+
+    Параметры:
+    image (TiledImage): холст, на котором выполняются штрихи.
+    interval (int): число штрихов между снимками.
+    """
+
+    def __init__(self, image, interval=CHECKPOINT_INTERVAL):
+        self.image = image
+        self.interval = interval
+        self.strokes = []
+        self.position = 0
+        self.checkpoints = {0: image.snapshot()}
+
+    @classmethod
+    def restored(cls, image, strokes, position, initial_background, interval=CHECKPOINT_INTERVAL):
+        """
+        Описание: История для холста, загруженного уже нарисованным (из файла проекта), без перерисовки штрихов.
+        Снимки восстанавливаются без рисования: начальный холст и холст после каждой заливки - пустые тайлы
+        с цветом фона, текущий холст - сам image. Промежуточных снимков нет, поэтому отмена сразу после
+        загрузки перерисовывает штрихи от последней заливки (только в тайлах под отменяемым штрихом).
+
+        Параметры:
+        image (TiledImage): холст в состоянии после первых position штрихов.
+        strokes (list): все штрихи истории, включая отмененные.
+        position (int): число примененных штрихов.
+        initial_background (tuple): цвет фона RGB до первого штриха.
+        interval (int): число штрихов между снимками.
+
+        Возвращает: StrokeLog.
+        """
+        log = cls.__new__(cls)
+        log.image = image
+        log.interval = interval
+        log.strokes = list(strokes)
+        log.position = position
+        log.checkpoints = {0: (tuple(initial_background), {})}
+        for index, stroke in enumerate(log.strokes[:position]):
+            if stroke.kind == 'fill':
+                log.checkpoints[index + 1] = (ImageColor.getrgb(stroke.color), {})
+        log.checkpoints[position] = image.snapshot()
+        return log
+
+    @property
+    def applied(self):
+        """Штрихи, которые сейчас на холсте (без отмененных)."""
+        return self.strokes[:self.position]
+
+    def can_undo(self):
+        return self.position > 0
+
+    def can_redo(self):
+        return self.position < len(self.strokes)
+
+    def _checkpoint(self, stroke):
+        if (stroke.kind == 'fill' or self.position % self.interval == 0) and self.position not in self.checkpoints:
+            self.checkpoints[self.position] = self.image.snapshot()
+
+    def add(self, stroke, render=True):
+        """
+        Добавляет штрих в историю (отмененные штрихи после текущего места удаляются).
+        render=False - штрих уже нарисован на холсте (например, по мере движения мыши), нужен только bbox.
+        """
+        if render:
+            stroke.render(self.image)
+        elif stroke.bbox is None:
+            stroke.bbox = stroke.bounds()
+        del self.strokes[self.position:]
+        for index in [index for index in self.checkpoints if index > self.position]:
+            del self.checkpoints[index]
+        self.strokes.append(stroke)
+        self.position += 1
+        self._checkpoint(stroke)
+
+    def undo(self):
+        """Отменяет последний штрих. Возвращает отмененный штрих или None."""
+        if not self.can_undo():
+            return None
+        self.position -= 1
+        stroke = self.strokes[self.position]
+        start = max(index for index in self.checkpoints if index <= self.position)
+        snapshot = self.checkpoints[start]
+        # После каждой заливки есть снимок, поэтому между снимком и штрихом заливок нет
+        if stroke.kind == 'fill':
+            self.image.restore(snapshot)
+            for previous in self.strokes[start:self.position]:
+                previous.render(self.image)
+            return stroke
+
+        keys = self.image.tile_keys(stroke.bbox)
+        if not keys:
+            return stroke
+        size = self.image.tile_size
+        region = (min(tx for tx, _ in keys) * size, min(ty for _, ty in keys) * size,
+                  (max(tx for tx, _ in keys) + 1) * size - 1, (max(ty for _, ty in keys) + 1) * size - 1)
+        self.image.restore(snapshot, keys)
+        self.image.clip = set(keys)
+        try:
+            for previous in self.strokes[start:self.position]:
+                if _overlaps(previous.bbox, region):
+                    previous.render(self.image)
+        finally:
+            self.image.clip = None
+        return stroke
+
+    def redo(self):
+        """Повторяет последний отмененный штрих. Возвращает его или None."""
+        if not self.can_redo():
+            return None
+        stroke = self.strokes[self.position]
+        stroke.render(self.image)
+        self.position += 1
+        self._checkpoint(stroke)
+        return stroke
+
+    def background(self):
+        """Цвет фона после последней заливки в истории (или None, если заливок не было)."""
+        for stroke in reversed(self.applied):
+            if stroke.kind == 'fill':
+                return stroke.color
+        return None
+
+    def visible(self):
+        """Штрихи после последней заливки: их элементы должны быть на Canvas."""
+        applied = self.applied
+        for index in range(len(applied) - 1, -1, -1):
+            if applied[index].kind == 'fill':
+                return applied[index + 1:]
+        return applied
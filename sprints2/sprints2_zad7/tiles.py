@@ -0,0 +1,222 @@
+import struct
+import zlib
+
+from PIL import Image, ImageColor, ImageDraw, ImageFont
+
+
+# Сторона квадратного тайла в пикселях
+TILE_SIZE = 256
+
+
+class TiledImage:
+    """
+    Растровый холст из тайлов фиксированного размера. Тайл создается только тогда, когда на него
+    попадает штрих, поэтому память зависит от закрашенной площади, а не от размера холста
+    (пустой холст 20000x20000 не занимает места). Измененные тайлы запоминаются в self.dirty.
+    Снимки холста (snapshot) не копируют тайлы: тайл, на который ссылается снимок, копируется
+    только перед следующим изменением (копирование при записи).
+    """
+
+    def __init__(self, width, height, background="white", tile_size=TILE_SIZE):
+        self.width = width
+        self.height = height
+        self.tile_size = tile_size
+        self.background = ImageColor.getrgb(background) if isinstance(background, str) else tuple(background)
+        self.tiles = {}
+        self.dirty = set()
+        # Тайлы, общие со снимками: перед изменением копируются
+        self.shared = set()
+        # Если задано множество номеров тайлов, рисование идет только в них
+        self.clip = None
+
+    @property
+    def size(self):
+        return self.width, self.height
+
+    def memory_usage(self):
+        """Объем памяти тайлов в байтах."""
+        return len(self.tiles) * self.tile_size * self.tile_size * 3
+
+    def tile_keys(self, box):
+        """Номера тайлов (tx, ty), которые пересекает прямоугольник box = (x0, y0, x1, y1) с включенными x1, y1."""
+        x0, y0, x1, y1 = box
+        size = self.tile_size
+        x0, y0 = max(int(x0), 0) // size, max(int(y0), 0) // size
+        x1, y1 = min(int(x1), self.width - 1) // size, min(int(y1), self.height - 1) // size
+        return [(tx, ty) for ty in range(y0, y1 + 1) for tx in range(x0, x1 + 1)]
+
+    def tile(self, key):
+        """
+        Тайл с номером key = (tx, ty) для изменения; создается с цветом фона при первом обращении,
+        общий со снимком тайл предварительно копируется.
+        """
+        if key not in self.tiles:
+            self.tiles[key] = Image.new("RGB", (self.tile_size, self.tile_size), self.background)
+        elif key in self.shared:
+            self.tiles[key] = self.tiles[key].copy()
+            self.shared.discard(key)
+        return self.tiles[key]
+
+    def all_keys(self):
+        """Номера всех тайлов холста."""
+        return self.tile_keys((0, 0, self.width - 1, self.height - 1))
+
+    def snapshot(self):
+        """Снимок холста: цвет фона и словарь тайлов (тайлы не копируются)."""
+        self.shared = set(self.tiles)
+        return self.background, dict(self.tiles)
+
+    def restore(self, snapshot, keys=None):
+        """
+        Восстанавливает из снимка тайлы с номерами keys (по умолчанию весь холст вместе с цветом фона).
+        """
+        background, tiles = snapshot
+        if keys is None:
+            self.dirty.update(self.tiles, tiles)
+            self.background = background
+            self.tiles = dict(tiles)
+            self.shared = set(tiles)
+            return
+        for key in keys:
+            if key in tiles:
+                self.tiles[key] = tiles[key]
+                self.shared.add(key)
+            else:
+                self.tiles.pop(key, None)
+                self.shared.discard(key)
+            self.dirty.add(key)
+
+    def fill(self, color):
+        """Заливает весь холст цветом color: тайлы удаляются, цвет становится цветом фона."""
+        self.dirty.update(self.all_keys())
+        self.background = ImageColor.getrgb(color) if isinstance(color, str) else tuple(color)
+        self.tiles = {}
+        self.shared = set()
+
+    def _stamp(self, box, fill, paint):
+        """
+        Рисует фигуру полосами высотой в один тайл: на каждую строку тайлов под box - маска от левого края
+        холста до правого края нужных тайлов этой строки (paint(draw, dx, dy) со сдвигом координат маски),
+        по которой тайлы закрашиваются цветом fill. Маска не больше одной полосы холста, поэтому память
+        не зависит от размера штриха, а строки без тайлов из self.clip не растеризуются. ImageDraw
+        растеризует одинаково при сдвиге по вертикали, но не по горизонтали, поэтому по горизонтали маска
+        всегда начинается с x = 0: на границах полос и тайлов нет швов, а штрих рисуется одинаково
+        при любом разбиении. Тайлы, куда не попал ни один пиксель, не создаются.
+        """
+        x0, y0 = max(int(box[0]), 0), max(int(box[1]), 0)
+        x1, y1 = min(int(box[2]), self.width - 1), min(int(box[3]), self.height - 1)
+        if x1 < x0 or y1 < y0:
+            return
+        color = ImageColor.getrgb(fill) if isinstance(fill, str) else fill
+        size = self.tile_size
+        rows = {}
+        for tx, ty in self.tile_keys((x0, y0, x1, y1)):
+            if self.clip is None or (tx, ty) in self.clip:
+                rows.setdefault(ty, []).append(tx)
+        for ty, columns in rows.items():
+            top = ty * size
+            by0, by1 = max(y0, top), min(y1, top + size - 1)
+            right = min(x1, columns[-1] * size + size - 1)
+            mask = Image.new("L", (right + 1, by1 - by0 + 1), 0)
+            paint(ImageDraw.Draw(mask), 0, -by0)
+            for tx in columns:
+                left = tx * size
+                ix0, ix1 = max(x0, left), min(right, left + size - 1)
+                part = mask.crop((ix0, 0, ix1 + 1, by1 - by0 + 1))
+                if part.getbbox() is None:
+                    continue
+                self.tile((tx, ty)).paste(color, (ix0 - left, by0 - top, ix1 - left + 1, by1 - top + 1), part)
+                self.dirty.add((tx, ty))
+
+    def line(self, points, fill, width=1, joint=None):
+        """
+        Линия через точки points = [x0, y0, x1, y1, ...] как ImageDraw.line. joint='curve' - скругленные
+        изломы и концы: круг диаметром width в каждой точке. ImageDraw.line(joint='curve') скругляет только
+        внутренние изломы, поэтому ломаная, нарисованная частями, отличалась от нарисованной целиком; здесь
+        результат от разбиения не зависит - штрих, нарисованный по кадрам (DrawingApp.flush_stroke),
+        совпадает с тем же штрихом, перерисованным при отмене. Возвращает ограничивающий прямоугольник.
+        """
+        xs, ys = points[0::2], points[1::2]
+        pad = width // 2 + 1
+        box = (min(xs) - pad, min(ys) - pad, max(xs) + pad, max(ys) + pad)
+
+        def paint(draw, dx, dy):
+            shifted = [value + (dx if i % 2 == 0 else dy) for i, value in enumerate(points)]
+            draw.line(shifted, fill=255, width=width)
+            if joint == 'curve' and width > 1:
+                radius = width // 2
+                for x, y in zip(shifted[0::2], shifted[1::2]):
+                    draw.ellipse((x - radius, y - radius, x - radius + width - 1, y - radius + width - 1), fill=255)
+        self._stamp(box, fill, paint)
+        return box
+
+    def text(self, xy, text, fill):
+        """Текст с левым верхним углом в xy как ImageDraw.text. Возвращает ограничивающий прямоугольник."""
+        x, y = xy
+        font = ImageFont.load_default()
+        left, top, right, bottom = ImageDraw.Draw(Image.new("L", (1, 1))).textbbox((x, y), text, font=font)
+        box = (left - 1, top - 1, right + 1, bottom + 1)
+        self._stamp(box, fill, lambda draw, dx, dy: draw.text((x + dx, y + dy), text, fill=255, font=font))
+        return box
+
+    def getpixel(self, xy):
+        x, y = int(xy[0]), int(xy[1])
+        key = (x // self.tile_size, y // self.tile_size)
+        if key not in self.tiles:
+            return self.background
+        return self.tiles[key].getpixel((x % self.tile_size, y % self.tile_size))
+
+    def crop(self, box):
+        """Изображение PIL с областью box = (x0, y0, x1, y1), x1 и y1 не включаются."""
+        x0, y0, x1, y1 = box
+        region = Image.new("RGB", (x1 - x0, y1 - y0), self.background)
+        if x1 <= x0 or y1 <= y0:
+            return region
+        for tx, ty in self.tile_keys((x0, y0, x1 - 1, y1 - 1)):
+            if (tx, ty) in self.tiles:
+                region.paste(self.tiles[(tx, ty)], (tx * self.tile_size - x0, ty * self.tile_size - y0))
+        return region
+
+    def to_image(self):
+        """Весь холст одним изображением PIL (только для небольших холстов)."""
+        return self.crop((0, 0, self.width, self.height))
+
+    def _band_rows(self):
+        """
+        Строки PNG (байт фильтра 0 и пиксели) полосами высотой в один тайл, сверху вниз.
+        Полосы без тайлов одинаковы и строятся один раз.
+        """
+        stride = self.width * 3
+        empty = b'\x00' + bytes(self.background) * self.width
+        for ty in range(-(-self.height // self.tile_size)):
+            y0 = ty * self.tile_size
+            y1 = min(y0 + self.tile_size, self.height)
+            if not any((tx, ty) in self.tiles for tx in range(-(-self.width // self.tile_size))):
+                yield empty * (y1 - y0)
+                continue
+            raw = self.crop((0, y0, self.width, y1)).tobytes()
+            yield b''.join(b'\x00' + raw[i:i + stride] for i in range(0, len(raw), stride))
+
+    def save(self, path):
+        """
+        Сохраняет холст в PNG потоково: изображение собирается и сжимается полосами высотой в один тайл,
+        поэтому целиком в памяти холст не строится. Другие форматы сохраняются через PIL целиком.
+        """
+        if not path.lower().endswith('.png'):
+            self.to_image().save(path)
+            return
+
+        def chunk(kind, data):
+            return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+        # Быстрое сжатие: для больших холстов время записи определяет zlib
+        compressor = zlib.compressobj(1)
+        with open(path, 'wb') as f:
+            f.write(b'\x89PNG\r\n\x1a\n')
+            f.write(chunk(b'IHDR', struct.pack('>IIBBBBB', self.width, self.height, 8, 2, 0, 0, 0)))
+            for rows in self._band_rows():
+                data = compressor.compress(rows)
+                if data:
+                    f.write(chunk(b'IDAT', data))
+            f.write(chunk(b'IDAT', compressor.flush()))
+            f.write(chunk(b'IEND', b''))